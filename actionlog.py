@@ -0,0 +1,131 @@
+"""Event sourcing for Game: an append-only action log with periodic snapshots.
+
+A log is a JSON-lines stream. Each line is either
+    ["snap", seq, record]            Game.to_record() after `seq` actions
+    ["act", seq, name, *args]        the seq-th accepted action (see Game._log)
+Restoring loads the latest snapshot and replays the actions after it.
+"""
+import json
+
+from game import Game, STATES_NONE
+
+
+class ActionLog:
+    def __init__(self, game, path=None, snapshot_every=200, seq=0):
+        self.game = game
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.seq = seq
+        self.snapshot_seq = seq
+        self.snapshot_record = None
+        self.tail = []   # actions since the last snapshot
+        if path:
+            drop_partial_line(path)
+        self._file = open(path, "a", encoding="utf-8") if path else None
+        game.action_log = self
+        self.snapshot()
+
+    def append(self, entry):
+        # Called at the start of an accepted action, so the game still reflects actions 1..seq
+        if self.seq - self.snapshot_seq >= self.snapshot_every:
+            self.snapshot()
+        self.seq += 1
+        self.tail.append(entry)
+        self._write(["act", self.seq] + entry)
+
+    def snapshot(self):
+        self.snapshot_seq = self.seq
+        self.snapshot_record = self.game.to_record()
+        self.tail = []
+        self._write(["snap", self.seq, self.snapshot_record])
+
+    def _write(self, line):
+        if self._file is not None:
+            self._file.write(json.dumps(line, separators=(",", ":")) + "\n")
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.game.action_log is self:
+            self.game.action_log = None
+
+    def restore(self):
+        # Rebuild the game from memory (last snapshot + tail) without touching the live one
+        return replay(self.snapshot_record, self.tail)
+
+
+APPLY = {
+    "add_player": lambda g, name, pid, bot=None: g.add_player(name, pid, pid, bot),
+    "start": lambda g, pid: g.start(pid),
+    "hit": lambda g, pid: g.hit(pid),
+    "stay": lambda g, pid: g.stay(pid),
+    "proceed_round": lambda g: g.proceed_round(),
+    "freeze": lambda g, pid, target: g.apply_freeze(pid, target),
+    "flip3": lambda g, pid, target: g.apply_flip3(pid, target),
+    "discard_choose_target": lambda g, pid, target, card_idx: g.apply_discard_choose_target(pid, target, card_idx),
+    "discard_choose_card": lambda g, pid, card_idx: g.apply_discard_choose_card(pid, card_idx),
+}
+
+
+def apply_entry(game, entry):
+    name, *args = entry
+    APPLY[name](game, *args)
+
+
+def replay(record, entries):
+    """Game from a snapshot record plus the actions after it, replayed headless at full speed.
+
+    In the result every player's sid is their player_id (the identity the log uses); callers
+    that put the game back online should reset them.
+    """
+    game = Game.from_record(record)
+    for p in game.players:
+        game.set_sid(p, p.player_id)
+    game.state_mode = STATES_NONE
+    for entry in entries:
+        apply_entry(game, entry)
+    game.state_mode = record["state_mode"]
+    return game
+
+
+def drop_partial_line(path):
+    # A crash mid-write leaves a last line without its newline; cut it so appends start clean
+    try:
+        with open(path, "rb+") as f:
+            end = f.seek(0, 2)
+            if end == 0:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b"\n":
+                return
+            f.seek(0)
+            f.truncate(f.read().rfind(b"\n") + 1)
+    except FileNotFoundError:
+        pass
+
+
+def read_log(path):
+    # Streams the file, keeping only the latest snapshot and the actions after it
+    record, seq, tail = None, 0, []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if not line.endswith("\n"):
+                break   # cut short by a crash mid-write: that action never completed
+            kind, line_seq, *rest = json.loads(line)
+            if kind == "snap":
+                record, seq, tail = rest[0], line_seq, []
+            elif line_seq > seq:
+                tail.append(rest)
+    return record, seq, tail
+
+
+def restore(path):
+    """Game from a log file, plus the seq of its last action."""
+    record, seq, tail = read_log(path)
+    if record is None:
+        raise ValueError(f"{path} has no snapshot")
+    return replay(record, tail), seq + len(tail)
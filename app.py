@@ -1,13 +1,192 @@
-from flask import Flask, render_template, request
-from flask_socketio import SocketIO, emit, join_room
-from game import Game
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from flask import Flask, Response, abort, jsonify, render_template, request
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from game import CODE_ALPHABET, CODE_LENGTH, Game, STATES_PUBLIC, bot_sid
+from bots import humans_connected, next_move, waiting_bot
+from delta import StateStream
+from projection import Overlays
+from spectators import SpectatorFeed
+from actionlog import ActionLog, read_log, restore
+from codec import ENCODINGS, ENCODING_COMPACT, ENCODING_JSON, table as codec_table, wire
+from codes import CodeAllocator
+from history import HistoryStore, HistoryWriter, match_record
+from registry import EVICT_CAPACITY, GameRegistry
+import metrics
+from store import store_from_url, shard_for_code
+from tournament import Tournament
+
+log = logging.getLogger(__name__)
+
+# Scale-out settings: a shared store ("sqlite:///games.db"), a Socket.IO message queue
+# ("redis://...") for cross-worker rooms, and this worker's slot for code-sticky routing
+STORE_URL = os.environ.get("FLIP7_STORE", "memory")
+MESSAGE_QUEUE = os.environ.get("FLIP7_MESSAGE_QUEUE")
+WORKERS = int(os.environ.get("FLIP7_WORKERS", "1"))
+WORKER_INDEX = int(os.environ.get("FLIP7_WORKER_INDEX", "0"))
+
+# Registry bounds: TTLs in seconds since a game's last action, and a cap on live games
+FINISHED_TTL = int(os.environ.get("FLIP7_FINISHED_TTL", "600"))
+ABANDONED_TTL = int(os.environ.get("FLIP7_ABANDONED_TTL", "300"))
+IDLE_TTL = int(os.environ.get("FLIP7_IDLE_TTL", str(6 * 3600)))
+MAX_GAMES = int(os.environ.get("FLIP7_MAX_GAMES", "10000"))
+SWEEP_INTERVAL = int(os.environ.get("FLIP7_SWEEP_INTERVAL", "30"))
+
+# Game codes: large deployments can make them longer or use a bigger alphabet
+CODE_LENGTH = int(os.environ.get("FLIP7_CODE_LENGTH", str(CODE_LENGTH)))
+CODE_ALPHABET = os.environ.get("FLIP7_CODE_ALPHABET", CODE_ALPHABET)
+
+# Directory for per-game action logs (crash recovery, post-mortems); unset disables logging
+LOG_DIR = os.environ.get("FLIP7_LOG_DIR")
+
+# SQLite file for finished matches, player history and the leaderboard; unset disables it
+HISTORY_DB = os.environ.get("FLIP7_HISTORY_DB")
+
+# Server-side bots: seconds a bot "thinks" before each move, and the policy add_bot defaults to.
+# FLIP7_SOAK_GAMES keeps that many bot-only games running (one bot per FLIP7_SOAK_BOTS spec).
+BOT_THINK_DELAY = float(os.environ.get("FLIP7_BOT_DELAY", "0.8"))
+BOT_STRATEGY = os.environ.get("FLIP7_BOT_STRATEGY", "odds")
+# The only specs clients may ask for: others can name files (solved:<path>) or cost unbounded
+# CPU and memory under the game lock (mc:<rollouts>, solving a table), so they stay server-side
+BOT_STRATEGIES = set(os.environ.get("FLIP7_BOT_STRATEGIES", "odds,threshold:15,threshold:20,threshold:25,random").split(","))
+BOT_STRATEGIES.add(BOT_STRATEGY)
+SOAK_GAMES = int(os.environ.get("FLIP7_SOAK_GAMES", "0"))
+SOAK_BOTS = os.environ.get("FLIP7_SOAK_BOTS", "odds,threshold:20,threshold:25,random")
+
+# Most states a second sent to a game's spectators
+SPECTATOR_RATE = float(os.environ.get("FLIP7_SPECTATOR_RATE", "2"))
+
+# flip7_payload_bytes measures one emit in this many per kind and encoding (0: none), since each
+# measurement is an extra JSON dump on the broadcast path
+PAYLOAD_SAMPLE = int(os.environ.get("FLIP7_PAYLOAD_SAMPLE", "50"))
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = "dev"
-socketio = SocketIO(app, cors_allowed_origins="*")
-
-games = {}          # code -> Game
-player_game = {}    # sid -> code
+socketio = SocketIO(app, cors_allowed_origins="*", message_queue=MESSAGE_QUEUE)
+
+streams = {}        # code -> StateStream
+replays = {}        # code -> token of the replay currently animating that game
+encodings = {}      # sid -> wire encoding negotiated at connect
+bot_tasks = set()   # codes whose bot loop is running
+overlays = Overlays()   # what each connection was last told about itself
+feeds = {}          # code -> SpectatorFeed
+watching = {}       # spectator sid -> code
+# Live tournaments are this worker's alone (not in the store), so they need a single worker
+tournaments = {}    # tournament code -> Tournament
+table_of = {}       # game code -> (tournament code, table index) while that table plays
+entrant_sids = {}   # player_id -> sid of a human tournament entrant's connection
+tournament_lock = threading.RLock()
+history = HistoryWriter(HistoryStore(HISTORY_DB)) if HISTORY_DB else None
+recorded = set()    # codes of finished games already handed to the history writer
+payload_emits = defaultdict(itertools.count)   # (kind, encoding) -> emits so far, for sampling
+sweeper_started = False
+
+EVENT_SECONDS = metrics.Histogram("flip7_event_seconds", "Socket.IO handler time", ["event"])
+STATE_SECONDS = metrics.Histogram("flip7_state_build_seconds", "Time to build a game's public state")
+PAYLOAD_BYTES = metrics.Histogram(
+    "flip7_payload_bytes", "JSON size of emitted states", ["kind", "encoding"], metrics.SIZE_BUCKETS)
+FANOUT = metrics.Histogram(
+    "flip7_broadcast_recipients", "Clients reached per state broadcast", ["channel"], metrics.COUNT_BUCKETS)
+SLEEP_SECONDS = metrics.Counter(
+    "flip7_task_sleep_seconds_total", "Time background tasks spent sleeping", ["task"])
+
+
+def forget_game(code, game, reason):
+    # Registry eviction hook: drop per-game broadcast state and tell whoever is still watching
+    if reason == EVICT_CAPACITY and registry.store.persistent:
+        # Only paged out of memory: players, rooms and the log stay for when it loads back
+        if game is not None and game.action_log is not None:
+            game.action_log.close()
+        return
+    codes.release(code)
+    recorded.discard(code)
+    streams.pop(code, None)
+    feed = feeds.pop(code, None)
+    for sid in feed.sids if feed is not None else ():
+        watching.pop(sid, None)
+    replays.pop(code, None)
+    if code in table_of and game is not None:
+        # Evicted undecided (everyone left): the table's leader goes through
+        table_finished(game, max(game.players, key=lambda p: p.total_score))
+    if game is not None and game.action_log is not None:
+        game.action_log.close()
+        # Keep the log for post-mortems, but out of the way of recover_game
+        os.replace(log_path(code), log_path(code) + ".closed")
+    socketio.emit("game_closed", {"code": code, "reason": reason}, room=code)
+    socketio.close_room(code)
+    for encoding in ENCODINGS:
+        socketio.close_room(f"{code}/{encoding}")
+        socketio.close_room(f"{code}/watch/{encoding}")
+
+
+def load_game(game):
+    # Registry load hook: a stored game coming back into memory keeps appending to its log
+    if LOG_DIR and os.path.exists(log_path(game.code)):
+        _, seq, tail = read_log(log_path(game.code))
+        ActionLog(game, path=log_path(game.code), seq=seq + len(tail))
+
+
+registry = GameRegistry(
+    store_from_url(STORE_URL),
+    max_games=MAX_GAMES,
+    finished_ttl=FINISHED_TTL,
+    abandoned_ttl=ABANDONED_TTL,
+    idle_ttl=IDLE_TTL,
+    on_evict=forget_game,
+    on_load=load_game,
+)
+
+
+def code_in_use(code):
+    # Live here, in the shared store, or waiting in an action log to be recovered
+    return code in registry or registry.store.exists(code) or bool(LOG_DIR) and os.path.exists(log_path(code))
+
+
+codes = CodeAllocator(
+    CODE_LENGTH,
+    CODE_ALPHABET,
+    in_use=code_in_use,
+    # With several workers, only hand out codes the proxy will route back to this one
+    accept=lambda code: WORKERS == 1 or shard_for_code(code, WORKERS) == WORKER_INDEX,
+)
+
+
+def sweep_loop():
+    while True:
+        socketio.sleep(SWEEP_INTERVAL)
+        try:
+            registry.sweep()
+        except Exception:
+            # Keep sweeping: a dead sweeper would never be restarted (sweeper_started stays True)
+            log.exception("registry sweep failed")
+
+
+def ensure_sweeper():
+    global sweeper_started
+    if not sweeper_started:
+        sweeper_started = True
+        socketio.start_background_task(sweep_loop)
+
+REPLAY_FRAME_DELAY = 1
+
+metrics.Gauge("flip7_games", "Games in the registry", fn=lambda: registry.stats()["games"])
+metrics.Gauge("flip7_connections", "Connections attached to a game", fn=lambda: registry.stats()["connections"])
+metrics.Counter(
+    "flip7_evictions_total", "Games evicted from the registry", ["reason"],
+    fn=lambda: {(reason,): n for reason, n in registry.stats()["evictions"].items()})
+metrics.Gauge("flip7_codes_remaining", "Game codes left to hand out", fn=codes.remaining)
+metrics.Gauge("flip7_streams", "Games with a state stream", fn=lambda: len(streams))
+metrics.Gauge("flip7_replays", "Flip Three replays animating", fn=lambda: len(replays))
+metrics.Gauge("flip7_bot_tasks", "Games with a bot loop running", fn=lambda: len(bot_tasks))
+metrics.Gauge("flip7_spectators", "Connections watching a game", fn=lambda: len(watching))
 
 
 @app.route("/")
@@ -15,199 +194,719 @@ def index():
     return render_template("index.html")
 
 
+@app.route("/tournaments/<code>")
+def tournament_page(code):
+    # Live bracket and standings
+    with tournament_lock:
+        t = tournaments.get(code)
+        if t is None:
+            abort(404)
+        return jsonify(t.to_dict())
+
+
+def cursor_arg(name, *types):
+    # "?before=1718000000.25:42" -> (1718000000.25, 42); None when absent or malformed
+    parts = request.args.get(name, "").split(":")
+    if len(parts) != len(types):
+        return None
+    try:
+        return tuple(t(p) for t, p in zip(types, parts))
+    except ValueError:
+        return None
+
+
+def page(rows, cursor, name):
+    return jsonify({"rows": rows, name: ":".join(repr(x) for x in cursor) if cursor else None})
+
+
+def history_store():
+    if history is None:
+        abort(404)
+    return history.store
+
+
+@app.route("/players/<player_id>/history")
+def player_history(player_id):
+    # Keyed by player_id, which only its owner knows (other clients only ever see seats)
+    limit = min(request.args.get("limit", 20, type=int), 100)
+    rows, cursor = history_store().history(player_id, limit, cursor_arg("before", float, int))
+    return page(rows, cursor, "before")
+
+
+@app.route("/players/<player_id>/stats")
+def player_stats(player_id):
+    stats = history_store().stats(player_id)
+    if stats is None:
+        abort(404)
+    return jsonify(stats)
+
+
+@app.route("/leaderboard")
+def leaderboard():
+    limit = min(request.args.get("limit", 20, type=int), 100)
+    rows, cursor = history_store().leaderboard(limit, cursor_arg("after", int, int))
+    return page(rows, cursor, "after")
+
+
+@app.route("/metrics")
+def metrics_page():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+def on(event):
+    # socketio.on, timing every call of the handler
+    def register(handler):
+        return socketio.on(event)(metrics.timed_handler(EVENT_SECONDS, event)(handler))
+    return register
+
+
+def game_action(handler):
+    # Run the handler with the caller's game, holding that game's lock
+    @functools.wraps(handler)
+    def wrapper(*args):
+        game = registry.for_sid(request.sid)
+        if not game:
+            return
+        with registry.lock(game.code):
+            res = handler(game, *args)
+            registry.save(game)
+            return res
+    return wrapper
+
+
+def public_state(game):
+    with STATE_SECONDS.time():
+        return game.public_dict()
+
+
+def measured(payload, kind, encoding):
+    # Sizes as plain JSON text; engine.io framing adds a few bytes on top
+    if PAYLOAD_SAMPLE and next(payload_emits[kind, encoding]) % PAYLOAD_SAMPLE == 0:
+        PAYLOAD_BYTES.observe(len(json.dumps(payload, separators=(",", ":"))), kind=kind, encoding=encoding)
+    return payload
+
+
+def sleep(seconds, task):
+    started = time.perf_counter()
+    socketio.sleep(seconds)
+    SLEEP_SECONDS.inc(time.perf_counter() - started, task=task)
+
+
+def log_path(code):
+    # Codes reach here from clients: only well-formed ones may name a file
+    if not codes.valid(code):
+        raise ValueError(f"invalid game code {code!r}")
+    return os.path.join(LOG_DIR, f"{code}.jsonl")
+
+
+def new_game(owner_player_id):
+    game = Game(owner_player_id=owner_player_id, state_mode=STATES_PUBLIC)
+    game.code = codes.allocate()
+    if LOG_DIR:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        ActionLog(game, path=log_path(game.code))
+    return game
+
+
+def find_game(code):
+    # Live or stored game, else rebuilt from its action log after a crash
+    if not codes.valid(code):
+        return None
+    game = registry.get(code)
+    if game or not LOG_DIR or not os.path.exists(log_path(code)):
+        return game
+    game, seq = restore(log_path(code))
+    for p in game.players:
+        # Everyone reconnects through rejoin_game; bots are back at once
+        game.set_sid(p, bot_sid(p.player_id) if p.bot else None)
+    ActionLog(game, path=log_path(code), seq=seq)
+    registry.add(game)
+    return game
+
+
+# ---------- State broadcasting ----------
+
+def broadcast_state(game, state=None, extra=None, skip_sid=None, supersede=True):
+    # Push a new version of the public state and send the room only what changed
+    if supersede and replays.pop(game.code, None) is not None:
+        # A newer state overtakes the running replay: jump straight to it and release the prompt lock
+        extra = dict(extra or {}, end_pending=True)
+    stream = streams.setdefault(game.code, StateStream())
+    # Replay frames pass their own state; spectators skip those and wait for the real one
+    partial = state is not None
+    state = state if state is not None else public_state(game)
+    patch = stream.push(state)
+    if extra:
+        patch["extra"] = extra
+    # Overlays first, so a client never renders a prompt before knowing it is theirs
+    for sid, view in overlays.changed(game, state):
+        if sid != skip_sid:
+            socketio.emit("you", view, to=sid)
+    # Encoded once per encoding, not per client: each has its own sub-room
+    recipients = Counter(
+        encodings.get(p.sid) for p in game.players if p.sid is not None and p.bot is None and p.sid != skip_sid)
+    FANOUT.observe(sum(recipients.values()), channel="players")
+    for encoding in ENCODINGS:
+        payload = wire(patch, encoding)
+        if recipients[encoding]:
+            measured(payload, "state_patch", encoding)
+        socketio.emit("state_patch", payload, room=f"{game.code}/{encoding}", skip_sid=skip_sid)
+    if not partial:
+        feed_spectators(game.code, state)
+    if game.match_winner is not None:
+        record_match(game)
+        if game.code in table_of:
+            table_finished(game, game.match_winner)
+    wake_bots(game)
+
+
+def send_snapshot(game):
+    # Full state for the requesting client only (first join, rejoin, version gap)
+    stream = streams.setdefault(game.code, StateStream())
+    if stream.last is None:
+        stream.push(public_state(game))
+    player = game.get_player_by_sid(request.sid)
+    if player is not None:
+        emit("you", overlays.current(game, player, stream.last))
+    encoding = encodings.get(request.sid, ENCODING_JSON)
+    emit("state", measured(wire(stream.snapshot(), encoding), "state", encoding))
+
+
+# ---------- Spectators ----------
+
+def feed_spectators(code, state):
+    # Called under the game lock; sends now, or leaves it to a flush at most 1/SPECTATOR_RATE away
+    feed = feeds.get(code)
+    if feed is None:
+        return
+    wait = feed.offer(state, time.monotonic())
+    if wait == 0:
+        flush_spectators(code, feed)
+    elif wait:
+        socketio.start_background_task(_flush_spectators_later, code, wait)
+
+
+def flush_spectators(code, feed):
+    patch = feed.flush(time.monotonic())
+    if patch is None:
+        return
+    recipients = Counter(encodings.get(sid) for sid in feed.sids)
+    FANOUT.observe(len(feed.sids), channel="spectators")
+    for encoding in ENCODINGS:
+        if recipients[encoding]:
+            payload = measured(wire(patch, encoding), "spectator_patch", encoding)
+            socketio.emit("state_patch", payload, room=f"{code}/watch/{encoding}")
+
+
+def _flush_spectators_later(code, wait):
+    sleep(wait, "spectators")
+    with registry.lock(code):
+        feed = feeds.get(code)
+        if feed is not None:
+            flush_spectators(code, feed)
+
+
+def stop_watching(sid):
+    code = watching.pop(sid, None)
+    if code is None:
+        return
+    feed = feeds.get(code)
+    if feed is not None:
+        feed.sids.discard(sid)
+        if not feed.sids:
+            del feeds[code]
+    leave_room(code)
+    leave_room(f"{code}/watch/{encodings.get(sid, ENCODING_JSON)}")
+
+
+def target_sid(game, data):
+    # Clients name targets by seat; sids never leave the server
+    seat = data.get("target")
+    if not isinstance(seat, int) or not 0 <= seat < len(game.players):
+        return None
+    return game.players[seat].sid
+
+
+def join_game_rooms(code):
+    join_room(code)
+    join_room(f"{code}/{encodings.get(request.sid, ENCODING_JSON)}")
+
+
+def replay_states(game, partial_states):
+    # Animate Flip Three draws frame by frame without holding up the handler
+    if not partial_states:
+        broadcast_state(game, extra={"end_pending": True})
+        return
+    broadcast_state(game, state=partial_states[0])
+    if len(partial_states) == 1:
+        broadcast_state(game, extra={"end_pending": True})
+        return
+    token = object()
+    replays[game.code] = token
+    socketio.start_background_task(_run_replay, game, partial_states[1:], token)
+
+
+def _run_replay(game, frames, token):
+    # Sleeps happen outside the game lock so other events for the table keep flowing
+    for elem in frames:
+        sleep(REPLAY_FRAME_DELAY, "replay")
+        with registry.lock(game.code):
+            if replays.get(game.code) is not token:
+                return
+            broadcast_state(game, state=elem, supersede=False)
+    with registry.lock(game.code):
+        if replays.get(game.code) is not token:
+            return
+        del replays[game.code]
+        broadcast_state(game, extra={"end_pending": True}, supersede=False)
+
+
+# ---------- History ----------
+
+def record_match(game):
+    # Hands the finished match to the background writer, once
+    if history is None or game.code in recorded:
+        return
+    recorded.add(game.code)
+    history.record(match_record(game, log_path(game.code) if LOG_DIR else None))
+
+
+# ---------- Bots ----------
+
+def bots_waited_on(game):
+    # A bot's move, or a round reset that no human client is around to trigger. Runs on every
+    # broadcast, so it only looks at whose decision it is; _run_bots asks the policy
+    return waiting_bot(game) is not None or (game.pending_round_reset and not humans_connected(game))
+
+
+def wake_bots(game):
+    # Called under the game lock after every state change; one bot loop per game at most
+    if game.code not in bot_tasks and bots_waited_on(game):
+        bot_tasks.add(game.code)
+        socketio.start_background_task(_run_bots, game.code)
+
+
+def _run_bots(code):
+    # Off the event thread: think, then play one move under the game lock, until humans are up
+    while True:
+        sleep(BOT_THINK_DELAY, "bot")
+        game = registry.get(code)
+        if game is None:
+            bot_tasks.discard(code)
+            return
+        with registry.lock(code):
+            if code in replays:
+                continue   # let the Flip Three animation finish first
+            if game.pending_round_reset and not humans_connected(game):
+                game.proceed_round()
+                registry.save(game)
+                broadcast_state(game)
+                continue
+            move = next_move(game)
+            if move is None:
+                bot_tasks.discard(code)
+                return
+            _, method, args = move
+            accepted = game.actions
+            res = getattr(game, method)(*args)
+            if game.actions == accepted:
+                # Rejected: retrying the same move would spin forever
+                bot_tasks.discard(code)
+                return
+            registry.save(game)
+            if method in ("hit", "stay"):
+                broadcast_state(game)
+            else:
+                replay_states(game, res or [])
+
+
+def create_bot_game(strategies):
+    # A table of bots only, started at once (soak and load testing)
+    ensure_sweeper()
+    # The owner is known before the game exists, so the log's first snapshot names it
+    owner_id = str(uuid.uuid4())
+    game = new_game(owner_id)
+    for idx, spec in enumerate(strategies):
+        game.add_player(f"Bot {idx + 1}", None, owner_id if idx == 0 else None, bot=spec)
+    registry.add(game)
+    with registry.lock(game.code):
+        game.start(game.players[0].sid)
+        broadcast_state(game)
+    return game
+
+
+def soak_loop(games, strategies):
+    # Keep `games` bot-only games in play, replacing each one as it finishes
+    live = []
+    while True:
+        live = [g for g in live if g.match_winner is None and g.code in registry]
+        while len(live) < games:
+            live.append(create_bot_game(strategies))
+        socketio.sleep(1)
+
+
+# ---------- Tournaments ----------
+
+def tournament_room(code):
+    return f"tournament/{code}"
+
+
+def broadcast_tournament(t):
+    socketio.emit("tournament", t.to_dict(), room=tournament_room(t.code))
+
+
+def seat_connection(sid, t, code):
+    # Move a connected entrant from their previous table (if any) to this one
+    previous = registry.for_sid(sid)
+    encoding = encodings.get(sid, ENCODING_JSON)
+    if previous is not None:
+        leave_room(previous.code, sid=sid, namespace="/")
+        leave_room(f"{previous.code}/{encoding}", sid=sid, namespace="/")
+    registry.attach(sid, code)
+    join_room(code, sid=sid, namespace="/")
+    join_room(f"{code}/{encoding}", sid=sid, namespace="/")
+    socketio.emit("tournament_table", {"tournament": t.code, "code": code}, to=sid)
+
+
+def open_tables(t):
+    # One started game per table of the current bracket round; bots play at once
+    for idx, table in enumerate(t.tables):
+        if table.winner is not None:
+            continue   # a bye
+        # The first seat owns the table; it is named before the log's first snapshot
+        game = new_game(t.entrants[table.seats[0]].player_id)
+        for e in table.seats:
+            entrant = t.entrants[e]
+            sid = None if entrant.bot else entrant_sids.get(entrant.player_id)
+            game.add_player(entrant.name, sid, entrant.player_id, bot=entrant.bot)
+        registry.add(game)
+        table.code = game.code
+        table_of[game.code] = (t.code, idx)
+        with registry.lock(game.code):
+            game.start_for_owner()
+            for p in game.players:
+                if p.bot is None and p.sid is not None:
+                    seat_connection(p.sid, t, game.code)
+            registry.save(game)
+            broadcast_state(game)
+
+
+def table_finished(game, winner):
+    # A table's match is decided: record it, and seat the next round once every table is
+    t_code, idx = table_of.pop(game.code)
+    with tournament_lock:
+        t = tournaments.get(t_code)
+        if t is None:
+            return
+        points = {t.index_of(p.player_id): p.total_score for p in game.players}
+        if t.record(idx, t.index_of(winner.player_id), points) and t.champion is None:
+            t.advance()
+            open_tables(t)
+        broadcast_tournament(t)
+
+
+def current_table(t, player_id):
+    idx = t.index_of(player_id)
+    return next((table.code for table in t.tables if idx in table.seats and table.winner is None), None)
+
+
+@on("create_tournament")
+def create_tournament(data):
+    # Organiser creates the bracket: optionally as an entrant, plus any number of bots
+    ensure_sweeper()
+    bots = data.get("bots") or []
+    if not all(spec in BOT_STRATEGIES for spec in bots):
+        emit("error", f"Bots play one of {sorted(BOT_STRATEGIES)}")
+        return
+    try:
+        t = Tournament(codes.allocate(), int(data.get("table_size", 4)), owner_player_id=data.get("player_id"))
+    except ValueError as exc:
+        emit("error", str(exc))
+        return
+    with tournament_lock:
+        if data.get("name") and data.get("player_id"):
+            t.add(data["name"], player_id=data["player_id"])
+            entrant_sids[data["player_id"]] = request.sid
+        for idx, spec in enumerate(bots):
+            t.add(f"Bot {idx + 1}", bot=spec)
+        tournaments[t.code] = t
+        join_room(tournament_room(t.code))
+        emit("tournament", t.to_dict())
+
+
+@on("join_tournament")
+def join_tournament(data):
+    with tournament_lock:
+        t = tournaments.get(data.get("code"))
+        if t is None:
+            emit("error", "Tournament not found")
+            return
+        if t.index_of(data.get("player_id")) is None and not t.add(data["name"], player_id=data.get("player_id")):
+            emit("error", "The tournament has started or the name is taken.")
+            return
+        entrant_sids[data["player_id"]] = request.sid
+        join_room(tournament_room(t.code))
+        broadcast_tournament(t)
+
+
+@on("watch_tournament")
+def watch_tournament(data):
+    # Standings for anyone; an entrant coming back is also seated at their current table
+    player_id = data.get("player_id")
+    with tournament_lock:
+        t = tournaments.get(data.get("code"))
+        if t is None:
+            emit("error", "Tournament not found")
+            return
+        join_room(tournament_room(t.code))
+        emit("tournament", t.to_dict())
+        if t.index_of(player_id) is None:
+            return
+        entrant_sids[player_id] = request.sid
+        code = current_table(t, player_id)
+    # Outside the tournament lock: finishing tables take their game lock first, then that one
+    game = registry.get(code) if code is not None else None
+    if game is None:
+        return
+    stop_watching(request.sid)
+    with registry.lock(code):
+        player = game.get_player_by_player_id(player_id)
+        if player is None:
+            return
+        game.set_sid(player, request.sid)
+        seat_connection(request.sid, t, code)
+        registry.save(game)
+        broadcast_state(game, skip_sid=request.sid)
+
+
+@on("start_tournament")
+def start_tournament(data):
+    with tournament_lock:
+        t = tournaments.get(data.get("code"))
+        if t is None or t.started or data.get("player_id") != t.owner_player_id:
+            return
+        if len(t.entrants) < 2:
+            emit("error", "A tournament needs at least two entrants")
+            return
+        t.advance()
+        open_tables(t)
+        broadcast_tournament(t)
+
+
+# ---------- Connection ----------
+
+@on("connect")
+def connect(auth=None):
+    # Clients may ask for the compact encoding; anything else gets plain JSON
+    encoding = (auth or {}).get("encoding")
+    encodings[request.sid] = encoding if encoding in ENCODINGS else ENCODING_JSON
+    if encodings[request.sid] == ENCODING_COMPACT:
+        emit("codec", codec_table())
+
+
 # ---------- Game creation / joining ----------
 
-@socketio.on("create_game")
+@on("create_game")
 def create_game(data):
-    game = Game(owner_player_id=data.get("player_id"))
+    stop_watching(request.sid)
+    ensure_sweeper()
+    game = new_game(data.get("player_id"))
     game.add_player(
         data["name"],
         request.sid,
         data.get("player_id")
     )
 
-    games[game.code] = game
-    player_game[request.sid] = game.code
-    join_room(game.code)
+    registry.add(game)
+    registry.attach(request.sid, game.code)
+    join_game_rooms(game.code)
 
-    emit("state", game.to_dict())
+    with registry.lock(game.code):
+        send_snapshot(game)
 
 
-@socketio.on("join_game")
+@on("join_game")
 def join_game(data):
-    game = games.get(data["code"])
+    game = find_game(data["code"])
     if not game:
         emit("error", "Game not found")
         return
+    stop_watching(request.sid)
 
-    player = game.add_player(
-        data["name"],
-        request.sid,
-        data.get("player_id")
-    )
+    with registry.lock(game.code):
+        player = game.add_player(
+            data["name"],
+            request.sid,
+            data.get("player_id")
+        )
 
-    if not player:
-        # Check for duplicate name to provide accurate message
-        name_exists = any(p.name.strip().lower() == data["name"].strip().lower() for p in game.players)
-        if name_exists:
-            emit("error", "A player with the name you chose is already in the game.")
-        else:
-            emit("error", "Unable to join")
-        return
+        if not player:
+            # Check for duplicate name to provide accurate message
+            if game.has_name(data["name"]):
+                emit("error", "A player with the name you chose is already in the game.")
+            else:
+                emit("error", "Unable to join")
+            return
 
-    player_game[request.sid] = game.code
-    join_room(game.code)
-    socketio.emit("state", game.to_dict(), room=game.code)
+        registry.attach(request.sid, game.code)
+        join_game_rooms(game.code)
+        registry.save(game)
+        broadcast_state(game, skip_sid=request.sid)
+        send_snapshot(game)
 
 
-@socketio.on("rejoin_game")
+@on("rejoin_game")
 def rejoin_game(data):
-    game = games.get(data["code"])
+    game = find_game(data["code"])
     if not game:
         return
 
-    player = game.get_player_by_player_id(data["player_id"])
-    if not player:
+    with registry.lock(game.code):
+        player = game.get_player_by_player_id(data["player_id"])
+        if not player:
+            return
+
+        game.set_sid(player, request.sid)
+        registry.attach(request.sid, game.code)
+        join_game_rooms(game.code)
+        registry.save(game)
+
+        broadcast_state(game, skip_sid=request.sid)
+        send_snapshot(game)
+
+
+@on("watch_game")
+def watch_game(data):
+    # Read-only: the spectator is never attached to the game, so game_action handlers ignore it
+    game = find_game(data.get("code"))
+    if not game:
+        emit("error", "Game not found")
+        return
+    if registry.for_sid(request.sid) is not None:
+        return
+    stop_watching(request.sid)
+    encoding = encodings.get(request.sid, ENCODING_JSON)
+    with registry.lock(game.code):
+        feed = feeds.setdefault(game.code, SpectatorFeed(SPECTATOR_RATE))
+        if feed.stream.last is None:
+            feed.stream.push(public_state(game))
+        feed.sids.add(request.sid)
+        watching[request.sid] = game.code
+        join_room(game.code)
+        join_room(f"{game.code}/watch/{encoding}")
+        emit("state", measured(wire(feed.stream.snapshot(), encoding), "state", encoding))
+
+
+@on("add_bot")
+@game_action
+def add_bot(game, data=None):
+    # The owner fills an empty seat before the game starts
+    owner = game.get_player_by_sid(request.sid)
+    if game.started or not owner or owner.player_id != game.owner_player_id:
         return
+    strategy = (data or {}).get("strategy") or BOT_STRATEGY
+    if strategy not in BOT_STRATEGIES:
+        emit("error", f"Bots play one of {sorted(BOT_STRATEGIES)}")
+        return
+    name = next(f"Bot {n}" for n in range(1, len(game.players) + 2) if not game.has_name(f"Bot {n}"))
+    game.add_player(name, None, bot=strategy)
+    broadcast_state(game)
 
-    player.sid = request.sid
-    player_game[request.sid] = game.code
-    join_room(game.code)
 
-    emit("state", game.to_dict(), room=game.code)
+@on("request_state")
+@game_action
+def request_state(game):
+    send_snapshot(game)
 
 
-@socketio.on("start_game")
-def start_game():
-    game = games.get(player_game.get(request.sid))
-    if game and game.start(request.sid):
-        socketio.emit("state", game.to_dict(), room=game.code)
+@on("start_game")
+@game_action
+def start_game(game):
+    if game.start(request.sid):
+        broadcast_state(game)
 
 
 # ---------- Gameplay ----------
 
-@socketio.on("hit")
-def hit():
-    game = games.get(player_game.get(request.sid))
-    if game:
-        game.hit(request.sid)
-        socketio.emit("state", game.to_dict(), room=game.code)
-
-
-@socketio.on("stay")
-def stay():
-    game = games.get(player_game.get(request.sid))
-    if game:
-        game.stay(request.sid)
-        socketio.emit("state", game.to_dict(), room=game.code)
-
-@socketio.on("freeze_target")
-def freeze_target(data):
-    game = games.get(player_game.get(request.sid))
-    if game:
-        partial_states = game.apply_freeze(request.sid, data["target_sid"])
-        if partial_states:
-            for idx, elem in enumerate(partial_states):
-                socketio.emit("state", elem, room=game.code)
-                if idx < len(partial_states) - 1:
-                    socketio.sleep(1)
-            resp = game.to_dict()
-            resp.update({"end_pending": True})
-            socketio.emit("state", resp, room=game.code)
-        else:
-            resp = game.to_dict()
-            resp.update({"end_pending": True})
-            socketio.emit("state", resp, room=game.code)
-
-@socketio.on("flip3_target")
-def flip3_target(data):
-    game = games.get(player_game.get(request.sid))
-    if game:
-        partial_states = game.apply_flip3(request.sid, data["target_sid"])
-        if partial_states:
-            for idx, elem in enumerate(partial_states):
-                socketio.emit("state", elem, room=game.code)
-                if idx < len(partial_states) - 1:
-                    socketio.sleep(1)
-            resp = game.to_dict()
-            resp.update({"end_pending": True})
-            socketio.emit("state", resp, room=game.code)
-        else:
-            resp = game.to_dict()
-            resp.update({"end_pending": True})
-            socketio.emit("state", resp, room=game.code)
-
-@socketio.on("discard_choose_target")
-def discard_choose_target(data):
-    game = games.get(player_game.get(request.sid))
-    if game:
-        # chooses which player to use the discard on (could be self)
-        partial_states = game.apply_discard_choose_target(
-            request.sid,
-            data["target_sid"],
-            data["card_idx"],
-        )
-        if partial_states:
-            for idx, elem in enumerate(partial_states):
-                socketio.emit("state", elem, room=game.code)
-                if idx < len(partial_states) - 1:
-                    socketio.sleep(1)
-            resp = game.to_dict()
-            resp.update({"end_pending": True})
-            socketio.emit("state", resp, room=game.code)
-        else:
-            resp = game.to_dict()
-            resp.update({"end_pending": True})
-            socketio.emit("state", resp, room=game.code)
-
-@socketio.on("discard_choose_card")
-def discard_choose_card(data):
-    game = games.get(player_game.get(request.sid))
-    if game:
-        # The actual player discards a card of his choice
-        partial_states = game.apply_discard_choose_card(
-            request.sid,
-            data["card_idx"],
-        )
-        if partial_states:
-            for idx, elem in enumerate(partial_states):
-                socketio.emit("state", elem, room=game.code)
-                if idx < len(partial_states) - 1:
-                    socketio.sleep(1)
-            resp = game.to_dict()
-            resp.update({"end_pending": True})
-            socketio.emit("state", resp, room=game.code)
-        else:
-            resp = game.to_dict()
-            resp.update({"end_pending": True})
-            socketio.emit("state", resp, room=game.code)
-
-@socketio.on("proceed_round")
-def proceed_round():
-    game = games.get(player_game.get(request.sid))
-    if game:
-        game.proceed_round()
-        socketio.emit("state", game.to_dict(), room=game.code)
+@on("hit")
+@game_action
+def hit(game):
+    game.hit(request.sid)
+    broadcast_state(game)
+
+
+@on("stay")
+@game_action
+def stay(game):
+    game.stay(request.sid)
+    broadcast_state(game)
+
+@on("freeze_target")
+@game_action
+def freeze_target(game, data):
+    partial_states = game.apply_freeze(request.sid, target_sid(game, data))
+    replay_states(game, partial_states or [])
+
+@on("flip3_target")
+@game_action
+def flip3_target(game, data):
+    partial_states = game.apply_flip3(request.sid, target_sid(game, data))
+    replay_states(game, partial_states or [])
+
+@on("discard_choose_target")
+@game_action
+def discard_choose_target(game, data):
+    # chooses which player to use the discard on (could be self)
+    partial_states = game.apply_discard_choose_target(
+        request.sid,
+        target_sid(game, data),
+        data["card_idx"],
+    )
+    replay_states(game, partial_states or [])
+
+@on("discard_choose_card")
+@game_action
+def discard_choose_card(game, data):
+    # The actual player discards a card of his choice
+    partial_states = game.apply_discard_choose_card(
+        request.sid,
+        data["card_idx"],
+    )
+    replay_states(game, partial_states or [])
+
+@on("proceed_round")
+@game_action
+def proceed_round(game):
+    game.proceed_round()
+    broadcast_state(game)
 
 # ---------- Disconnect handling ----------
 
-@socketio.on("disconnect")
+@on("disconnect")
 def disconnect():
-    code = player_game.pop(request.sid, None)
+    stop_watching(request.sid)
+    with tournament_lock:
+        for player_id in [pid for pid, sid in entrant_sids.items() if sid == request.sid]:
+            del entrant_sids[player_id]
+    encodings.pop(request.sid, None)
+    overlays.forget(request.sid)
+    code = registry.detach(request.sid)
     if not code:
         return
 
-    game = games.get(code)
+    game = registry.get(code)
     if not game:
         return
 
-    # Remove sid mapping only (player object stays for reconnect)
-    for p in game.players:
-        if p.sid == request.sid:
-            p.sid = None
+    with registry.lock(code):
+        # Remove sid mapping only (player object stays for reconnect)
+        game.disconnect(request.sid)
 
-    socketio.emit("state", game.to_dict(), room=code)
+        registry.save(game)
+        broadcast_state(game)
 
 
 if __name__ == "__main__":
+    if SOAK_GAMES:
+        socketio.start_background_task(soak_loop, SOAK_GAMES, SOAK_BOTS.split(","))
     socketio.run(app, host="0.0.0.0", debug=True)
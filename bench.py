@@ -0,0 +1,272 @@
+"""Micro-benchmarks for the game.py hot paths, compared against a stored baseline.
+
+    python bench.py --save             # record .benchmarks/baseline.json on this machine
+    python bench.py                    # run and compare; exit 1 if anything got slower
+    python bench.py -k cascade --tolerance 0.1
+
+Timings are timeit-style: each benchmark is calibrated to run for about --min-time seconds,
+repeated, and the best per-operation time is kept. Games use seeded or deterministic decks
+(deterministic_decks.py), so every run does exactly the same work.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from itertools import repeat
+
+from deterministic_decks import deck
+from game import Deck, Game, STATES_PUBLIC
+
+BASELINE = os.path.join(".benchmarks", "baseline.json")
+BENCHMARKS = {}   # name -> make(n), returning a callable that performs n operations
+
+
+def benchmark(name):
+    def register(make):
+        BENCHMARKS[name] = make
+        return make
+    return register
+
+
+def table(n_players=4, cards=None, seed=1):
+    g = Game(owner_player_id="p0", cards=cards, state_mode=STATES_PUBLIC, seed=seed)
+    for i in range(n_players):
+        g.add_player(f"P{i}", f"p{i}", f"p{i}")
+    g.start("p0")
+    return g
+
+
+def mid_round(seed=1):
+    # Four players with a few cards each and nothing pending
+    g = table(seed=seed)
+    for _ in range(12):
+        if g.pending_actions or g.pending_round_reset:
+            break
+        p = g.current_player()
+        g.hit(p.sid)
+    return g
+
+
+@benchmark("deck_init")
+def _(n):
+    d = Deck(seed=1)
+    def run():
+        for _ in repeat(None, n):
+            d._init_deck()
+    return run
+
+
+@benchmark("deck_draw")
+def _(n):
+    d = Deck(seed=1)
+    def run():
+        for _ in repeat(None, n):
+            d.draw()
+    return run
+
+
+@benchmark("round_score")
+def _(n):
+    p = mid_round().players[0]
+    def run():
+        for _ in repeat(None, n):
+            p.round_score()
+    return run
+
+
+@benchmark("player_to_dict_cached")
+def _(n):
+    p = mid_round().players[0]
+    def run():
+        for _ in repeat(None, n):
+            p.to_dict()
+    return run
+
+
+@benchmark("player_to_dict")
+def _(n):
+    p = mid_round().players[0]
+    def run():
+        for _ in repeat(None, n):
+            p.total_score = 0   # invalidates the cache, as any real change does
+            p.to_dict()
+    return run
+
+
+@benchmark("game_to_dict")
+def _(n):
+    g = mid_round()
+    def run():
+        for _ in repeat(None, n):
+            g.to_dict()
+    return run
+
+
+@benchmark("game_public_dict")
+def _(n):
+    g = mid_round()
+    def run():
+        for _ in repeat(None, n):
+            g.public_dict()
+    return run
+
+
+@benchmark("game_hit")
+def _(n):
+    games = [table(seed=i) for i in range(n)]
+    def run():
+        for g in games:
+            g.hit("p0")
+    return run
+
+
+def _prepared(n, name, moves, pending):
+    # n games on a deterministic deck, played up to the prompt that starts the cascade
+    games = []
+    for _ in range(n):
+        g = table(n_players=2, cards=deck(name))
+        for sid in moves:
+            g.hit(sid)
+        assert g.pending_actions and g.pending_actions[-1]["action"] == pending, name
+        games.append(g)
+    return games
+
+
+@benchmark("cascade_flip3_chain")
+def _(n):
+    # Flip Three drawing another Flip Three: the inner one resolves, then the outer resumes
+    games = _prepared(n, "flip3_chain", ["p0"], "flip3")
+    def run():
+        for g in games:
+            g.apply_flip3("p0", "p1")
+            g.apply_flip3("p1", "p0")
+    return run
+
+
+@benchmark("cascade_freeze")
+def _(n):
+    games = _prepared(n, "freeze", ["p0", "p1", "p0", "p1"], "freeze")
+    def run():
+        for g in games:
+            g.apply_freeze("p1", "p0")
+    return run
+
+
+@benchmark("cascade_discard")
+def _(n):
+    games = _prepared(n, "discard", ["p0", "p1", "p0", "p1", "p0", "p1"], "discard_choose_target")
+    def run():
+        for g in games:
+            g.apply_discard_choose_target("p1", "p0", g.pending_actions[-1]["card_idx"])
+            g.apply_discard_choose_card("p0", 0)
+    return run
+
+
+@benchmark("cascade_flip3_discard")
+def _(n):
+    # Flip Three that draws a Discard mid-way: the draws resume after both discard steps
+    games = _prepared(n, "flip3_discard", ["p0"], "flip3")
+    def run():
+        for g in games:
+            g.apply_flip3("p0", "p1")
+            g.apply_discard_choose_target("p1", "p1", g.pending_actions[-1]["card_idx"])
+            g.apply_discard_choose_card("p1", 0)
+    return run
+
+
+def measure(make, min_time=0.2, repeats=7):
+    """Best seconds per operation."""
+    n = 1
+    while True:
+        run = make(n)
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / repeats or n >= 1 << 20:
+            break
+        n *= 2 if elapsed == 0 else max(2, min(10, int(min_time / repeats / elapsed) + 1))
+    best = elapsed
+    for _ in range(repeats - 1):
+        run = make(n)
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best / n
+
+
+def run_all(pattern=None, min_time=0.2, repeats=7):
+    return {
+        name: measure(make, min_time, repeats)
+        for name, make in BENCHMARKS.items()
+        if not pattern or pattern in name
+    }
+
+
+def compare(results, baseline, tolerance):
+    """(report lines, names that got slower than baseline * (1 + tolerance))."""
+    lines, regressions = [], []
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if base is None:
+            lines.append(f"{name:<24} {seconds * 1e6:10.2f}us   (new)")
+            continue
+        ratio = seconds / base
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        lines.append(f"{name:<24} {seconds * 1e6:10.2f}us  {base * 1e6:10.2f}us  x{ratio:5.2f}{flag}")
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="pattern", help="only benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown (0.3 = 30%%)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per benchmark")
+    parser.add_argument("--retries", type=int, default=3, help="re-runs of apparent regressions")
+    args = parser.parse_args(argv)
+
+    results = run_all(args.pattern, args.min_time)
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "python": sys.version.split()[0],
+                "machine": platform.machine(),
+                "results": results,
+            }, f, indent=2)
+        for name, seconds in results.items():
+            print(f"{name:<24} {seconds * 1e6:10.2f}us")
+        print(f"saved {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        for name, seconds in results.items():
+            print(f"{name:<24} {seconds * 1e6:10.2f}us")
+        print(f"no baseline at {args.baseline}; run with --save to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    lines, regressions = compare(results, baseline, args.tolerance)
+    for _ in range(args.retries):
+        if not regressions:
+            break
+        # A slowdown has to survive a re-run: single timings on a busy machine are noisy
+        for name in regressions:
+            results[name] = min(results[name], measure(BENCHMARKS[name], args.min_time))
+        lines, regressions = compare(results, baseline, args.tolerance)
+    print(f"{'benchmark':<24} {'now':>12} {'baseline':>12}")
+    print("\n".join(lines))
+    if regressions:
+        print(f"FAILED: {len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
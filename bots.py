@@ -0,0 +1,66 @@
+"""Server-side bot seats: which bot the game is waiting on, and what its policy does.
+
+Bots are players added with Game.add_player(..., bot=spec); spec is a policies.make_policy
+spec such as "threshold:20". The server's scheduler (app.py) applies the moves found here.
+"""
+import functools
+
+from policies import make_policy
+
+
+@functools.lru_cache(maxsize=None)
+def policy_for(spec):
+    return make_policy(spec)
+
+
+def humans_connected(game):
+    return any(p.bot is None and p.sid is not None for p in game.players)
+
+
+def _target_sid(player, target):
+    # A disconnected target cannot be picked through the sid API; fall back to the bot itself
+    return target.sid if target.sid is not None else player.sid
+
+
+def waiting_bot(game):
+    """The bot the game waits on for its next decision, or None; cheap, as no policy runs."""
+    if not game.started or game.match_winner or game.pending_round_reset:
+        return None
+    if game.pending_actions:
+        action = game.pending_actions[-1]
+        kind = action["action"]
+        if kind == "draw3":
+            return None
+        player = game.get_player_by_player_id(action["target_id" if kind == "discard_choose_card" else "player_id"])
+    else:
+        player = game.current_player()
+        if player.finished:
+            return None
+    return player if player is not None and player.bot is not None else None
+
+
+def next_move(game):
+    """(bot player, Game method name, args) for the decision the game waits on, or None when
+    that decision belongs to a human (or nothing is pending)."""
+    player = waiting_bot(game)
+    if player is None:
+        return None
+    policy = policy_for(player.bot)
+
+    if game.pending_actions:
+        action = game.pending_actions[-1]
+        kind = action["action"]
+        if kind == "freeze":
+            return player, "apply_freeze", (player.sid, _target_sid(player, policy.choose_freeze_target(game, player)))
+        if kind == "flip3":
+            return player, "apply_flip3", (player.sid, _target_sid(player, policy.choose_flip3_target(game, player)))
+        if kind == "discard_choose_target":
+            target = policy.choose_discard_target(game, player)
+            return player, "apply_discard_choose_target", (player.sid, _target_sid(player, target), action["card_idx"])
+        if kind == "discard_choose_card":
+            return player, "apply_discard_choose_card", (player.sid, policy.choose_discard_card(game, player))
+        return None
+
+    if policy.hit_or_stay(game, player):
+        return player, "hit", (player.sid,)
+    return player, "stay", (player.sid,)
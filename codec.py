@@ -0,0 +1,68 @@
+"""Compact wire encoding for state snapshots and patches.
+
+Known keys are replaced by their index in KEYS (as a string, so JSON stays valid) and
+cards by their small-int Card code ([code, target] when annotated). The client receives
+table() once at connect and reverses both substitutions; unknown keys and ad-hoc cards
+pass through unchanged, so the encoding never loses information.
+"""
+from game import Card, CANONICAL_CARDS
+
+ENCODING_JSON = "json"
+ENCODING_COMPACT = "compact"
+ENCODINGS = (ENCODING_JSON, ENCODING_COMPACT)
+
+KEYS = [
+    # game
+    "code", "started", "round", "turn", "pending_round_reset",
+    "pending_freeze", "pending_flip3", "pending_discard_choose_target", "discard_choose_target_info",
+    "pending_discard_choose_card", "discard_choose_card_info", "card_idx", "initiator_sid",
+    "match_winner", "players", "owner_player_id", "version", "owner", "initiator",
+    # player
+    "player_id", "sid", "seat", "bot", "connected", "name", "round_score", "total_score", "numbers", "cards", "cards+",
+    "second_chance", "busted", "finished", "flip7",
+    # patch envelope
+    "base", "set", "extra", "end_pending",
+]
+KEY_CODES = {key: str(idx) for idx, key in enumerate(KEYS)}
+CARD_LIST_KEYS = ("cards", "cards+")
+
+_CARD_CODES = {
+    (card.type.value, card.value): card.code
+    for card in (Card.from_code(code) for code in range(CANONICAL_CARDS))
+}
+
+
+def table():
+    # Sent to compact clients once, at connect
+    return {
+        "keys": KEYS,
+        "cards": [Card.from_code(code).to_dict() for code in range(CANONICAL_CARDS)],
+    }
+
+
+def encode_card(card):
+    code = _CARD_CODES.get((card["type"], card["value"]))
+    if code is None:
+        return card
+    if card.get("target") is not None:
+        return [code, card["target"]]
+    return code
+
+
+def encode(obj):
+    if isinstance(obj, dict):
+        res = {}
+        for key, value in obj.items():
+            if key in CARD_LIST_KEYS:
+                value = [encode_card(c) for c in value]
+            else:
+                value = encode(value)
+            res[KEY_CODES.get(key, key)] = value
+        return res
+    if isinstance(obj, list):
+        return [encode(x) for x in obj]
+    return obj
+
+
+def wire(payload, encoding):
+    return encode(payload) if encoding == ENCODING_COMPACT else payload
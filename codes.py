@@ -0,0 +1,108 @@
+"""Unique game codes.
+
+CodeAllocator walks the whole code space in a shuffled order: the n-th code is the
+base-len(alphabet) spelling of a keyed permutation of n, so no code repeats until every one
+has been handed out. The permutation is a Feistel network over the smallest even number of
+bits covering the space, keyed by a secret and cycle-walked back into range; without the key,
+codes already seen say nothing about the next ones (codes are what let anyone join or watch a
+table). Each allocation is O(1) however full the space is. Codes of evicted games go on a
+free list and are reused only once the fresh ones run out, so a stale link rarely reaches a new
+table. The in_use check covers codes the counter cannot know about (the shared store, action logs,
+tables restored after a restart).
+"""
+import hashlib
+import random
+import threading
+from collections import OrderedDict
+
+from game import CODE_ALPHABET, CODE_LENGTH
+
+FEISTEL_ROUNDS = 6
+
+
+class CodesExhausted(RuntimeError):
+    pass
+
+
+class CodeAllocator:
+    def __init__(self, length=CODE_LENGTH, alphabet=CODE_ALPHABET, in_use=None, accept=None, rng=None):
+        if length < 1 or len(alphabet) < 2 or len(set(alphabet)) != len(alphabet):
+            raise ValueError("codes need a length of at least 1 and two or more distinct characters")
+        rng = rng or random.SystemRandom()
+        self.length = length
+        self.alphabet = alphabet
+        self.size = len(alphabet) ** length
+        self.in_use = in_use or (lambda code: False)   # code -> True when some table already has it
+        self.accept = accept or (lambda code: True)    # code -> False for codes this worker may not use
+        self._half = max(1, ((self.size - 1).bit_length() + 1) // 2)   # bits per Feistel half
+        self._mask = (1 << self._half) - 1
+        self._key = rng.getrandbits(128).to_bytes(16, "big")   # secret: it alone orders the codes
+        self._next = 0
+        self._free = OrderedDict()   # released codes, oldest first
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        # Fresh codes plus released ones (some may turn out to be in use)
+        return self.size - self._next + len(self._free)
+
+    def _round(self, i, half):
+        data = bytes([i]) + half.to_bytes(self._half // 8 + 1, "big")
+        return int.from_bytes(hashlib.blake2b(data, key=self._key).digest(), "big") & self._mask
+
+    def _encrypt(self, x):
+        left, right = x >> self._half, x & self._mask
+        for i in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ self._round(i, right)
+        return (left << self._half) | right
+
+    def _decrypt(self, x):
+        left, right = x >> self._half, x & self._mask
+        for i in reversed(range(FEISTEL_ROUNDS)):
+            left, right = right ^ self._round(i, left), left
+        return (left << self._half) | right
+
+    def _walk(self, step, x):
+        # The network permutes [0, 4**half), under four times the space: step until back in it
+        x = step(x)
+        while x >= self.size:
+            x = step(x)
+        return x
+
+    def code_at(self, n):
+        idx = self._walk(self._encrypt, n)
+        chars = []
+        for _ in range(self.length):
+            idx, digit = divmod(idx, len(self.alphabet))
+            chars.append(self.alphabet[digit])
+        return "".join(chars)
+
+    def position(self, code):
+        # Inverse of code_at
+        idx = 0
+        for c in reversed(code):
+            idx = idx * len(self.alphabet) + self.alphabet.index(c)
+        return self._walk(self._decrypt, idx)
+
+    def valid(self, code):
+        return isinstance(code, str) and len(code) == self.length and all(c in self.alphabet for c in code)
+
+    def allocate(self):
+        with self._lock:
+            while True:
+                if self._next < self.size:
+                    code = self.code_at(self._next)
+                    self._next += 1
+                elif self._free:
+                    code, _ = self._free.popitem(last=False)
+                else:
+                    raise CodesExhausted(f"all {self.size} codes are in use")
+                if self.accept(code) and not self.in_use(code):
+                    return code
+
+    def release(self, code):
+        # Only codes the counter has already passed need remembering; the rest come round anyway
+        if not self.valid(code) or not self.accept(code):
+            return
+        with self._lock:
+            if self.position(code) < self._next:
+                self._free[code] = None
@@ -0,0 +1,78 @@
+PLAYER_KEY = "player_id"
+
+
+def diff_player(old, new):
+    # Only the fields that changed; cards that were appended are shipped as "cards+"
+    changes = {}
+    for key, value in new.items():
+        if key == "cards":
+            old_cards = old.get("cards", [])
+            if value == old_cards:
+                continue
+            if len(value) > len(old_cards) and value[:len(old_cards)] == old_cards:
+                changes["cards+"] = value[len(old_cards):]
+            else:
+                changes["cards"] = value
+        elif old.get(key) != value:
+            changes[key] = value
+    return changes
+
+
+def diff_state(old, new):
+    changes = {}
+    for key, value in new.items():
+        if key != "players" and old.get(key) != value:
+            changes[key] = value
+
+    old_players = old.get("players", [])
+    new_players = new.get("players", [])
+    same_seats = (
+        len(old_players) == len(new_players)
+        # Public states have no player_id; seats are append-only, so the length check covers them
+        and all(a.get(PLAYER_KEY) == b.get(PLAYER_KEY) for a, b in zip(old_players, new_players))
+    )
+    if not same_seats:
+        # Someone joined: resend the whole list rather than describing the reshuffle
+        changes["players"] = new_players
+        return changes, []
+
+    players = []
+    for idx, (a, b) in enumerate(zip(old_players, new_players)):
+        if a is b:
+            continue
+        player_changes = diff_player(a, b)
+        if player_changes:
+            players.append([idx, player_changes])
+    return changes, players
+
+
+class StateStream:
+    """Versioned view of a game's state: full snapshots on demand, patches otherwise."""
+
+    def __init__(self):
+        self.version = 0
+        self.last = None
+
+    def push(self, state):
+        # Returns the patch taking clients from the previous version to this one
+        base = self.version
+        self.version += 1
+        if self.last is None:
+            changes, players = dict(state), []
+        else:
+            changes, players = diff_state(self.last, state)
+        self.last = state
+
+        patch = {"version": self.version, "base": base}
+        if changes:
+            patch["set"] = changes
+        if players:
+            patch["players"] = players
+        return patch
+
+    def snapshot(self):
+        if self.last is None:
+            return None
+        state = dict(self.last)
+        state["version"] = self.version
+        return state
@@ -1,52 +1,25 @@
-# deterministic deck for test/debug (card is drawn from end of list)
-# cards = [
-#     Card(CardType.NUMBER, 6),
-#     Card(CardType.NUMBER, 5),
-#     Card(CardType.NUMBER, 4),
-#     Card(CardType.NUMBER, 3),
-#     Card(CardType.NUMBER, 2),
-#     Card(CardType.NUMBER, 1),
-#     Card(CardType.FLIP_3),
-#     Card(CardType.FLIP_3),
-# ]
+# Deterministic decks for tests, debugging and benchmarks (cards are drawn from the end of the list).
+# Each entry builds a fresh list: Deck(cards=...) pops from the list it is given.
+from game import Card, CardType
 
-# cards = [
-#     Card(CardType.NUMBER, 6),
-#     Card(CardType.NUMBER, 5),
-#     Card(CardType.NUMBER, 4),
-#     Card(CardType.BONUS, "x2"),
-#     Card(CardType.BONUS, "+3"),
-#     Card(CardType.NUMBER, 3),
-#     Card(CardType.NUMBER, 2),
-#     Card(CardType.NUMBER, 1),
-# ]
 
-# cards = [
-#     Card(CardType.FREEZE),
-#     Card(CardType.FREEZE),
-#     Card(CardType.NUMBER, 3),
-#     Card(CardType.NUMBER, 2),
-#     Card(CardType.NUMBER, 1),
-# ]
+def _numbers(*values):
+    return [Card(CardType.NUMBER, v) for v in values]
 
-# cards = [
-#     Card(CardType.NUMBER, 7),
-#     Card(CardType.NUMBER, 6),
-#     Card(CardType.DISCARD),
-#     Card(CardType.NUMBER, 5),
-#     Card(CardType.NUMBER, 4),
-#     Card(CardType.NUMBER, 3),
-#     Card(CardType.NUMBER, 2),
-#     Card(CardType.NUMBER, 1),
-# ]
 
-# cards = [
-#     Card(CardType.NUMBER, 6),
-#     Card(CardType.NUMBER, 5),
-#     Card(CardType.NUMBER, 4),
-#     Card(CardType.NUMBER, 3),
-#     Card(CardType.NUMBER, 1),
-#     Card(CardType.DISCARD),
-#     Card(CardType.NUMBER, 1),
-#     Card(CardType.FLIP_3),
-# ]
\ No newline at end of file
+DECKS = {
+    # Flip Three straight into another Flip Three
+    "flip3_chain": lambda: _numbers(6, 5, 4, 3, 2, 1) + [Card(CardType.FLIP_3), Card(CardType.FLIP_3)],
+    # Bonuses in the middle of a hand, including an off-catalogue +3
+    "bonus": lambda: _numbers(6, 5, 4) + [Card(CardType.BONUS, "x2"), Card(CardType.BONUS, "+3")] + _numbers(3, 2, 1),
+    # Two freezes after the opening numbers
+    "freeze": lambda: [Card(CardType.FREEZE), Card(CardType.FREEZE)] + _numbers(3, 2, 1),
+    # A Discard once everyone holds numbers
+    "discard": lambda: _numbers(7, 6) + [Card(CardType.DISCARD)] + _numbers(5, 4, 3, 2, 1),
+    # Flip Three that draws a Discard, then a duplicate
+    "flip3_discard": lambda: _numbers(6, 5, 4, 3, 1) + [Card(CardType.DISCARD)] + _numbers(1) + [Card(CardType.FLIP_3)],
+}
+
+
+def deck(name):
+    return DECKS[name]()
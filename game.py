@@ -5,10 +5,39 @@ from enum import Enum
 
 WIN_SCORE = 200
 BONUS_FLIP7 = 15
+FLIP7_NUMBERS = 7   # distinct numbers that end a round with the bonus
 
+# What process_pending_actions hands back for each Flip Three draw
+STATES_FULL = "full"      # a full to_dict() snapshot (what the server replays)
+STATES_EVENTS = "events"  # a lightweight {"sid", "card"} draw event
+STATES_NONE = "none"      # nothing (simulations, tests, bots)
+STATES_PUBLIC = "public"  # a public_dict() snapshot (what the server broadcasts)
 
-def generate_code():
-    return "".join(random.choices(string.ascii_uppercase + string.digits, k=5))
+
+# Codes and fresh deck seeds come from OS entropy so they never touch (or depend on) the global RNG
+_system_random = random.SystemRandom()
+
+
+CODE_ALPHABET = string.ascii_uppercase + string.digits
+CODE_LENGTH = 5
+
+
+def generate_code(rng=_system_random, length=CODE_LENGTH, alphabet=CODE_ALPHABET):
+    # Random, so not guaranteed unique: the server hands out codes through codes.CodeAllocator
+    return "".join(rng.choices(alphabet, k=length))
+
+
+def new_seed():
+    return _system_random.getrandbits(63)
+
+
+def _name_key(name):
+    return name.strip().lower()
+
+
+def bot_sid(player_id):
+    # Bots have no socket; this stands in for one so they act through the same sid-based API
+    return "bot:" + player_id
 
 
 class CardType(Enum):
@@ -21,16 +50,114 @@ class CardType(Enum):
 
 
 class Card:
-    def __init__(self, type, value=None, target=None):
-        self.type = type
-        self.value = value
-        self.target = target
+    """Immutable, interned card. Equal cards are the same object and carry a small-int code."""
+
+    __slots__ = ("type", "value", "add", "mult", "code", "_as_dict")
+
+    _interned = {}   # (type, value) -> Card
+    _by_code = []    # code -> Card
+
+    def __new__(cls, type, value=None):
+        card = cls._interned.get((type, value))
+        if card is not None:
+            return card
+
+        add, mult = 0, 1
+        if type == CardType.BONUS:
+            # Parse "+4" / "x2" once instead of on every score
+            if value[0] == "+":
+                add = int(value[1:])
+            elif value[0] == "x":
+                mult = int(value[1:])
+
+        card = object.__new__(cls)
+        for attr, attr_value in (
+            ("type", type),
+            ("value", value),
+            ("add", add),
+            ("mult", mult),
+            ("code", len(cls._by_code)),
+            ("_as_dict", {"type": type.value, "value": value}),
+        ):
+            object.__setattr__(card, attr, attr_value)
+        cls._interned[(type, value)] = card
+        cls._by_code.append(card)
+        return card
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Card is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Card is immutable")
+
+    def __reduce__(self):
+        return (Card, (self.type, self.value))
+
+    def __repr__(self):
+        return f"Card({self.type.name}, {self.value!r})"
+
+    @classmethod
+    def from_code(cls, code):
+        return cls._by_code[code]
+
+    def to_record(self):
+        # Canonical cards travel as their stable code; ad-hoc ones (tests, debug decks) spelled out
+        if self.code < CANONICAL_CARDS:
+            return self.code
+        return [self.type.value, self.value]
+
+    @classmethod
+    def from_record(cls, record):
+        if isinstance(record, int):
+            return cls.from_code(record)
+        return cls(CardType(record[0]), record[1])
 
     def to_dict(self):
-        return {"type": self.type.value, "value": self.value}
+        # Shared between all holders of this card: do not mutate
+        return self._as_dict
+
+
+# Register the canonical cards first so their codes are stable: number n has code n
+for _n in range(13):
+    Card(CardType.NUMBER, _n)
+for _type in (CardType.SECOND_CHANCE, CardType.FREEZE, CardType.FLIP_3, CardType.DISCARD):
+    Card(_type)
+for _value in ("+2", "+4", "+6", "+8", "+10", "x2"):
+    Card(CardType.BONUS, _value)
+CANONICAL_CARDS = len(Card._by_code)
+
+
+def _build_catalogue():
+    cards = []
+    for n in range(1,13):
+        cards += [Card(CardType.NUMBER, n)] * n
+    cards.append(Card(CardType.NUMBER, 0))
+    cards += [Card(CardType.SECOND_CHANCE)] * 3
+    cards += [Card(CardType.FREEZE)] * 3
+    cards += [Card(CardType.FLIP_3)] * 3
+    cards += [Card(CardType.DISCARD)] * 5
+    cards += [
+        Card(CardType.BONUS, "+2"),
+        Card(CardType.BONUS, "+4"),
+        Card(CardType.BONUS, "+6"),
+        Card(CardType.BONUS, "+8"),
+        Card(CardType.BONUS, "+10"),
+        Card(CardType.BONUS, "x2"),
+        Card(CardType.BONUS, "x2"),
+    ]
+    return tuple(cards)
+
+
+# The 100 cards of a full deck, built once and reused by every shuffle
+CARD_CATALOGUE = _build_catalogue()
+
 
 class Deck:
-    def __init__(self, cards=None):
+    """Draw pile. A shuffled deck is fully determined by its seed and how many times it was refilled."""
+
+    def __init__(self, cards=None, seed=None):
+        self.seed = new_seed() if seed is None else seed
+        self.refills = 0
         if cards is None:
             self.cards = self._init_deck()
             self.deterministic = False
@@ -39,51 +166,207 @@ class Deck:
             self.backup = [elem for elem in cards]
             self.deterministic = True
 
+    @staticmethod
+    def order(seed, refill):
+        # The deck used for the given refill (0 = the initial deck) of a seeded deck. A string
+        # seed is hashed whole, so every (seed, refill) pair gets its own order, negative or big
+        cards = list(CARD_CATALOGUE)
+        random.Random(f"{seed}:{refill}").shuffle(cards)
+        return cards
+
     def _init_deck(self):
-        
-        cards = []
-
-        for n in range(1,13):
-            for _ in range(n):
-                cards.append(Card(CardType.NUMBER, n))
-        cards.append(Card(CardType.NUMBER, 0))
-        cards += [Card(CardType.SECOND_CHANCE) for _ in range(3)]
-        cards += [Card(CardType.FREEZE) for _ in range(3)]
-        cards += [Card(CardType.FLIP_3) for _ in range(3)]
-        cards += [Card(CardType.DISCARD) for _ in range(5)]
-        cards += [
-            Card(CardType.BONUS, "+2"),
-            Card(CardType.BONUS, "+4"),
-            Card(CardType.BONUS, "+6"),
-            Card(CardType.BONUS, "+8"),
-            Card(CardType.BONUS, "+10"),
-            Card(CardType.BONUS, "x2"),
-            Card(CardType.BONUS, "x2"),
-        ]
-
-        for _ in range(10):
-            random.shuffle(cards)
+        return Deck.order(self.seed, self.refills)
 
-        return cards
+    def to_record(self):
+        return {
+            "seed": self.seed,
+            "refills": self.refills,
+            "cards": [c.to_record() for c in self.cards],
+            "backup": [c.to_record() for c in self.backup] if self.deterministic else None,
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        deck = cls.__new__(cls)
+        deck.seed = record["seed"]
+        deck.refills = record["refills"]
+        deck.cards = [Card.from_record(c) for c in record["cards"]]
+        deck.deterministic = record["backup"] is not None
+        if deck.deterministic:
+            deck.backup = [Card.from_record(c) for c in record["backup"]]
+        return deck
 
     def draw(self):
         res = self.cards.pop()
         if len(self.cards) == 0:
+            self.refills += 1
             if not self.deterministic:
-                self.cards = self._init_deck() 
+                self.cards = self._init_deck()
             else:
                 self.cards = [elem for elem in self.backup]
         return res
 
 
+class Hand(list):
+    """Card list that keeps its owner's score accumulators in sync on every mutation."""
+
+    def __init__(self, owner, cards=()):
+        super().__init__(cards)
+        self.owner = owner
+        # Per-play annotations (who a freeze/flip3/discard was used on), aligned with the cards
+        self.targets = [None] * len(self)
+
+    def set_target(self, idx, target):
+        self.targets[idx] = target
+        self.owner._rev += 1
+
+    def to_dicts(self):
+        res = []
+        for card, target in zip(self, self.targets):
+            d = card.to_dict()
+            if target is not None:
+                d = dict(d, target=target)
+            res.append(d)
+        return res
+
+    def append(self, card):
+        super().append(card)
+        self.targets.append(None)
+        self.owner._card_added(card)
+
+    def pop(self, idx=-1):
+        card = super().pop(idx)
+        self.targets.pop(idx)
+        self.owner._card_removed(card)
+        return card
+
+    def remove(self, card):
+        self.pop(self.index(card))
+
+    def extend(self, cards):
+        super().extend(cards)
+        self.targets.extend([None] * (len(self) - len(self.targets)))
+        self.owner._recount()
+
+    def insert(self, idx, card):
+        super().insert(idx, card)
+        self.targets.insert(idx, None)
+        self.owner._card_added(card)
+
+    def clear(self):
+        super().clear()
+        self.targets.clear()
+        self.owner._recount()
+
+    def __setitem__(self, idx, value):
+        super().__setitem__(idx, value)
+        if isinstance(idx, slice):
+            self.targets = [None] * len(self)
+        else:
+            self.targets[idx] = None
+        self.owner._recount()
+
+    def __delitem__(self, idx):
+        super().__delitem__(idx)
+        del self.targets[idx]
+        self.owner._recount()
+
+
+class NumberSet(set):
+    """Set of held numbers that keeps a running sum for its owner."""
+
+    def __init__(self, owner, numbers=()):
+        super().__init__(numbers)
+        self.owner = owner
+
+    def add(self, value):
+        if value not in self:
+            super().add(value)
+            self.owner._number_sum += value
+            self.owner._rev += 1
+
+    def remove(self, value):
+        super().remove(value)
+        self.owner._number_sum -= value
+        self.owner._rev += 1
+
+    def discard(self, value):
+        if value in self:
+            self.remove(value)
+
+    def pop(self):
+        value = super().pop()
+        self.owner._number_sum -= value
+        self.owner._rev += 1
+        return value
+
+    def update(self, *others):
+        for other in others:
+            for value in other:
+                self.add(value)
+
+    def clear(self):
+        super().clear()
+        self.owner._number_sum = 0
+        self.owner._rev += 1
+
+
 class Player:
     def __init__(self, name, sid, player_id=None):
+        self._rev = 0              # bumped by every mutation; caches remember the rev they were built at
+        self._cached_dict = None
+        self._cached_rev = -1
+        self._public_dict = None
+        self._public_key = None
         self.player_id = player_id or str(uuid.uuid4())
         self.name = name
         self.sid = sid
+        self.bot = None            # policy spec (see policies.make_policy) for server-side bots
         self.total_score = 0
         self.reset_round()
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        # Any change to public state invalidates the serialized forms
+        if not name.startswith("_"):
+            object.__setattr__(self, "_rev", self._rev + 1)
+
+    def __getstate__(self):
+        # The observed containers point back at us; pickle them as plain data
+        state = dict(self.__dict__)
+        state["_cards"] = (list(self._cards), list(self._cards.targets))
+        state["_numbers"] = set(self._numbers)
+        state["_cached_dict"] = state["_public_dict"] = None
+        state["_cached_rev"] = -1
+        state["_public_key"] = None
+        return state
+
+    def __setstate__(self, state):
+        cards, targets = state.pop("_cards")
+        numbers = state.pop("_numbers")
+        self.__dict__.update(state)
+        self.numbers = numbers
+        self.cards = cards
+        self._cards.targets = targets
+
+    @property
+    def cards(self):
+        return self._cards
+
+    @cards.setter
+    def cards(self, value):
+        self._cards = Hand(self, value)
+        self._recount()
+
+    @property
+    def numbers(self):
+        return self._numbers
+
+    @numbers.setter
+    def numbers(self, value):
+        self._numbers = NumberSet(self, value)
+        self._number_sum = sum(self._numbers)
+
     def reset_round(self):
         self.numbers = set()
         self.cards = []
@@ -92,95 +375,228 @@ class Player:
         self.finished = False
         self.flip7 = False
 
-    def round_score(self):
-        if self.busted:
-            return 0
-        
-        add_bonuses = 0
-        multiplier = 1
-        for elem in self.cards:     
-            if elem.type == CardType.BONUS:
-                if elem.value[0] == "+":
-                    add_bonuses += int(elem.value[1:])
-                elif elem.value[0] == "x":
-                    multiplier *= int(elem.value[1:])
-        
-        res = (sum(self.numbers) + add_bonuses) * multiplier
+    def _card_added(self, card):
+        self._add_bonus += card.add
+        self._multiplier *= card.mult
+        self._rev += 1
 
-        if self.flip7:
-            res += BONUS_FLIP7
-        return res
+    def _card_removed(self, card):
+        self._add_bonus -= card.add
+        self._multiplier //= card.mult
+        self._rev += 1
 
-    def to_dict(self):
+    def _recount(self):
+        self._add_bonus = 0
+        self._multiplier = 1
+        for elem in self._cards:
+            self._card_added(elem)
+        self._rev += 1
+
+    def to_record(self):
         return {
             "player_id": self.player_id,
-            "sid": self.sid,
             "name": self.name,
-            "round_score": self.round_score(),
+            "sid": self.sid,
+            "bot": self.bot,
             "total_score": self.total_score,
             "numbers": sorted(self.numbers),
-            "cards": [c.to_dict() for c in self.cards],
+            "cards": [c.to_record() for c in self.cards],
+            "targets": list(self.cards.targets),
             "second_chance": self.second_chance,
             "busted": self.busted,
             "finished": self.finished,
-            "flip7": self.flip7
+            "flip7": self.flip7,
         }
 
+    @classmethod
+    def from_record(cls, record):
+        p = cls(record["name"], record["sid"], record["player_id"])
+        p.bot = record.get("bot")
+        p.total_score = record["total_score"]
+        p.numbers = record["numbers"]
+        p.cards = [Card.from_record(c) for c in record["cards"]]
+        p.cards.targets = list(record["targets"])
+        p.second_chance = record["second_chance"]
+        p.busted = record["busted"]
+        p.finished = record["finished"]
+        p.flip7 = record["flip7"]
+        return p
+
+    def round_score(self):
+        if self.busted:
+            return 0
+
+        res = (self._number_sum + self._add_bonus) * self._multiplier
+
+        if self.flip7:
+            res += BONUS_FLIP7
+        return res
+
+    def to_dict(self):
+        # Rebuilt only after a mutation; unchanged players hand back the same dict
+        if self._cached_rev != self._rev:
+            self._cached_dict = {
+                "player_id": self.player_id,
+                "sid": self.sid,
+                "name": self.name,
+                "round_score": self.round_score(),
+                "total_score": self.total_score,
+                "numbers": sorted(self.numbers),
+                "cards": self.cards.to_dicts(),
+                "second_chance": self.second_chance,
+                "busted": self.busted,
+                "finished": self.finished,
+                "flip7": self.flip7
+            }
+            self._cached_rev = self._rev
+        return self._cached_dict
+
+    def public_dict(self, seat):
+        # What every client may see: no sid or player_id (the rejoin credential), seat instead
+        if self._public_key != (self._rev, seat):
+            self._public_dict = {
+                "seat": seat,
+                "name": self.name,
+                "bot": self.bot is not None,
+                "connected": self.sid is not None,
+                "round_score": self.round_score(),
+                "total_score": self.total_score,
+                "numbers": sorted(self.numbers),
+                "cards": self.cards.to_dicts(),
+                "second_chance": self.second_chance,
+                "busted": self.busted,
+                "finished": self.finished,
+                "flip7": self.flip7
+            }
+            self._public_key = (self._rev, seat)
+        return self._public_dict
+
 
 class Game:
-    def __init__(self, owner_player_id, cards=None):
+    def __init__(self, owner_player_id, cards=None, state_mode=STATES_FULL, seed=None):
         self.code = generate_code()
+        self.state_mode = state_mode
         self.owner_player_id = owner_player_id
         self.players = []
+        self._by_sid = {}          # sid -> Player (connected players only)
+        self._by_player_id = {}    # player_id -> Player
+        self._by_name = {}         # normalized name -> Player
+        self._seats = {}           # player_id -> index in self.players
         self.started = False
         self.round = 1
         self.turn = 0
-        self.deck = Deck(cards=cards)
+        self.deck = Deck(cards=cards, seed=seed)
         self.match_winner = None
+        self.round_scores = []     # per finished round: each seat's score
 
         self.pending_actions = []
         self.pending_round_reset = False
+        self.action_log = None     # see actionlog.ActionLog
+        self.actions = 0           # accepted actions so far; unchanged means the last one was rejected
 
-    def add_player(self, name, sid, player_id=None):
+    def _log(self, *entry):
+        # Accepted actions only, with players named by player_id so a replay does not depend on sids
+        self.actions += 1
+        if self.action_log is not None:
+            self.action_log.append(list(entry))
 
-        for p in self.players:
-            if p.name.strip().lower() == name.strip().lower():
-                return None
+    def add_player(self, name, sid, player_id=None, bot=None):
+        """Seat a player, or rename a returning one. bot: a policy spec; the player then needs no sid."""
+
+        if self.has_name(name):
+            return None
 
         existing = self.get_player_by_player_id(player_id) if player_id else None
 
         if existing:
-            existing.sid = sid
+            self._log("add_player", name, existing.player_id)
+            self.set_sid(existing, sid)
+            self._by_name.pop(_name_key(existing.name), None)
             existing.name = name
+            self._by_name[_name_key(name)] = existing
             return existing
 
         if self.started:
             return None
 
         p = Player(name, sid, player_id)
+        if bot is not None:
+            p.bot = bot
+            p.sid = sid or bot_sid(p.player_id)
+        self._log("add_player", name, p.player_id, p.bot)
         self.players.append(p)
+        self._index(p)
         return p
 
+    def _index(self, p):
+        # Players are only ever appended, so a seat never changes once taken
+        self._seats[p.player_id] = len(self._seats)
+        self._by_player_id[p.player_id] = p
+        self._by_name[_name_key(p.name)] = p
+        if p.sid is not None:
+            self._by_sid[p.sid] = p
+
+    def _reindex(self):
+        # Rebuild every lookup table from self.players (after bulk loads)
+        self._by_sid = {}
+        self._by_player_id = {}
+        self._by_name = {}
+        self._seats = {}
+        for p in self.players:
+            self._index(p)
+
+    def set_sid(self, player, sid):
+        # Player connection changed (rejoin) or went away (sid=None): keep the sid index in step
+        if player.sid is not None and self._by_sid.get(player.sid) is player:
+            del self._by_sid[player.sid]
+        player.sid = sid
+        if sid is not None:
+            self._by_sid[sid] = player
+
+    def disconnect(self, sid):
+        player = self.get_player_by_sid(sid)
+        if player:
+            self.set_sid(player, None)
+        return player
+
+    def has_name(self, name):
+        return _name_key(name) in self._by_name
+
     def start(self, sid):
         # find the player by sid and check their player_id is owner
-        player = next((p for p in self.players if p.sid == sid), None)
+        player = self.get_player_by_sid(sid)
         if not player or player.player_id != self.owner_player_id:
             return False
+        return self.start_for_owner()
+
+    def start_for_owner(self):
+        # Server-run tables (tournaments) start on the owner's behalf, connected or not
+        if self.get_player_by_player_id(self.owner_player_id) is None:
+            return False
+        self._log("start", self.owner_player_id)
         self.started = True
         return True
 
+    @property
+    def seed(self):
+        return self.deck.seed
+
     def current_player(self):
         return self.players[self.turn]
     
     def get_player_by_player_id(self, player_id):
-        for p in self.players:
-            if p.player_id == player_id:
-                return p
-        return None
+        return self._by_player_id.get(player_id)
 
-    
     def get_player_by_sid(self, sid):
-        return next(p for p in self.players if p.sid == sid)
+        return self._by_sid.get(sid) if sid is not None else None
+
+    def seat_of(self, player_id):
+        return self._seats.get(player_id)
+
+    def _sid_of(self, player_id):
+        # Pending actions name players by their stable player_id; clients know them by sid
+        player = self._by_player_id.get(player_id)
+        return player.sid if player else None
 
     def next_turn(self):
         for _ in range(len(self.players)):
@@ -192,8 +608,10 @@ class Game:
         if not all(p.finished for p in self.players):
             return
 
-        for p in self.players:
-            p.total_score += p.round_score()
+        scores = [p.round_score() for p in self.players]
+        self.round_scores.append(scores)
+        for p, score in zip(self.players, scores):
+            p.total_score += score
 
         max_score = -1
         is_winner = False
@@ -223,6 +641,7 @@ class Game:
         if p.sid != sid:
             return
 
+        self._log("stay", p.player_id)
         p.finished = True
         self.next_turn()
         self.check_round_end()
@@ -235,6 +654,7 @@ class Game:
         if p.sid != sid or p.finished:
             return
 
+        self._log("hit", p.player_id)
         card = self.deck.draw()
         p.cards.append(card)
 
@@ -247,7 +667,7 @@ class Game:
                     p.finished = True
             else:
                 p.numbers.add(card.value)
-                if len(p.numbers) == 7:
+                if len(p.numbers) == FLIP7_NUMBERS:
                     p.finished = True
                     p.flip7 = True
 
@@ -255,18 +675,18 @@ class Game:
             p.second_chance += 1
 
         elif card.type == CardType.FREEZE:
-            self.pending_actions.append({"action": "freeze", "sid": p.sid})
+            self.pending_actions.append({"action": "freeze", "player_id": p.player_id})
             return
 
         elif card.type == CardType.FLIP_3:
-            self.pending_actions.append({"action": "flip3", "sid": p.sid})
+            self.pending_actions.append({"action": "flip3", "player_id": p.player_id})
             return
         
         elif card.type == CardType.DISCARD:
             anyNumberCards = any([len(elem.numbers) > 0 for elem in self.players])
             if anyNumberCards: # if no one has number cards to discard, act as no op
                 # Step 1 DISCARD: the "choose target" phase (player who drew discard chooses self or another player)
-                self.pending_actions.append({"action": "discard_choose_target", "sid": p.sid, "card_idx": len(p.cards)-1})
+                self.pending_actions.append({"action": "discard_choose_target", "player_id": p.player_id, "card_idx": len(p.cards)-1})
                 return
         
         self.next_turn()
@@ -274,16 +694,19 @@ class Game:
 
     def proceed_round(self):
         if self.pending_round_reset:
+            self._log("proceed_round")
             self.start_new_round()
             self.pending_round_reset = False
 
     def apply_discard_choose_target(self, sid, target_sid, card_idx):
         # Validate request: only the player who drew the DISCARD can choose, and card_idx must match their most recent card
+        source = self.get_player_by_sid(sid)
         for i in range(len(self.pending_actions)-1, -1, -1):
             a = self.pending_actions[i]
             if (
-                a["action"] == "discard_choose_target"
-                and a["sid"] == sid
+                source
+                and a["action"] == "discard_choose_target"
+                and a["player_id"] == source.player_id
                 and a["card_idx"] == card_idx
             ):
                 break
@@ -291,6 +714,7 @@ class Game:
             return
 
         target = self.get_player_by_sid(target_sid)
+        self._log("discard_choose_target", source.player_id, target.player_id if target else None, card_idx)
         if not target or len(target.cards) == 0:
             self.pending_actions.pop(i)
             return
@@ -298,27 +722,28 @@ class Game:
         # Remove the choose_target action; insert a pending action telling the target to choose what to discard
         self.pending_actions.pop(i)
         # Record target info into the discard card
-        source = self.get_player_by_sid(sid)
-        if source and len(source.cards) > card_idx:
-            source.cards[card_idx].target = target.name if sid != target_sid else "(self)"
+        if len(source.cards) > card_idx:
+            source.cards.set_target(card_idx, target.name if source is not target else "(self)")
         # Step 2 DISCARD: the "choose card" phase
-        self.pending_actions.append({"action": "discard_choose_card", "initiator_sid": sid, "target_sid": target_sid})
+        self.pending_actions.append({"action": "discard_choose_card", "initiator_id": source.player_id, "target_id": target.player_id})
         return self.process_pending_actions()
 
     def apply_discard_choose_card(self, sid, card_idx):
         # This is called by the player who must choose a card to discard from own hand
+        target: Player = self.get_player_by_sid(sid)
         for i in range(len(self.pending_actions)-1, -1, -1):
             a = self.pending_actions[i]
             if (
-                a["action"] == "discard_choose_card"
-                and a["target_sid"] == sid
+                target
+                and a["action"] == "discard_choose_card"
+                and a["target_id"] == target.player_id
             ):
                 break
         else:
             return
 
-        target: Player = self.get_player_by_sid(sid)
-        if not target or card_idx < 0 or card_idx >= len(target.cards):
+        self._log("discard_choose_card", target.player_id, card_idx)
+        if card_idx < 0 or card_idx >= len(target.cards):
             self.pending_actions.pop(i)
             return
 
@@ -326,70 +751,82 @@ class Game:
         if card_to_remove.type == CardType.NUMBER:
             # Remove that card from the target's hand
             target.cards.pop(card_idx)
-            target.numbers.remove(card_to_remove.value)
+            # A duplicate saved by a second chance is still in the hand: keep the number then
+            if card_to_remove not in target.cards:
+                target.numbers.remove(card_to_remove.value)
 
         self.pending_actions.pop(i)
         return self.process_pending_actions()
 
     def apply_flip3(self, sid, target_sid):
         # Find the last flip3 action
+        giver = self.get_player_by_sid(sid)
         for i in range(len(self.pending_actions)-1, -1, -1):
             a = self.pending_actions[i]
-            if a["action"] == "flip3" and a["sid"] == sid:
+            if giver and a["action"] == "flip3" and a["player_id"] == giver.player_id:
                 break
         else:
             return
 
-        giver = self.get_player_by_sid(sid)
         target = self.get_player_by_sid(target_sid)
+        self._log("flip3", giver.player_id, target.player_id if target else None)
 
-        if not giver or not target or target.finished:
+        if not target or target.finished:
             self.pending_actions.pop(i)
             return
 
-        giver.cards[-1].target = target.name
+        giver.cards.set_target(-1, target.name)
         self.pending_actions.pop(i)  # Remove this flip3 action
 
         # Add a draw3 action for the target at the top of the stack
         self.pending_actions.append({
             "action": "draw3",
-            "sid": target.sid,
+            "player_id": target.player_id,
             "remaining": 3
         })
 
         return self.process_pending_actions()
 
     def apply_freeze(self, sid, target_sid):
-        # Find the last freeze targeting sid
+        # Find the last freeze drawn by sid
+        freezer = self.get_player_by_sid(sid)
         for i in range(len(self.pending_actions)-1, -1, -1):
             a = self.pending_actions[i]
-            if a["action"] == "freeze" and a["sid"] == sid:
+            if freezer and a["action"] == "freeze" and a["player_id"] == freezer.player_id:
                 break
         else:
             return
 
         target = self.get_player_by_sid(target_sid)
-        if target.finished:
+        if not target or target.finished:
             return
 
+        self._log("freeze", freezer.player_id, target.player_id)
         target.finished = True
 
-        freezer = self.get_player_by_sid(sid)
-        freezer.cards[-1].target = target.name
+        freezer.cards.set_target(-1, target.name)
 
         self.pending_actions.pop(i)
         # Handle further pending actions:
         return self.process_pending_actions()
 
+    def _record_state(self, game_states, player, card):
+        if self.state_mode == STATES_FULL:
+            game_states.append(self.to_dict())
+        elif self.state_mode == STATES_PUBLIC:
+            game_states.append(self.public_dict())
+        elif self.state_mode == STATES_EVENTS:
+            game_states.append({"sid": player.sid, "card": card.to_dict()})
+
     def process_pending_actions(self):
         """Processes all pending actions, handling nested draw3/flip3/freeze."""
-        # We'll return a list of game states
+        # We'll return one entry per draw, shaped by self.state_mode
         game_states = []
         player_of_last_action = None
         while self.pending_actions:
             action = self.pending_actions[-1]
             if action["action"] == "draw3":
-                player = self.get_player_by_sid(action["sid"])
+                player = self.get_player_by_player_id(action["player_id"])
                 player_of_last_action = player
                 if player.finished:
                     self.pending_actions.pop()
@@ -406,15 +843,15 @@ class Game:
                             player.busted = True
                             player.finished = True
                             self.pending_actions.pop()
-                            game_states.append(self.to_dict())
+                            self._record_state(game_states, player, card)
                             break
                     else:
                         player.numbers.add(card.value)
-                        if len(player.numbers) == 7:
+                        if len(player.numbers) == FLIP7_NUMBERS:
                             player.flip7 = True
                             player.finished = True
                             self.pending_actions.pop()
-                            game_states.append(self.to_dict())
+                            self._record_state(game_states, player, card)
                             break
                     action["remaining"] -= 1
 
@@ -425,26 +862,26 @@ class Game:
                 elif card.type == CardType.FREEZE:
                     # Pause draw, push freeze
                     action["remaining"] -= 1
-                    self.pending_actions.append({"action": "freeze", "sid": player.sid})
-                    game_states.append(self.to_dict())
+                    self.pending_actions.append({"action": "freeze", "player_id": player.player_id})
+                    self._record_state(game_states, player, card)
                     break
 
                 elif card.type == CardType.FLIP_3:
                     # Pause draw, push flip3
                     action["remaining"] -= 1
-                    self.pending_actions.append({"action": "flip3", "sid": player.sid})
-                    game_states.append(self.to_dict())
+                    self.pending_actions.append({"action": "flip3", "player_id": player.player_id})
+                    self._record_state(game_states, player, card)
                     break
                 elif card.type == CardType.DISCARD:
                     # Pause draw, push discard and start from step 1 (choose target)
                     action["remaining"] -= 1
-                    self.pending_actions.append({"action": "discard_choose_target", "sid": player.sid, "card_idx": len(player.cards)-1})
-                    game_states.append(self.to_dict())
+                    self.pending_actions.append({"action": "discard_choose_target", "player_id": player.player_id, "card_idx": len(player.cards)-1})
+                    self._record_state(game_states, player, card)
                     break
                 elif card.type == CardType.BONUS:
                     action["remaining"] -= 1
 
-                game_states.append(self.to_dict())
+                self._record_state(game_states, player, card)
 
                 # Completed all 3 draws?
                 if action["remaining"] <= 0:
@@ -459,21 +896,54 @@ class Game:
             self.check_round_end()
         return game_states
 
+    def to_record(self):
+        """Everything needed to rebuild this game, including the deck (unlike to_dict)."""
+        return {
+            "code": self.code,
+            "owner_player_id": self.owner_player_id,
+            "state_mode": self.state_mode,
+            "players": [p.to_record() for p in self.players],
+            "started": self.started,
+            "round": self.round,
+            "turn": self.turn,
+            "deck": self.deck.to_record(),
+            "match_winner": self.match_winner.player_id if self.match_winner else None,
+            "pending_actions": [dict(a) for a in self.pending_actions],
+            "pending_round_reset": self.pending_round_reset,
+            "round_scores": [list(scores) for scores in self.round_scores],
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        game = cls(record["owner_player_id"], cards=[], state_mode=record["state_mode"])
+        game.code = record["code"]
+        game.players = [Player.from_record(p) for p in record["players"]]
+        game._reindex()
+        game.started = record["started"]
+        game.round = record["round"]
+        game.turn = record["turn"]
+        game.deck = Deck.from_record(record["deck"])
+        game.match_winner = game.get_player_by_player_id(record["match_winner"]) if record["match_winner"] else None
+        game.pending_actions = [dict(a) for a in record["pending_actions"]]
+        game.pending_round_reset = record["pending_round_reset"]
+        game.round_scores = [list(scores) for scores in record.get("round_scores", [])]
+        return game
+
     def to_dict(self):
         pending_freeze = pending_flip3 = pending_discard_choose_target = pending_discard_choose_card = None
         discard_choose_target_info = {}
         discard_choose_card_info = {}
         for a in reversed(self.pending_actions):
             if not pending_freeze and a["action"] == "freeze":
-                pending_freeze = a["sid"]
+                pending_freeze = self._sid_of(a["player_id"])
             if not pending_flip3 and a["action"] == "flip3":
-                pending_flip3 = a["sid"]
+                pending_flip3 = self._sid_of(a["player_id"])
             if not pending_discard_choose_target and a["action"] == "discard_choose_target":
-                pending_discard_choose_target = a["sid"]
+                pending_discard_choose_target = self._sid_of(a["player_id"])
                 discard_choose_target_info = {"card_idx": a["card_idx"]}
             if not pending_discard_choose_card and a["action"] == "discard_choose_card":
-                pending_discard_choose_card = a["target_sid"]
-                discard_choose_card_info = {"initiator_sid": a["initiator_sid"]}
+                pending_discard_choose_card = self._sid_of(a["target_id"])
+                discard_choose_card_info = {"initiator_sid": self._sid_of(a["initiator_id"])}
         return {
             "code": self.code,
             "started": self.started,
@@ -490,3 +960,40 @@ class Game:
             "players": [p.to_dict() for p in self.players],
             "owner_player_id": self.owner_player_id
         }
+
+    def public_dict(self):
+        """The state every client may see: players by seat, no sids or player_ids.
+
+        Built once per change and shared by the whole room; what is specific to one client
+        (its seat, its prompts) goes out separately as a small overlay.
+        """
+        pending_freeze = pending_flip3 = pending_discard_choose_target = pending_discard_choose_card = None
+        discard_choose_target_info = {}
+        discard_choose_card_info = {}
+        for a in reversed(self.pending_actions):
+            if pending_freeze is None and a["action"] == "freeze":
+                pending_freeze = self.seat_of(a["player_id"])
+            if pending_flip3 is None and a["action"] == "flip3":
+                pending_flip3 = self.seat_of(a["player_id"])
+            if pending_discard_choose_target is None and a["action"] == "discard_choose_target":
+                pending_discard_choose_target = self.seat_of(a["player_id"])
+                discard_choose_target_info = {"card_idx": a["card_idx"]}
+            if pending_discard_choose_card is None and a["action"] == "discard_choose_card":
+                pending_discard_choose_card = self.seat_of(a["target_id"])
+                discard_choose_card_info = {"initiator": self.seat_of(a["initiator_id"])}
+        return {
+            "code": self.code,
+            "started": self.started,
+            "round": self.round,
+            "turn": self.turn,
+            "pending_round_reset": self.pending_round_reset,
+            "pending_freeze": pending_freeze,
+            "pending_flip3": pending_flip3,
+            "pending_discard_choose_target": pending_discard_choose_target,
+            "discard_choose_target_info": discard_choose_target_info,
+            "pending_discard_choose_card": pending_discard_choose_card,
+            "discard_choose_card_info": discard_choose_card_info,
+            "match_winner": self.match_winner.name if self.match_winner else None,
+            "players": [p.public_dict(seat) for seat, p in enumerate(self.players)],
+            "owner": self.seat_of(self.owner_player_id),
+        }
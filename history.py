@@ -0,0 +1,243 @@
+"""Finished matches in SQLite: per-player history, leaderboard and win rates.
+
+match_players is indexed by (player_id, finished), so a player's history is one index range
+scan. Pages are keyset-paginated (a cursor of the last row's time and id, not OFFSET), so page
+1000 costs what page 1 does. The leaderboard is an aggregate table updated as matches are
+written, not a GROUP BY over the history. Bots play in the history but stay off the leaderboard.
+
+HistoryWriter takes matches from the game handlers and writes them from its own thread in
+batches, one transaction each, so gameplay never waits on the disk.
+"""
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+
+from store import SQLiteConnections
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL,
+    finished REAL NOT NULL,
+    rounds INTEGER NOT NULL,
+    winner TEXT,
+    action_log BLOB
+);
+CREATE INDEX IF NOT EXISTS matches_finished ON matches (finished, id);
+CREATE TABLE IF NOT EXISTS match_players (
+    match_id INTEGER NOT NULL REFERENCES matches (id),
+    player_id TEXT NOT NULL,
+    seat INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    bot INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    round_scores TEXT NOT NULL,
+    finished REAL NOT NULL,
+    PRIMARY KEY (match_id, seat)
+);
+CREATE INDEX IF NOT EXISTS match_players_player ON match_players (player_id, finished, match_id);
+CREATE TABLE IF NOT EXISTS leaderboard (
+    id INTEGER PRIMARY KEY,
+    player_id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    matches INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    last_played REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leaderboard_wins ON leaderboard (wins, id);
+"""
+
+
+def match_record(game, log_path=None, finished=None):
+    """Plain-data summary of a finished game, safe to hand to another thread.
+
+    log_path: the game's action log file (see actionlog.py); the writer stores it compressed."""
+    winner = game.match_winner
+    return {
+        "code": game.code,
+        "finished": time.time() if finished is None else finished,
+        "rounds": len(game.round_scores),
+        "winner": winner.name if winner else None,
+        "log_path": log_path,
+        "players": [
+            {
+                "player_id": p.player_id,
+                "seat": seat,
+                "name": p.name,
+                "bot": p.bot is not None,
+                "score": p.total_score,
+                "won": p is winner,
+                "round_scores": [scores[seat] for scores in game.round_scores if seat < len(scores)],
+            }
+            for seat, p in enumerate(game.players)
+        ],
+    }
+
+
+def read_log(path):
+    # The registry may already have moved a finished game's log aside (app.forget_game)
+    for candidate in (path, path + ".closed") if path else ():
+        try:
+            with open(candidate, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            continue
+    return None
+
+
+class HistoryStore:
+    def __init__(self, path):
+        self.path = path
+        self._conn = SQLiteConnections(path, row_factory=sqlite3.Row)
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def write(self, records):
+        with self._conn() as conn:
+            for rec in records:
+                action_log = read_log(rec.get("log_path"))
+                blob = zlib.compress(action_log) if action_log else None
+                match_id = conn.execute(
+                    "INSERT INTO matches (code, finished, rounds, winner, action_log) VALUES (?, ?, ?, ?, ?)",
+                    (rec["code"], rec["finished"], rec["rounds"], rec["winner"], blob),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO match_players"
+                    " (match_id, player_id, seat, name, bot, score, won, round_scores, finished)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (match_id, p["player_id"], p["seat"], p["name"], p["bot"], p["score"], p["won"],
+                         json.dumps(p["round_scores"]), rec["finished"])
+                        for p in rec["players"]
+                    ],
+                )
+                conn.executemany(
+                    "INSERT INTO leaderboard (player_id, name, matches, wins, points, last_played)"
+                    " VALUES (?, ?, 1, ?, ?, ?)"
+                    " ON CONFLICT (player_id) DO UPDATE SET"
+                    " name = excluded.name, matches = matches + 1, wins = wins + excluded.wins,"
+                    " points = points + excluded.points, last_played = excluded.last_played",
+                    [
+                        (p["player_id"], p["name"], p["won"], p["score"], rec["finished"])
+                        for p in rec["players"] if not p["bot"]
+                    ],
+                )
+
+    def history(self, player_id, limit=20, before=None):
+        """A player's matches, newest first: (rows, cursor for the next page or None).
+
+        before: the cursor returned with the previous page."""
+        sql = "SELECT match_id, finished, seat, score, won, round_scores FROM match_players WHERE player_id = ?"
+        args = [player_id]
+        if before is not None:
+            sql += " AND (finished, match_id) < (?, ?)"
+            args += list(before)
+        sql += " ORDER BY finished DESC, match_id DESC LIMIT ?"
+        rows = self._conn().execute(sql, args + [limit]).fetchall()
+        if not rows:
+            return [], None
+        ids = [row["match_id"] for row in rows]
+        marks = ",".join("?" * len(ids))
+        tables = {}
+        for row in self._conn().execute(
+            f"SELECT match_id, name, score, won FROM match_players WHERE match_id IN ({marks}) ORDER BY match_id, seat", ids
+        ):
+            tables.setdefault(row["match_id"], []).append({"name": row["name"], "score": row["score"], "won": bool(row["won"])})
+        res = [
+            {
+                "match": row["match_id"],
+                "finished": row["finished"],
+                "seat": row["seat"],
+                "score": row["score"],
+                "won": bool(row["won"]),
+                "round_scores": json.loads(row["round_scores"]),
+                "players": tables[row["match_id"]],
+            }
+            for row in rows
+        ]
+        cursor = (rows[-1]["finished"], rows[-1]["match_id"]) if len(rows) == limit else None
+        return res, cursor
+
+    def leaderboard(self, limit=20, after=None):
+        """Players by wins: (rows, cursor for the next page or None)."""
+        sql = "SELECT id, name, matches, wins, points FROM leaderboard"
+        args = []
+        if after is not None:
+            sql += " WHERE (wins, id) < (?, ?)"
+            args += list(after)
+        sql += " ORDER BY wins DESC, id DESC LIMIT ?"
+        rows = self._conn().execute(sql, args + [limit]).fetchall()
+        res = [
+            {"name": row["name"], "matches": row["matches"], "wins": row["wins"], "points": row["points"]}
+            for row in rows
+        ]
+        cursor = (rows[-1]["wins"], rows[-1]["id"]) if rows and len(rows) == limit else None
+        return res, cursor
+
+    def action_log(self, match_id):
+        row = self._conn().execute("SELECT action_log FROM matches WHERE id = ?", (match_id,)).fetchone()
+        if row is None or row["action_log"] is None:
+            return None
+        return zlib.decompress(row["action_log"]).decode()
+
+    def stats(self, player_id):
+        row = self._conn().execute(
+            "SELECT name, matches, wins, points FROM leaderboard WHERE player_id = ?", (player_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "name": row["name"],
+            "matches": row["matches"],
+            "wins": row["wins"],
+            "win_rate": row["wins"] / row["matches"],
+            "avg_score": row["points"] / row["matches"],
+        }
+
+
+class HistoryWriter:
+    """Queue of match records written by a background thread, up to batch_size per transaction."""
+
+    def __init__(self, store, batch_size=200, flush_interval=1.0):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, rec):
+        self._queue.put(rec)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            done = batch[-1] is None
+            records = [rec for rec in batch if rec is not None]
+            if records:
+                try:
+                    self.store.write(records)
+                except sqlite3.Error:
+                    log.exception("could not write %d match(es) to the history", len(records))
+            if done:
+                return
+
+    def close(self):
+        # Writes whatever is queued, then stops the thread
+        self._queue.put(None)
+        self._thread.join()
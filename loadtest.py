@@ -0,0 +1,276 @@
+"""Load generator: many Socket.IO clients playing real games against a running server.
+
+    python loadtest.py --spawn --games 200 --players 4 --concurrency 50
+    python loadtest.py --url http://staging:5000 --games 1000
+
+Every simulated player is its own python-socketio client speaking the browser's protocol
+(create_game, join_game, start_game, hit, stay, *_target, discard_*, proceed_round). The
+latency of an event is the time from emitting it to the first state that reflects it.
+Needs the asyncio client: pip install "python-socketio[asyncio_client]".
+"""
+import argparse
+import asyncio
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+import uuid
+from collections import Counter, defaultdict
+
+import socketio
+
+PROMPT_EVENTS = {
+    "freeze": "freeze_target",
+    "flip3": "flip3_target",
+    "discard_choose_target": "discard_choose_target",
+    "discard_choose_card": "discard_choose_card",
+}
+
+
+def percentile(values, q):
+    # Nearest-rank percentile of a non-empty list
+    ordered = sorted(values)
+    rank = max(int(round(q / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def apply_patch(state, patch):
+    # Same as applyPatch in static/game.js
+    nxt = dict(state)
+    nxt.update(patch.get("set", {}))
+    nxt["version"] = patch["version"]
+    if "players" in patch:
+        nxt["players"] = list(nxt["players"])
+        for idx, changes in patch["players"]:
+            p = dict(nxt["players"][idx])
+            p.update(changes)
+            if "cards+" in changes:
+                p["cards"] = nxt["players"][idx]["cards"] + changes["cards+"]
+                del p["cards+"]
+            nxt["players"][idx] = p
+    return nxt
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)   # event -> seconds
+        self.errors = Counter()
+        self.sent = 0
+        self.games = 0
+        self.started = time.perf_counter()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        lines = [
+            f"games finished: {self.games} in {elapsed:.1f}s",
+            f"events sent: {self.sent} ({self.sent / max(elapsed, 1e-9):.1f}/s)",
+        ]
+        everything = [x for values in self.latencies.values() for x in values]
+        for event, values in [("all", everything)] + sorted(self.latencies.items()):
+            if values:
+                lines.append(
+                    f"{event:<22} n={len(values):<7} p50 {percentile(values, 50) * 1000:7.1f}ms"
+                    f"  p99 {percentile(values, 99) * 1000:7.1f}ms"
+                )
+        lines.append("errors: " + (", ".join(f"{k}={v}" for k, v in sorted(self.errors.items())) or "none"))
+        return "\n".join(lines)
+
+
+class LoadClient:
+    """One simulated browser: keeps the patched state and acts when the game waits on it."""
+
+    def __init__(self, url, name, stats, threshold, rng):
+        self.url = url
+        self.name = name
+        self.stats = stats
+        self.threshold = threshold
+        self.rng = rng
+        self.player_id = str(uuid.uuid4())
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.state = None
+        self.me = None
+        self.sent = None          # (event, time, fingerprint) of the action awaiting its state
+        self.done = asyncio.Event()
+        self.joined = asyncio.Event()
+        self.sio.on("state", self.on_state)
+        self.sio.on("state_patch", self.on_patch)
+        self.sio.on("you", self.on_you)
+        self.sio.on("error", self.on_error)
+        self.sio.on("game_closed", self.on_closed)
+
+    async def connect(self):
+        await self.sio.connect(self.url, transports=["websocket"], auth={"encoding": "json"})
+
+    async def close(self):
+        await self.sio.disconnect()
+
+    async def emit(self, event, data=None):
+        self.stats.sent += 1
+        self.sent = (event, time.perf_counter(), self.fingerprint())
+        await self.sio.emit(event, data)
+
+    async def on_you(self, overlay):
+        self.me = overlay
+
+    async def on_error(self, msg):
+        self.stats.errors[f"server: {msg}"] += 1
+
+    async def on_closed(self, info):
+        self.done.set()
+
+    async def on_state(self, state):
+        self.state = state
+        self.joined.set()
+        await self.changed()
+
+    async def on_patch(self, patch):
+        if self.state is None or patch["base"] != self.state["version"]:
+            self.stats.errors["version gap"] += 1
+            await self.sio.emit("request_state")
+            return
+        self.state = apply_patch(self.state, patch)
+        await self.changed()
+
+    def fingerprint(self):
+        # What our next decision depends on; our own action always changes it
+        s = self.state
+        if s is None or self.me is None:
+            return None
+        mine = s["players"][self.me["seat"]]
+        return (
+            s["started"], s["round"], s["turn"], s["pending_round_reset"], s["match_winner"],
+            s["pending_freeze"], s["pending_flip3"],
+            s["pending_discard_choose_target"], s["pending_discard_choose_card"],
+            len(mine["cards"]), mine["finished"],
+        )
+
+    async def changed(self):
+        current = self.fingerprint()
+        if self.sent is not None:
+            event, at, before = self.sent
+            if current == before:
+                return   # still waiting for our action to land
+            self.stats.latencies[event].append(time.perf_counter() - at)
+            self.sent = None
+        if self.state["match_winner"] is not None:
+            self.done.set()
+            return
+        await self.act()
+
+    def targets(self):
+        return [p["seat"] for p in self.state["players"] if not p["finished"]] or [self.me["seat"]]
+
+    async def act(self):
+        s, me = self.state, self.me
+        if me is None or not s["started"]:
+            return
+        if s["pending_round_reset"]:
+            first = next((p for p in s["players"] if p["connected"] and not p["bot"]), None)
+            if first is not None and first["seat"] == me["seat"]:
+                await self.emit("proceed_round")
+            return
+        if me["prompts"]:
+            prompt = me["prompts"][0]
+            if prompt == "discard_choose_card":
+                cards = s["players"][me["seat"]]["cards"]
+                numbers = [i for i, c in enumerate(cards) if c["type"] == "number"] or [0]
+                await self.emit(PROMPT_EVENTS[prompt], {"card_idx": self.rng.choice(numbers)})
+            elif prompt == "discard_choose_target":
+                with_numbers = [p["seat"] for p in s["players"] if p["numbers"]] or [me["seat"]]
+                await self.emit(PROMPT_EVENTS[prompt], {
+                    "target": self.rng.choice(with_numbers),
+                    "card_idx": s["discard_choose_target_info"]["card_idx"],
+                })
+            else:
+                await self.emit(PROMPT_EVENTS[prompt], {"target": self.rng.choice(self.targets())})
+            return
+        pending = any(s[k] is not None for k in (
+            "pending_freeze", "pending_flip3", "pending_discard_choose_target", "pending_discard_choose_card"))
+        mine = s["players"][me["seat"]]
+        if pending or s["turn"] != me["seat"] or mine["finished"]:
+            return
+        await self.emit("hit" if mine["round_score"] < self.threshold else "stay")
+
+
+async def play_game(url, players, stats, rng, timeout):
+    clients = [LoadClient(url, f"P{i}", stats, rng.choice([15, 20, 25]), rng) for i in range(players)]
+    try:
+        for c in clients:
+            await c.connect()
+        owner = clients[0]
+        await owner.sio.emit("create_game", {"name": owner.name, "player_id": owner.player_id})
+        await asyncio.wait_for(owner.joined.wait(), timeout)
+        code = owner.state["code"]
+        for c in clients[1:]:
+            await c.sio.emit("join_game", {"name": c.name, "code": code, "player_id": c.player_id})
+            await asyncio.wait_for(c.joined.wait(), timeout)
+        await owner.emit("start_game")
+        await asyncio.wait_for(asyncio.gather(*(c.done.wait() for c in clients)), timeout)
+        stats.games += 1
+    except asyncio.TimeoutError:
+        stats.errors["game timeout"] += 1
+    except socketio.exceptions.ConnectionError:
+        stats.errors["connect failed"] += 1
+    finally:
+        for c in clients:
+            if c.sio.connected:
+                await c.close()
+
+
+async def run(url, games, players, concurrency, seed, timeout):
+    stats = LoadStats()
+    rng = random.Random(seed)
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with gate:
+            await play_game(url, players, stats, random.Random(rng.random()), timeout)
+
+    await asyncio.gather(*(one() for _ in range(games)))
+    return stats
+
+
+def spawn_server(url, wait=15):
+    # app.py's server in the background (no reloader), returned once it accepts connections
+    address = urllib.parse.urlsplit(url)
+    run = (
+        "import app; app.socketio.run(app.app, host=%r, port=%d, allow_unsafe_werkzeug=True)"
+        % (address.hostname, address.port or 80)
+    )
+    proc = subprocess.Popen([sys.executable, "-c", run])
+    deadline = time.time() + wait
+    while time.time() < deadline:
+        try:
+            socket.create_connection((address.hostname, address.port or 80), timeout=1).close()
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"server did not come up on {url}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--players", type=int, default=3, help="clients per game")
+    parser.add_argument("--concurrency", type=int, default=50, help="games in flight at once")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds before a game counts as stuck")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--spawn", action="store_true", help="start app.py locally first")
+    args = parser.parse_args(argv)
+
+    server = spawn_server(args.url) if args.spawn else None
+    try:
+        stats = asyncio.run(run(args.url, args.games, args.players, args.concurrency, args.seed, args.timeout))
+    finally:
+        if server is not None:
+            server.terminate()
+    print(stats.report())
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""In-process metrics rendered in the Prometheus text format (served by app.py at /metrics).
+
+Counters, gauges and histograms with optional labels, safe to update from concurrent
+handlers. Counters and gauges may instead be given a function, read at scrape time. No
+client library needed; each worker exposes its own numbers.
+"""
+import bisect
+import functools
+import logging
+import threading
+import time
+
+timing_log = logging.getLogger("flip7.timing")
+
+# Seconds: from a cached dict hit to a slow handler under load
+TIME_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+SIZE_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+_metrics = []
+_lock = threading.Lock()
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.fn = fn        # read at scrape time: () -> value, or {label values tuple: value}
+        self._values = {}   # label values tuple -> value
+        _metrics.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self):
+        if self.fn is not None:
+            value = self.fn()
+            if not self.labels:
+                return [(self.name, "", value)]
+            return [(self.name, _label_text(self.labels, key), v) for key, v in sorted(value.items())]
+        with _lock:
+            return [(self.name, _label_text(self.labels, key), value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {_number(value)}" for name, labels, value in self.samples()]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=TIME_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # per-bucket counts (the last one is +Inf), then the sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        res = []
+        with _lock:
+            items = sorted((key, list(counts)) for key, counts in self._values.items())
+        for key, counts in items:
+            total = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                total += n
+                le = bound if bound == "+Inf" else _number(bound)
+                res.append((f"{self.name}_bucket", _label_text(self.labels, key, [("le", le)]), total))
+            res.append((f"{self.name}_sum", _label_text(self.labels, key), counts[-1]))
+            res.append((f"{self.name}_count", _label_text(self.labels, key), total))
+        return res
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+        self.histogram.observe(self.elapsed, **self.labels)
+
+
+def timed_handler(histogram, event):
+    # Handler wrapper: one observation per call, plus a structured debug line
+    def wrap(handler):
+        @functools.wraps(handler)
+        def wrapper(*args):
+            with histogram.time(event=event) as timer:
+                res = handler(*args)
+            timing_log.debug("event=%s seconds=%.6f", event, timer.elapsed)
+            return res
+        return wrapper
+    return wrap
+
+
+def render():
+    return "\n".join(metric.render() for metric in _metrics) + "\n"
@@ -0,0 +1,172 @@
+"""Monte Carlo estimate of how the current round ends, for every player at once.
+
+estimate() takes the game as it stands (each player's numbers, bonuses, Second Chances and
+who has finished, plus the cards left in the draw pile) and plays the rest of the round a
+thousand times (by default) in NumPy arrays, one row per rollout, with no Game objects
+involved. The draw pile is shuffled per rollout. When it runs out, a freshly shuffled full
+deck follows, as Deck.draw does. Unfinished players hit below a score threshold. Action cards
+are scored as in odds.py: played on an opponent and neutral for the drawer. Pending prompts
+are ignored.
+
+Most of the cost is a fixed overhead per draw step, and a round takes a few dozen steps. For
+4 players at the start of a round it measured 4-6 ms at 1000 rollouts (500 is barely cheaper)
+and 9-10 ms at 2000.
+
+NumPy is imported on first use, as in odds.odds_batch.
+"""
+from collections import namedtuple
+
+from game import BONUS_FLIP7, CARD_CATALOGUE, FLIP7_NUMBERS, Card, CardType
+
+NUMBER_VALUES = 13   # 0..12
+
+
+class Estimate(namedtuple("Estimate", "scores busts flip7s totals")):
+    """Rollout results, one row per rollout and one column per seat: round scores, busts, Flip 7s,
+    and match totals after the round."""
+
+    __slots__ = ()
+
+    @property
+    def mean(self):
+        return self.scores.mean(axis=0)
+
+    @property
+    def bust(self):
+        return self.busts.mean(axis=0)
+
+    @property
+    def flip7(self):
+        return self.flip7s.mean(axis=0)
+
+    @property
+    def lead(self):
+        # Chance of having the best total once the round is scored (ties count for everyone tied)
+        return (self.totals == self.totals.max(axis=1, keepdims=True)).mean(axis=0)
+
+    def distribution(self, seat):
+        """P(round score == s) for s = 0, 1, 2, ..."""
+        import numpy as np
+
+        return np.bincount(self.scores[:, seat].astype(np.int64)) / len(self.scores)
+
+
+def _card_tables(np, width):
+    # Per card code: what drawing it does
+    cards = [Card.from_code(code) for code in range(width)]
+    is_number = np.array([c.type == CardType.NUMBER for c in cards])
+    value = np.array([c.value if c.type == CardType.NUMBER else 0 for c in cards])
+    is_second_chance = np.array([c.type == CardType.SECOND_CHANCE for c in cards])
+    is_bonus = np.array([c.type == CardType.BONUS for c in cards])
+    add = np.array([c.add for c in cards])
+    mult = np.array([c.mult for c in cards])
+    return is_number, value, is_second_chance, is_bonus, add, mult
+
+
+def estimate(game, rollouts=1000, thresholds=20, hit_first=None, rng=None):
+    """Estimate for the rest of the current round.
+
+    thresholds: the round score each seat stays at (a number, or one per seat).
+    hit_first: force the current player's next decision (True hit, False stay); None follows
+    their threshold. Comparing both with the same rng seed is how a bot uses this.
+    rng: a seed or numpy Generator.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(rng)
+    players = game.players
+    n_players = len(players)
+    pile = [card.code for card in game.deck.cards]
+    refill = [card.code for card in CARD_CATALOGUE]
+    width = max(pile + refill) + 1
+    is_number, value, is_second_chance, is_bonus, card_add, card_mult = _card_tables(np, width)
+    threshold = np.broadcast_to(np.asarray(thresholds, dtype=float), (n_players,))
+
+    # Each rollout shuffles its own copy of the pile lazily, one Fisher-Yates swap per draw: a
+    # round draws a few dozen cards, so permuting whole piles up front would be most of the cost
+    stride = max(len(pile), len(refill))
+    piles = np.zeros((rollouts, stride), dtype=np.int64)
+    piles[:, :len(pile)] = pile
+    size = np.full(rollouts, len(pile))
+    drawn = np.zeros(rollouts, dtype=np.int64)
+    flat = piles.ravel()
+    row_start = np.arange(rollouts) * stride
+
+    # Seat state as flat arrays, rollout r seat s at r * n_players + s
+    def per_seat(values, dtype):
+        return np.tile(np.asarray(values, dtype=dtype), rollouts)
+
+    held = np.zeros((rollouts * n_players, NUMBER_VALUES), dtype=bool)
+    for seat, p in enumerate(players):
+        held[seat::n_players, sorted(p.numbers)] = True
+    held_count = per_seat([len(p.numbers) for p in players], np.int64)
+    number_sum = per_seat([sum(p.numbers) for p in players], np.int64)
+    add = per_seat([p._add_bonus for p in players], np.int64)
+    mult = per_seat([p._multiplier for p in players], np.int64)
+    second_chance = per_seat([p.second_chance for p in players], np.int64)
+    busted = per_seat([p.busted for p in players], bool)
+    flip7 = per_seat([p.flip7 for p in players], bool)
+    finished = per_seat([p.finished for p in players], bool)
+
+    base = np.arange(rollouts) * n_players
+    turn = np.full(rollouts, game.turn)
+    live = np.flatnonzero(~finished[base + game.turn])   # rollouts whose round is still going
+    first = hit_first is not None
+    while len(live):
+        at = base[live] + turn[live]
+        if first:
+            hit = np.full(len(live), bool(hit_first))
+            first = False
+        else:
+            hit = (number_sum[at] + add[at]) * mult[at] < threshold[turn[live]]
+        finished[at[~hit]] = True
+
+        # One card for each hitting rollout
+        r, i = live[hit], at[hit]
+        empty = r[drawn[r] == size[r]]
+        # As Deck.draw: a full deck replaces an exhausted pile
+        piles[empty, :len(refill)] = refill
+        size[empty] = len(refill)
+        drawn[empty] = 0
+        top = row_start[r] + drawn[r]
+        pick = top + (rng.random(len(r)) * (size[r] - drawn[r])).astype(np.int64)
+        card = flat[pick]
+        flat[pick] = flat[top]
+        drawn[r] += 1
+
+        num = is_number[card]
+        inum, vnum = i[num], value[card[num]]
+        dup = held[inum, vnum]
+        spare = second_chance[inum] > 0
+        second_chance[inum[dup & spare]] -= 1
+        out = inum[dup & ~spare]
+        busted[out] = True
+        finished[out] = True
+        fresh, vfresh = inum[~dup], vnum[~dup]
+        held[fresh, vfresh] = True
+        number_sum[fresh] += vfresh
+        held_count[fresh] += 1
+        seven = fresh[held_count[fresh] == FLIP7_NUMBERS]
+        flip7[seven] = True
+        finished[seven] = True
+
+        sc = is_second_chance[card]
+        second_chance[i[sc]] += 1
+        bonus = is_bonus[card]
+        add[i[bonus]] += card_add[card[bonus]]
+        mult[i[bonus]] *= card_mult[card[bonus]]
+
+        # Next unfinished seat after the current one, as Game.next_turn; rollouts without one are done
+        current = turn[live]
+        found = np.zeros(len(live), dtype=bool)
+        for k in range(1, n_players + 1):
+            seat = (current + k) % n_players
+            ok = ~found & ~finished[base[live] + seat]
+            turn[live[ok]] = seat[ok]
+            found |= ok
+        live = live[found]
+
+    shape = (rollouts, n_players)
+    scores = np.where(busted, 0, (number_sum + add) * mult + BONUS_FLIP7 * flip7).reshape(shape)
+    totals = scores + np.array([p.total_score for p in players])
+    return Estimate(scores, busted.reshape(shape), flip7.reshape(shape), totals)
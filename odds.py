@@ -0,0 +1,163 @@
+"""Exact odds for one hit: bust and Flip 7 chances, and the expected round score of hitting vs staying.
+
+A state is a canonical (hand, counts) pair:
+    hand    (numbers, add_bonus, multiplier, second_chance), numbers as a sorted tuple
+    counts  ((card code, copies left), ...) for the draw pile, sorted by code
+so equal situations share one memoized answer however the cards got there.
+
+Freeze, Flip Three and Discard are played on an opponent and leave the drawer's score alone.
+With alone=True there is nobody else to target: a Flip Three drawn on the hit then forces three
+more draws on the drawer, which are followed exactly (a Flip Three among those three is still
+scored as neutral, which keeps the search bounded). Freeze and Discard stay neutral either way:
+the hand is banked as it is, and a Discard goes to whoever still has numbers.
+
+odds_batch() evaluates many states at once with NumPy (optional, imported on first use).
+"""
+import functools
+from collections import Counter, namedtuple
+
+from game import BONUS_FLIP7, FLIP7_NUMBERS, Card, CardType
+
+
+class Odds(namedtuple("Odds", "bust flip7 stay hit")):
+    """Chances the next card busts or completes a Flip 7, and expected round scores."""
+
+    __slots__ = ()
+
+    @property
+    def should_hit(self):
+        return self.hit > self.stay
+
+
+def hand_key(player):
+    return (tuple(sorted(player.numbers)), player._add_bonus, player._multiplier, player.second_chance)
+
+
+def deck_counts(cards):
+    return tuple(sorted(Counter(card.code for card in cards).items()))
+
+
+def score(hand):
+    numbers, add, mult, _ = hand
+    res = (sum(numbers) + add) * mult
+    if len(numbers) == FLIP7_NUMBERS:
+        res += BONUS_FLIP7
+    return res
+
+
+def _take(counts, idx):
+    # counts with one copy of counts[idx] drawn
+    code, n = counts[idx]
+    if n == 1:
+        return counts[:idx] + counts[idx + 1:]
+    return counts[:idx] + ((code, n - 1),) + counts[idx + 1:]
+
+
+def _draw(hand, card):
+    """(hand after drawing card, busted)."""
+    numbers, add, mult, second_chance = hand
+    if card.type == CardType.NUMBER:
+        if card.value in numbers:
+            if second_chance:
+                return (numbers, add, mult, second_chance - 1), False
+            return hand, True
+        return (tuple(sorted(numbers + (card.value,))), add, mult, second_chance), False
+    if card.type == CardType.SECOND_CHANCE:
+        return (numbers, add, mult, second_chance + 1), False
+    if card.type == CardType.BONUS:
+        return (numbers, add + card.add, mult * card.mult, second_chance), False
+    return hand, False
+
+
+@functools.lru_cache(maxsize=200000)
+def _draws(hand, counts, draws, alone):
+    """(bust, flip7, expected score) after `draws` forced draws, then staying.
+
+    alone: a Flip Three drawn here forces three more draws (only ever passed for the hit itself).
+    """
+    if draws == 0 or len(hand[0]) == FLIP7_NUMBERS:
+        return 0.0, float(len(hand[0]) == FLIP7_NUMBERS), float(score(hand))
+    if not counts:
+        # Only reachable on a deterministic deck that ran dry mid-Flip Three
+        return 0.0, 0.0, float(score(hand))
+    total = sum(n for _, n in counts)
+    bust = flip7 = ev = 0.0
+    for idx, (code, n) in enumerate(counts):
+        p = n / total
+        card = Card.from_code(code)
+        nxt, busted = _draw(hand, card)
+        if busted:
+            bust += p
+            continue
+        more = draws - 1
+        if alone and card.type == CardType.FLIP_3:
+            more += 3
+        if more == 0 or len(nxt[0]) == FLIP7_NUMBERS:
+            # Last draw: score the hand here rather than through another cached call
+            flip7 += p * (len(nxt[0]) == FLIP7_NUMBERS)
+            ev += p * score(nxt)
+            continue
+        b, f, e = _draws(nxt, _take(counts, idx), more, False)
+        bust += p * b
+        flip7 += p * f
+        ev += p * e
+    return bust, flip7, ev
+
+
+def odds_for(hand, counts, alone=False):
+    bust, flip7, hit = _draws(hand, counts, 1, alone)
+    return Odds(bust, flip7, float(score(hand)), hit)
+
+
+def odds(player, cards, alone=False):
+    """Odds for player hitting once on the draw pile `cards` (e.g. game.deck.cards)."""
+    return odds_for(hand_key(player), deck_counts(cards), alone)
+
+
+def odds_batch(states):
+    """odds_for() over many (hand, counts) states at once; returns Odds of NumPy arrays.
+
+    Action cards are always scored as played on an opponent (alone=False).
+    """
+    import numpy as np
+
+    n = len(states)
+    width = max([code for _, counts in states for code, _ in counts] + [0]) + 1
+    cards = [Card.from_code(code) for code in range(width)]
+
+    copies = np.zeros((n, width))
+    held = np.zeros((n, 13), dtype=bool)
+    number_sum = np.zeros(n)
+    add = np.zeros(n)
+    mult = np.ones(n)
+    second_chance = np.zeros(n, dtype=bool)
+    for row, (hand, counts) in enumerate(states):
+        numbers, add[row], mult[row], second_chance[row] = hand
+        held[row, list(numbers)] = True
+        number_sum[row] = sum(numbers)
+        for code, k in counts:
+            copies[row, code] = k
+    held_count = held.sum(axis=1)
+    stay = (number_sum + add) * mult + BONUS_FLIP7 * (held_count == FLIP7_NUMBERS)
+
+    # Round score after each possible card, one column per card code
+    after = np.repeat(stay[:, None], width, axis=1)
+    busts = np.zeros((n, width), dtype=bool)
+    completes = np.zeros((n, width), dtype=bool)
+    for code, card in enumerate(cards):
+        if card.type == CardType.NUMBER:
+            dup = held[:, card.value]
+            completes[:, code] = ~dup & (held_count == FLIP7_NUMBERS - 1)
+            busts[:, code] = dup & ~second_chance
+            fresh = (number_sum + card.value + add) * mult + BONUS_FLIP7 * completes[:, code]
+            after[:, code] = np.where(dup, np.where(busts[:, code], 0.0, stay), fresh)
+        elif card.type == CardType.BONUS:
+            after[:, code] = (number_sum + add + card.add) * mult * card.mult
+
+    p = copies / copies.sum(axis=1, keepdims=True)
+    return Odds(
+        (p * busts).sum(axis=1),
+        (p * completes).sum(axis=1),
+        stay,
+        (p * after).sum(axis=1),
+    )
@@ -0,0 +1,50 @@
+"""Per-recipient views of a game.
+
+The room shares one Game.public_dict() stream; each connection additionally gets a small
+overlay saying who it is and which prompts are waiting on it. Overlays are derived from the
+same public state the room was sent, so a client never sees the two disagree.
+"""
+
+# Prompt name -> public state key holding the seat it waits on
+PROMPTS = {
+    "freeze": "pending_freeze",
+    "flip3": "pending_flip3",
+    "discard_choose_target": "pending_discard_choose_target",
+    "discard_choose_card": "pending_discard_choose_card",
+}
+
+
+def overlay(game, player, state):
+    seat = game.seat_of(player.player_id)
+    return {
+        "seat": seat,
+        "player_id": player.player_id,
+        "owner": player.player_id == game.owner_player_id,
+        "prompts": [name for name, key in PROMPTS.items() if state.get(key) == seat],
+    }
+
+
+class Overlays:
+    """The overlay last sent to each connection, so only changes go out."""
+
+    def __init__(self):
+        self._sent = {}   # sid -> overlay
+
+    def changed(self, game, state):
+        # [(sid, overlay)] for the connected players whose overlay differs from what they have
+        res = []
+        for player in game.players:
+            if player.sid is None or player.bot is not None:
+                continue
+            view = overlay(game, player, state)
+            if self._sent.get(player.sid) != view:
+                self._sent[player.sid] = view
+                res.append((player.sid, view))
+        return res
+
+    def current(self, game, player, state):
+        view = self._sent[player.sid] = overlay(game, player, state)
+        return view
+
+    def forget(self, sid):
+        self._sent.pop(sid, None)
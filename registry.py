@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from store import MemoryGameStore
+
+log = logging.getLogger(__name__)
+
+# Eviction reasons, also the labels of GameRegistry.evictions
+EVICT_FINISHED = "finished"
+EVICT_ABANDONED = "abandoned"
+EVICT_IDLE = "idle"
+EVICT_CAPACITY = "capacity"
+
+
+class GameRegistry:
+    """Live games and the game each connection belongs to, safe to use from concurrent handlers.
+
+    Registry operations take a short registry-wide lock; gameplay on a table takes that
+    table's own lock (see lock()), so events for one game apply serially while different
+    games proceed in parallel. Under eventlet/gevent the threading locks are monkey-patched
+    into green locks.
+
+    Games are written through to a GameStore after every action (save()), and a code that
+    is not live here is looked up in the store, so tables survive restarts.
+
+    Memory is bounded by sweep() (TTLs, in seconds, for finished, abandoned and idle games)
+    and by max_games, which evicts the least recently active game when a new one is added.
+    Neither evicts a game whose lock a handler holds, so the cap can be exceeded briefly.
+    With a persistent store that eviction only pages the game out of memory: it stays in the
+    store, its connections stay attached, and the next lookup loads it back.
+    on_evict(code, game, reason) is called outside the registry lock for every eviction, and
+    on_load(game) for every game loaded from the store.
+    """
+
+    def __init__(self, store=None, max_games=None, finished_ttl=600, abandoned_ttl=300,
+                 idle_ttl=6 * 3600, on_evict=None, on_load=None):
+        self.store = store or MemoryGameStore()
+        self.max_games = max_games
+        self.finished_ttl = finished_ttl
+        self.abandoned_ttl = abandoned_ttl
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+        self.on_load = on_load
+        self.evictions = Counter()
+        self._lock = threading.RLock()
+        self._games = OrderedDict()   # code -> Game, least recently active first
+        self._last_active = {}        # code -> time.monotonic() of the last action
+        self._player_game = {}        # sid -> code
+        self._game_locks = {}         # code -> RLock
+
+    def __len__(self):
+        return len(self._games)
+
+    def __contains__(self, code):
+        return code in self._games
+
+    def _touch(self, code):
+        self._last_active[code] = time.monotonic()
+        self._games.move_to_end(code)
+
+    def add(self, game):
+        with self._lock:
+            self._games[game.code] = game
+            self._game_locks[game.code] = threading.RLock()
+            self._touch(game.code)
+            self.store.save(game)
+            evicted = self._evict_over_capacity(game.code)
+        self._notify(evicted)
+
+    def get(self, code):
+        game = self._games.get(code)
+        if game is not None or not code:
+            return game
+        evicted = []
+        with self._lock:
+            if code not in self._games:
+                game = self.store.load(code)
+                if game is None:
+                    return None
+                if self.on_load is not None:
+                    self.on_load(game)
+                self._games[code] = game
+                self._touch(code)
+                evicted = self._evict_over_capacity(code)
+            game = self._games[code]
+        self._notify(evicted)
+        return game
+
+    def _evict_over_capacity(self, keep):
+        # Least recently active first, never `keep` (the game just added or loaded) and never a
+        # game a handler holds; the caller notifies once outside the lock
+        evicted = []
+        if self.max_games is None:
+            return evicted
+        for code in list(self._games):
+            if len(self._games) <= self.max_games:
+                break
+            if code == keep:
+                continue
+            game_lock = self._game_locks.get(code)
+            if game_lock is not None and not game_lock.acquire(blocking=False):
+                continue
+            try:
+                if self.store.persistent:
+                    evicted.append((code, self._page_out(code), EVICT_CAPACITY))
+                else:
+                    evicted.append((code, self._drop(code), EVICT_CAPACITY))
+            finally:
+                if game_lock is not None:
+                    game_lock.release()
+        return evicted
+
+    def save(self, game):
+        with self._lock:
+            if game.code in self._games:
+                self._touch(game.code)
+        self.store.save(game)
+
+    def lock(self, code):
+        with self._lock:
+            return self._game_locks.setdefault(code, threading.RLock())
+
+    def attach(self, sid, code):
+        with self._lock:
+            self._player_game[sid] = code
+
+    def detach(self, sid):
+        with self._lock:
+            return self._player_game.pop(sid, None)
+
+    def for_sid(self, sid):
+        with self._lock:
+            code = self._player_game.get(sid)
+        return self.get(code) if code is not None else None
+
+    def remove(self, code):
+        # Drops the game and every connection still pointing at it
+        with self._lock:
+            return self._drop(code)
+
+    def _drop(self, code):
+        game = self._games.pop(code, None)
+        self._game_locks.pop(code, None)
+        self._last_active.pop(code, None)
+        self.store.delete(code)
+        for sid in [sid for sid, c in self._player_game.items() if c == code]:
+            del self._player_game[sid]
+        return game
+
+    def _page_out(self, code):
+        # Memory only: the store, the game's lock and its connections stay for the reload
+        self._last_active.pop(code, None)
+        return self._games.pop(code, None)
+
+    def _expired(self, game, idle_for):
+        if game.match_winner is not None and idle_for >= self.finished_ttl:
+            return EVICT_FINISHED
+        # Bot-only tables run unattended on purpose; otherwise abandoned means every human left
+        humans = [p for p in game.players if p.bot is None]
+        bot_only = bool(game.players) and not humans
+        if not bot_only and all(p.sid is None for p in humans) and idle_for >= self.abandoned_ttl:
+            return EVICT_ABANDONED
+        if idle_for >= self.idle_ttl:
+            return EVICT_IDLE
+        return None
+
+    def sweep(self, now=None):
+        """Evict expired games; returns [(code, reason)]."""
+        now = time.monotonic() if now is None else now
+        evicted = []
+        with self._lock:
+            for code, game in list(self._games.items()):
+                reason = self._expired(game, now - self._last_active.get(code, now))
+                if reason is None:
+                    continue
+                game_lock = self._game_locks.get(code)
+                # Never pull a game out from under a handler that is using it
+                if game_lock is not None and not game_lock.acquire(blocking=False):
+                    continue
+                try:
+                    evicted.append((code, self._drop(code), reason))
+                finally:
+                    if game_lock is not None:
+                        game_lock.release()
+        self._notify(evicted)
+        return [(code, reason) for code, _, reason in evicted]
+
+    def _notify(self, evicted):
+        for code, game, reason in evicted:
+            self.evictions[reason] += 1
+            log.info("evicted game %s (%s)", code, reason)
+            if self.on_evict is not None:
+                # One failing hook must not cost the other evictions their cleanup
+                try:
+                    self.on_evict(code, game, reason)
+                except Exception:
+                    log.exception("on_evict failed for game %s", code)
+
+    def codes(self):
+        with self._lock:
+            return list(self._games)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "games": len(self._games),
+                "connections": len(self._player_game),
+                "evictions": dict(self.evictions),
+            }
@@ -0,0 +1,179 @@
+"""Headless match simulator: plays Game to WIN_SCORE with bot policies, no Flask or Socket.IO involved.
+
+    python simulate.py threshold:20 threshold:25 random --matches 10000 --workers 4 --seed 1
+"""
+import argparse
+import multiprocessing
+import random
+import time
+
+from game import Game, STATES_NONE
+from policies import make_policy
+
+MAX_ACTIONS = 100000
+
+
+class SimStats:
+    def __init__(self, specs):
+        self.specs = list(specs)
+        n = len(self.specs)
+        self.matches = 0
+        self.rounds = 0
+        self.actions = 0
+        self.wins = [0] * n
+        self.player_rounds = [0] * n
+        self.busts = [0] * n
+        self.flip7s = [0] * n
+        self.points = [0] * n
+
+    def merge(self, other):
+        self.matches += other.matches
+        self.rounds += other.rounds
+        self.actions += other.actions
+        for field in ("wins", "player_rounds", "busts", "flip7s", "points"):
+            mine = getattr(self, field)
+            for idx, value in enumerate(getattr(other, field)):
+                mine[idx] += value
+        return self
+
+    def report(self):
+        lines = [
+            f"matches: {self.matches}",
+            f"avg rounds per match: {self.rounds / max(self.matches, 1):.2f}",
+        ]
+        for idx, spec in enumerate(self.specs):
+            rounds = max(self.player_rounds[idx], 1)
+            lines.append(
+                f"[{idx}] {spec:<16} win {self.wins[idx] / max(self.matches, 1):6.1%}"
+                f"  bust {self.busts[idx] / rounds:6.1%}"
+                f"  flip7 {self.flip7s[idx] / rounds:6.2%}"
+                f"  pts/round {self.points[idx] / rounds:6.2f}"
+            )
+        return "\n".join(lines)
+
+
+def step(game, seats):
+    # Perform whichever single decision the game is waiting on
+    if game.pending_round_reset:
+        game.proceed_round()
+        return
+
+    if game.pending_actions:
+        action = game.pending_actions[-1]
+        kind = action["action"]
+        if kind == "draw3":
+            # A Flip Three was left mid-way (its follow-up choice was rejected): resume it
+            game.process_pending_actions()
+        elif kind == "freeze":
+            player, policy = seats[action["player_id"]]
+            game.apply_freeze(player.sid, policy.choose_freeze_target(game, player).sid)
+        elif kind == "flip3":
+            player, policy = seats[action["player_id"]]
+            game.apply_flip3(player.sid, policy.choose_flip3_target(game, player).sid)
+        elif kind == "discard_choose_target":
+            player, policy = seats[action["player_id"]]
+            target = policy.choose_discard_target(game, player)
+            game.apply_discard_choose_target(player.sid, target.sid, action["card_idx"])
+        elif kind == "discard_choose_card":
+            player, policy = seats[action["target_id"]]
+            game.apply_discard_choose_card(player.sid, policy.choose_discard_card(game, player))
+        return
+
+    player = game.current_player()
+    _, policy = seats[player.player_id]
+    if not player.finished and policy.hit_or_stay(game, player):
+        game.hit(player.sid)
+    else:
+        game.stay(player.sid)
+
+
+def play_match(specs, seed, stats=None):
+    """Play one match to WIN_SCORE. Seat order is rotated by seed so no policy keeps the first turn."""
+    stats = stats or SimStats(specs)
+    n = len(specs)
+    offset = seed % n
+    order = [(slot + offset) % n for slot in range(n)]
+
+    game = Game(owner_player_id="sim0", state_mode=STATES_NONE, seed=seed)
+    seats = {}
+    for seat, slot in enumerate(order):
+        sid = f"sim{seat}"
+        player = game.add_player(f"{specs[slot]}#{slot}", sid, sid)
+        seats[sid] = (player, make_policy(specs[slot], random.Random(seed * n + slot)))
+    slot_of = {seats[f"sim{seat}"][0].player_id: slot for seat, slot in enumerate(order)}
+    game.start("sim0")
+
+    round_recorded = False
+    for _ in range(MAX_ACTIONS):
+        if game.match_winner:
+            break
+        step(game, seats)
+        stats.actions += 1
+        if game.pending_round_reset or game.match_winner:
+            if not round_recorded:
+                round_recorded = True
+                stats.rounds += 1
+                for p in game.players:
+                    slot = slot_of[p.player_id]
+                    stats.player_rounds[slot] += 1
+                    stats.busts[slot] += p.busted
+                    stats.flip7s[slot] += p.flip7
+                    stats.points[slot] += p.round_score()
+        else:
+            round_recorded = False
+    else:
+        raise RuntimeError(f"Match with seed {seed} did not finish in {MAX_ACTIONS} actions")
+
+    stats.matches += 1
+    stats.wins[slot_of[game.match_winner.player_id]] += 1
+    return stats
+
+
+def _run_chunk(args):
+    specs, first_seed, count = args
+    stats = SimStats(specs)
+    for seed in range(first_seed, first_seed + count):
+        play_match(specs, seed, stats)
+    return stats
+
+
+def simulate(specs, matches, seed=0, workers=1, chunk_size=500):
+    # Shard consecutive seeds across processes; results do not depend on the worker count
+    chunks = [
+        (specs, seed + start, min(chunk_size, matches - start))
+        for start in range(0, matches, chunk_size)
+    ]
+    total = SimStats(specs)
+    if workers <= 1:
+        for chunk in chunks:
+            total.merge(_run_chunk(chunk))
+        return total
+
+    with multiprocessing.Pool(workers) as pool:
+        for stats in pool.imap_unordered(_run_chunk, chunks):
+            total.merge(stats)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate Flip 7 matches between bot policies")
+    parser.add_argument("policies", nargs="+", help="one spec per seat, e.g. threshold:20 random:0.5")
+    parser.add_argument("--matches", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1, help="0 uses every core")
+    args = parser.parse_args(argv)
+
+    for spec in args.policies:
+        make_policy(spec)  # fail fast on typos before spawning workers
+    workers = args.workers or multiprocessing.cpu_count()
+
+    started = time.perf_counter()
+    stats = simulate(args.policies, args.matches, seed=args.seed, workers=workers)
+    elapsed = time.perf_counter() - started
+
+    print(stats.report())
+    print(f"{stats.matches / elapsed:.0f} matches/s ({stats.actions / elapsed:.0f} actions/s) on {workers} worker(s)")
+
+
+if __name__ == "__main__":
+    main()
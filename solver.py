@@ -0,0 +1,227 @@
+"""Optimal single-round hit/stay policy by dynamic programming, exported as a lookup table.
+
+    python solver.py policy.bin                 # maximize expected round score
+    python solver.py reach40.bin --target 40    # maximize the chance of banking 40+ this round
+
+The model is one player drawing alone from a fresh deck, so only their own cards leave it.
+A hand state is the set of numbers held, the bonus cards held and how many Second Chances are
+held (up to the deck's copies). Freeze, Flip Three and Discard are played on an opponent, so
+those draws never change the state and are conditioned away. Second Chances stack as in
+game.py: drawing one adds one, and a duplicate spends one, which returns to an earlier state;
+the states of a hand that differ only in Second Chances are solved together as a small fixed
+point.
+
+A table is one bit per state (1 = hit), about 400 KB for the full deck and far less
+compressed. Bots load it once at startup (see policies.SolvedPolicy).
+"""
+import argparse
+import functools
+import json
+import time
+import zlib
+from collections import Counter
+
+from game import BONUS_FLIP7, CARD_CATALOGUE, FLIP7_NUMBERS, Card, CardType
+
+NUMBER_BITS = 13
+
+
+def composition(cards=CARD_CATALOGUE):
+    return tuple(sorted(Counter(card.code for card in cards).items()))
+
+
+class PolicyTable:
+    """Solved hit/stay decisions for a deck composition, indexed by hand state."""
+
+    def __init__(self, counts, target=None, bits=None, values=None):
+        self.counts = counts
+        self.target = target
+        cards = [(Card.from_code(code), n) for code, n in counts]
+        self.bonus_codes = [card.code for card, _ in cards if card.type == CardType.BONUS]
+        self.bonus_limits = [n for card, n in cards if card.type == CardType.BONUS]
+        self.bonus_states = 1
+        for n in self.bonus_limits:
+            self.bonus_states *= n + 1
+        self.second_chances = sum(n for card, n in cards if card.type == CardType.SECOND_CHANCE)
+        self.bits = bits if bits is not None else bytearray((self.size() + 7) // 8)
+        if len(self.bits) != (self.size() + 7) // 8:
+            raise ValueError("table does not match its deck (solved by an older version?)")
+        self.values = values   # state index -> value, kept only by a fresh solve
+        self.start_value = None
+
+    def size(self):
+        return (self.bonus_states * (self.second_chances + 1)) << NUMBER_BITS
+
+    def index(self, mask, bonus, second_chance):
+        # bonus: copies held of each bonus code, as a mixed-radix digit string
+        b = 0
+        for held, limit in zip(bonus, self.bonus_limits):
+            b = b * (limit + 1) + held
+        return ((b * (self.second_chances + 1) + second_chance) << NUMBER_BITS) | mask
+
+    def set_hit(self, idx):
+        self.bits[idx >> 3] |= 1 << (idx & 7)
+
+    def hit(self, mask, bonus, second_chance):
+        idx = self.index(mask, bonus, second_chance)
+        return bool(self.bits[idx >> 3] >> (idx & 7) & 1)
+
+    def state_of(self, player):
+        mask = 0
+        for value in player.numbers:
+            mask |= 1 << value
+        held = Counter(card.code for card in player.cards if card.type == CardType.BONUS)
+        bonus = tuple(min(held[code], limit) for code, limit in zip(self.bonus_codes, self.bonus_limits))
+        # More than the deck holds only happens across refills; the deck's count is the nearest state
+        return mask, bonus, min(player.second_chance, self.second_chances)
+
+    def decide(self, player):
+        return self.hit(*self.state_of(player))
+
+    def to_bytes(self):
+        header = json.dumps({"counts": self.counts, "target": self.target}).encode()
+        return header + b"\n" + zlib.compress(bytes(self.bits), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        header, _, body = data.partition(b"\n")
+        meta = json.loads(header)
+        counts = tuple((code, n) for code, n in meta["counts"])
+        return cls(counts, meta["target"], bytearray(zlib.decompress(body)))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def _score(mask, bonus_add, bonus_mult):
+    total = sum(v for v in range(NUMBER_BITS) if mask >> v & 1)
+    res = (total + bonus_add) * bonus_mult
+    if bin(mask).count("1") == FLIP7_NUMBERS:
+        res += BONUS_FLIP7
+    return res
+
+
+def solve(cards=CARD_CATALOGUE, target=None, keep_values=False):
+    """PolicyTable for the deck `cards`.
+
+    target=None maximizes the expected round score; target=N maximizes the chance of ending
+    the round with at least N points (the match objective when N points are missing to win).
+    """
+    counts = composition(cards)
+    table = PolicyTable(counts, target, values={} if keep_values else None)
+    numbers = [0] * NUMBER_BITS
+    second_chances = 0
+    bonuses = []   # (slot, add, mult, copies)
+    for code, n in counts:
+        card = Card.from_code(code)
+        if card.type == CardType.NUMBER:
+            numbers[card.value] = n
+        elif card.type == CardType.SECOND_CHANCE:
+            second_chances = n
+        elif card.type == CardType.BONUS:
+            bonuses.append((len(bonuses), card.add, card.mult, n))
+
+    def value_of(score):
+        if target is None:
+            return float(score)
+        return float(score >= target)
+
+    @functools.lru_cache(maxsize=None)
+    def values(mask, bonus):
+        """Values of this hand holding 0, 1, ... second_chances Second Chances."""
+        add, mult = 0, 1
+        for slot, bonus_add, bonus_mult, _ in bonuses:
+            add += bonus_add * bonus[slot]
+            mult *= bonus_mult ** bonus[slot]
+        stay = value_of(_score(mask, add, mult))
+        held = range(second_chances + 1)
+        if target is not None and stay >= 1.0:
+            # Already there: nothing can improve on certain success (pruned)
+            return (stay,) * len(held)
+
+        # Draws that move to another hand, per Second Chances held
+        weight = 0
+        gain = [0.0] * len(held)
+        dup_weight = 0
+        for v in range(NUMBER_BITS):
+            n = numbers[v]
+            if not n:
+                continue
+            if mask >> v & 1:
+                dup_weight += n - 1
+                continue
+            nxt = mask | (1 << v)
+            if bin(nxt).count("1") == FLIP7_NUMBERS:
+                after = (value_of(_score(nxt, add, mult)),) * len(held)
+            else:
+                after = values(nxt, bonus)
+            weight += n
+            for k in held:
+                gain[k] += n * after[k]
+        for slot, _, _, n in bonuses:
+            left = n - bonus[slot]
+            if not left:
+                continue
+            after = values(mask, bonus[:slot] + (bonus[slot] + 1,) + bonus[slot + 1:])
+            weight += left
+            for k in held:
+                gain[k] += left * after[k]
+
+        # Holding k: a duplicate busts (k = 0) or spends one (to k - 1), and each of the
+        # second_chances - k copies still in the deck adds one (to k + 1)
+        val = [stay] * len(held)
+        hit = [stay] * len(held)
+        for _ in range(1000):
+            moved = 0.0
+            for k in held:
+                total = weight + dup_weight + second_chances - k
+                if not total:
+                    continue
+                hit[k] = (gain[k] + dup_weight * (val[k - 1] if k else 0.0)
+                          + (second_chances - k) * (val[k + 1] if k < second_chances else 0.0)) / total
+                new = max(stay, hit[k])
+                moved = max(moved, abs(new - val[k]))
+                val[k] = new
+            if moved < 1e-12:
+                break
+        for k in held:
+            if hit[k] > stay:
+                table.set_hit(table.index(mask, bonus, k))
+            if table.values is not None:
+                table.values[table.index(mask, bonus, k)] = val[k]
+        return tuple(val)
+
+    start = values(0, (0,) * len(bonuses))
+    table.start_value = start[0]
+    values.cache_clear()
+    return table
+
+
+@functools.lru_cache(maxsize=None)
+def solved_table(target=None):
+    # Full-deck table solved on first use and kept for the life of the process
+    return solve(target=target)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="where to write the table")
+    parser.add_argument("--target", type=int, default=None, help="maximize P(round score >= TARGET) instead of the expected score")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    table = solve(target=args.target)
+    table.save(args.path)
+    objective = "expected score" if args.target is None else f"P(score >= {args.target})"
+    print(f"{objective} from an empty hand: {table.start_value:.4f}")
+    print(f"solved in {time.perf_counter() - started:.1f}s, wrote {args.path}")
+
+
+if __name__ == "__main__":
+    main()
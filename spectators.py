@@ -0,0 +1,37 @@
+"""Read-only watchers of a game, on a channel of their own.
+
+Players get every state the moment it exists, Flip Three frames included. Spectators get a
+SpectatorFeed: its own versioned stream, sent at most `rate` times a second and always jumping
+straight to the newest state, so the watchers of a busy table cost a bounded number of emits
+however fast the players act.
+"""
+from delta import StateStream
+
+
+class SpectatorFeed:
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.stream = StateStream()
+        self.sids = set()
+        self.pending = None     # newest state not sent yet
+        self.sent_at = None     # time.monotonic() of the last frame
+        self.scheduled = False  # a delayed flush is on its way
+
+    def offer(self, state, now):
+        """Seconds to wait before flushing (0: flush now), or None when a flush is already scheduled."""
+        self.pending = state
+        if self.scheduled:
+            return None
+        wait = 0 if self.sent_at is None else max(0.0, self.sent_at + self.interval - now)
+        if wait:
+            self.scheduled = True
+        return wait
+
+    def flush(self, now):
+        # The patch taking spectators to the newest state, or None if nothing is pending
+        self.scheduled = False
+        state, self.pending = self.pending, None
+        if state is None:
+            return None
+        self.sent_at = now
+        return self.stream.push(state)
@@ -1,17 +1,27 @@
-const socket = io();
+const savedGameCode = sessionStorage.getItem("game_code");
+// The game code rides along on the connection so a proxy can route every table to one worker
+// Ask for the compact state encoding (set localStorage flip7_encoding=json to debug with plain JSON)
+const wireEncoding = localStorage.getItem("flip7_encoding") || "compact";
+const socket = io({ query: { game: savedGameCode || "" }, auth: { encoding: wireEncoding } });
 
 const nameInput = document.getElementById('name');
 const codeInput = document.getElementById('code');
-const savedGameCode = sessionStorage.getItem("game_code");
 const roundWait = 5;
 
 let roundModalTimer = null;
 let roundModalRunning = false;
 let playerId = sessionStorage.getItem("player_id");
 let controlsLocked = false;
-let previousCardCounts = {};   // {player_id: numCards}
+let previousCardCounts = {};   // {seat: numCards}
 let previousRound = null;
 let isFirstState = true; // true at the beginning or after a refresh
+let currentState = null;   // last full state, kept up to date by applying patches
+let snapshotRequested = false;
+let onConnectAction = null;   // deferred emit while reconnecting to the game's worker
+let codec = null;             // key and card tables for the compact encoding
+let me = null;                // {seat, player_id, owner, prompts}: what the server says about us
+let spectating = sessionStorage.getItem("spectating") === "1";   // watching read-only
+let tournamentCode = sessionStorage.getItem("tournament_code");  // tournament we entered, if any
 
 if (!playerId) {
   playerId = crypto.randomUUID();
@@ -40,6 +50,7 @@ function createGame() {
     showInputError("Please enter your name.");
     return;
   }
+  setSpectating(false);
   socket.emit("create_game", { name: nameInput.value, player_id: playerId});
 }
 
@@ -48,13 +59,50 @@ function joinGame() {
     showInputError("Please enter your name and game code.");
     return;
   }
-  socket.emit("join_game", { name: nameInput.value, code: codeInput.value, player_id: playerId});
+  const code = codeInput.value.trim();
+  connectToGame(code, () => {
+    setSpectating(false);
+    socket.emit("join_game", { name: nameInput.value, code: code, player_id: playerId});
+  });
+}
+
+function watchGame() {
+  if (!codeInput.value.trim()) {
+    showInputError("Please enter a game code.");
+    return;
+  }
+  const code = codeInput.value.trim();
+  connectToGame(code, () => {
+    setSpectating(true);
+    socket.emit("watch_game", { code: code });
+  });
+}
+
+function setSpectating(on) {
+  spectating = on;
+  if (on) sessionStorage.setItem("spectating", "1");
+  else sessionStorage.removeItem("spectating");
+}
+
+function connectToGame(code, action) {
+  if (socket.connected && socket.io.opts.query.game === code) {
+    action();
+    return;
+  }
+  socket.io.opts.query.game = code;
+  onConnectAction = action;
+  socket.disconnect();
+  socket.connect();
 }
 
 function startGame() {
   socket.emit("start_game");
 }
 
+function addBot() {
+  socket.emit("add_bot", {});
+}
+
 function hit() {
   socket.emit("hit");
 }
@@ -63,19 +111,19 @@ function stay() {
   socket.emit("stay");
 }
 
-function freezeTarget(sid) {
+function freezeTarget(seat) {
   controlsLocked = true;
-  socket.emit("freeze_target", { target_sid: sid });
+  socket.emit("freeze_target", { target: seat });
 }
 
-function flip3Target(sid) {
+function flip3Target(seat) {
   controlsLocked = true;
-  socket.emit("flip3_target", { target_sid: sid});
+  socket.emit("flip3_target", { target: seat });
 }
 
-function discardChooseTarget(targetSid, cardIdx) {
+function discardChooseTarget(seat, cardIdx) {
   controlsLocked = true;
-  socket.emit("discard_choose_target", { target_sid: targetSid, card_idx: cardIdx });
+  socket.emit("discard_choose_target", { target: seat, card_idx: cardIdx });
 }
 function discardChooseCard(cardIdx) {
   controlsLocked = true;
@@ -94,9 +142,9 @@ function showRoundModal(state) {
   let roundModalCountdown = roundWait;
   document.getElementById("modalNextCountdown").innerText = `Next round starts in: ${roundModalCountdown}`;
   
-  // Use SID to make only ONE user send proceed_round (lowest sid is simplest, or owner if you prefer)
-  let allSids = state.players.map(p => p.sid).filter(Boolean).sort();
-  let I_am_first = (socket.id && allSids.length > 0 && socket.id === allSids[0]);
+  // Only ONE user sends proceed_round: the connected human with the lowest seat (bots have no client)
+  let firstConnected = state.players.find(p => p.connected && !p.bot);
+  let I_am_first = (me !== null && firstConnected !== undefined && firstConnected.seat === me.seat);
 
   roundModalTimer = setInterval(() => {
     roundModalCountdown--;
@@ -121,7 +169,19 @@ function hideRoundModal() {
 
 
 socket.on("connect", () => {
-  if (savedGameCode) {
+  if (onConnectAction) {
+    const action = onConnectAction;
+    onConnectAction = null;
+    action();
+    return;
+  }
+  if (tournamentCode) {
+    // Standings, and our current table if we are still in
+    socket.emit("watch_tournament", { code: tournamentCode, player_id: playerId });
+  }
+  if (savedGameCode && spectating) {
+    socket.emit("watch_game", { code: savedGameCode });
+  } else if (savedGameCode) {
     socket.emit("rejoin_game", {
       code: savedGameCode,
       player_id: playerId
@@ -129,23 +189,105 @@ socket.on("connect", () => {
   }
 });
 
-socket.on("state", state => {
+function applyPatch(state, patch) {
+  const next = Object.assign({}, state, patch.set || {});
+  next.version = patch.version;
+  if (patch.players) {
+    next.players = next.players.slice();
+    patch.players.forEach(([idx, changes]) => {
+      const p = Object.assign({}, next.players[idx], changes);
+      if (changes["cards+"]) {
+        p.cards = next.players[idx].cards.concat(changes["cards+"]);
+        delete p["cards+"];
+      }
+      next.players[idx] = p;
+    });
+  }
+  return next;
+}
+
+socket.on("tournament", t => {
+  tournamentCode = t.code;
+  sessionStorage.setItem("tournament_code", t.code);
+});
+
+socket.on("tournament_table", info => {
+  // The server seated us at a tournament table: play it like any other game
+  sessionStorage.setItem("game_code", info.code);
+  setSpectating(false);
+  currentState = null;
+  isFirstState = true;
+  socket.emit("request_state");
+});
+
+socket.on("you", overlay => {
+  me = overlay;
+});
+
+socket.on("codec", table => {
+  codec = table;
+});
+
+function decodeCard(c) {
+  if (typeof c === "number") return Object.assign({}, codec.cards[c]);
+  if (Array.isArray(c)) return Object.assign({}, codec.cards[c[0]], { target: c[1] });
+  return c;
+}
+
+function decodeWire(obj) {
+  // Undo codec.encode on the server: numeric keys back to names, card codes back to cards
+  if (!codec || obj === null || typeof obj !== "object") return obj;
+  if (Array.isArray(obj)) return obj.map(decodeWire);
+  const res = {};
+  for (const [k, v] of Object.entries(obj)) {
+    const name = /^\d+$/.test(k) ? codec.keys[+k] : k;
+    res[name] = (name === "cards" || name === "cards+") ? v.map(decodeCard) : decodeWire(v);
+  }
+  return res;
+}
+
+socket.on("state", wireState => {
+  const state = decodeWire(wireState);
+  // Snapshots are authoritative (the server's version counter restarts with the server)
+  snapshotRequested = false;
+  currentState = state;
+  renderState(state);
+});
+
+socket.on("state_patch", wirePatch => {
+  const patch = decodeWire(wirePatch);
+  if (!currentState || patch.base !== currentState.version) {
+    // Missed a version (or never got a snapshot): ask for the full state once
+    if (!snapshotRequested) {
+      snapshotRequested = true;
+      // Spectators are not part of the game: watching again brings a fresh snapshot
+      if (spectating) socket.emit("watch_game", { code: currentState ? currentState.code : savedGameCode });
+      else socket.emit("request_state");
+    }
+    return;
+  }
+  currentState = applyPatch(currentState, patch);
+  renderState(patch.extra ? Object.assign({}, currentState, patch.extra) : currentState);
+});
+
+function renderState(state) {
   let menu = document.getElementById("menu");
   let game = document.getElementById("game");
   let codeDisplay = document.getElementById("codeDisplay");
   let roundDisplay = document.getElementById("roundDisplay");
   let startBtn = document.getElementById("startBtn");
+  let addBotBtn = document.getElementById("addBotBtn");
 
   menu.style.display = "none";
   game.style.display = "block";
-  codeDisplay.innerText = "Game Code: " + state.code;
+  codeDisplay.innerText = "Game Code: " + state.code + (spectating ? " (watching)" : "");
   roundDisplay.innerText = "Round: " + state.round;
 
   let players = document.getElementById("players");
   players.innerHTML = "";
 
-  let myIdx = -1;
-  let mySid = socket.id;
+  let myIdx = me ? me.seat : -1;
+  const prompted = name => me !== null && me.prompts.includes(name);
 
   let isNewRound = (previousRound !== state.round);
   if (isNewRound) {
@@ -153,9 +295,6 @@ socket.on("state", state => {
   }
 
   state.players.forEach((p, i) => {
-    if (p.sid === mySid) {
-      myIdx = i;
-    }
     if (state.code) {
       sessionStorage.setItem("game_code", state.code);
     }
@@ -165,11 +304,11 @@ socket.on("state", state => {
     if (state.turn === i && state.started) div.classList.add("active");
 
     // Detect if this is our hand AND we're being prompted to discard
-    let myTurnToDiscard = state.pending_discard_choose_card === socket.id && !p.finished && p.sid === socket.id;
+    let myTurnToDiscard = prompted("discard_choose_card") && !p.finished && i === myIdx;
 
 
     let animateDealing = false;
-    let prevCards = previousCardCounts[p.player_id] || 0;
+    let prevCards = previousCardCounts[p.seat] || 0;
     if (!isFirstState) {
       animateDealing = p.cards.length > prevCards;
     }
@@ -202,31 +341,31 @@ socket.on("state", state => {
 
     // --- Action Buttons ---
     const freezeBtn =
-      state.pending_freeze === socket.id && !p.finished
-        ? `<button onclick="freezeTarget('${p.sid}')">Freeze</button>`
+      prompted("freeze") && !p.finished
+        ? `<button onclick="freezeTarget(${p.seat})">Freeze</button>`
         : "";
 
     const flip3Btn =
-      state.pending_flip3 === socket.id && !p.finished
-        ? `<button onclick="flip3Target('${p.sid}')">Make flip 3</button>`
+      prompted("flip3") && !p.finished
+        ? `<button onclick="flip3Target(${p.seat})">Make flip 3</button>`
         : "";
 
     let discardStep = "";
 
     // Step 1: If we're the player who must choose the DISCARD target
-    if (state.pending_discard_choose_target === socket.id && !p.finished && p.sid === socket.id) {
+    if (prompted("discard_choose_target") && !p.finished && i === myIdx) {
       const cardIdx = state.discard_choose_target_info.card_idx;
       const selectable = state.players.filter(q => !q.finished && q.numbers.length > 0);
       discardStep = `<div>
         <b>Choose a player to discard one:</b><br>
         ${selectable.map(pl =>
-          `<button onclick="discardChooseTarget('${pl.sid}', ${cardIdx})">${pl.name === p.name ? pl.name + " (you)" : pl.name}</button>`
+          `<button onclick="discardChooseTarget(${pl.seat}, ${cardIdx})">${pl.name === p.name ? pl.name + " (you)" : pl.name}</button>`
         ).join(" ")}
       </div>`;
     }
 
     div.innerHTML = `
-      <h3>${p.name}</h3>
+      <h3>${p.bot ? "🤖 " : ""}${p.name}</h3>
       <div>Round score: ${p.round_score}</div>
       <div>Total score: ${p.total_score}</div>
       ${discardNotice}
@@ -241,7 +380,7 @@ socket.on("state", state => {
   previousRound = state.round;
   previousCardCounts = {};
   state.players.forEach(p => {
-    previousCardCounts[p.player_id] = p.cards.length;
+    previousCardCounts[p.seat] = p.cards.length;
   });
   isFirstState = false;
 
@@ -257,16 +396,18 @@ socket.on("state", state => {
   const controlsDisabled =
     !myTurn ||
     controlsLocked ||
-    state.pending_freeze == socket.id ||
-    state.pending_flip3 == socket.id ||
-    state.pending_discard_choose_target == socket.id ||
+    prompted("freeze") ||
+    prompted("flip3") ||
+    prompted("discard_choose_target") ||
     state.pending_discard_choose_card != null ||
     state.pending_round_reset || state.match_winner != null;
 
   if (hitBtn) hitBtn.disabled = controlsDisabled;
   if (stayBtn) stayBtn.disabled = controlsDisabled;
+  document.querySelector(".controls").style.display = spectating ? "none" : "";
 
-  startBtn.style.display = (!state.started && state.owner_player_id === playerId) ? "inline" : "none";
+  startBtn.style.display = (!state.started && me !== null && me.owner) ? "inline" : "none";
+  addBotBtn.style.display = startBtn.style.display;
 
   if (state.match_winner) {
     alert(`🏆 ${state.match_winner} wins the match!`);
@@ -287,7 +428,17 @@ socket.on("state", state => {
     // Hide modal (if present) once the next round started
     hideRoundModal();
   }
-  
+}
+
+socket.on("game_closed", () => {
+  // The server evicted this game (finished, abandoned or idle): back to the menu
+  sessionStorage.removeItem("game_code");
+  setSpectating(false);
+  currentState = null;
+  me = null;
+  hideRoundModal();
+  document.getElementById("game").style.display = "none";
+  document.getElementById("menu").style.display = "block";
 });
 
 socket.on("error", (msg) => {
@@ -0,0 +1,123 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+from game import Game
+
+
+class SQLiteConnections:
+    """Callable returning this thread's connection to a SQLite file (connections must not cross threads)."""
+
+    def __init__(self, path, row_factory=None):
+        self.path = path
+        self.row_factory = row_factory
+        self._local = threading.local()
+
+    def __call__(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            self._local.conn = conn
+        return conn
+
+
+class GameStore:
+    """Where games live between actions. Subclasses persist Game.to_record() dumps."""
+
+    persistent = False   # True when a game dropped from memory can be loaded back from here
+
+    def load(self, code):
+        raise NotImplementedError
+
+    def save(self, game):
+        raise NotImplementedError
+
+    def delete(self, code):
+        raise NotImplementedError
+
+    def exists(self, code):
+        return self.load(code) is not None
+
+    def codes(self):
+        raise NotImplementedError
+
+
+class MemoryGameStore(GameStore):
+    # Default: keeps the live objects themselves, so saving costs nothing
+    def __init__(self):
+        self._games = {}
+
+    def load(self, code):
+        return self._games.get(code)
+
+    def save(self, game):
+        self._games[game.code] = game
+
+    def delete(self, code):
+        self._games.pop(code, None)
+
+    def exists(self, code):
+        return code in self._games
+
+    def codes(self):
+        return list(self._games)
+
+
+class SQLiteGameStore(GameStore):
+    """Games as JSON records in a SQLite file; survives restarts and is shared by local workers."""
+
+    persistent = True
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = SQLiteConnections(path)
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS games ("
+                " code TEXT PRIMARY KEY,"
+                " record TEXT NOT NULL,"
+                " updated REAL NOT NULL)"
+            )
+
+    def load(self, code):
+        row = self._conn().execute("SELECT record FROM games WHERE code = ?", (code,)).fetchone()
+        if row is None:
+            return None
+        return Game.from_record(json.loads(row[0]))
+
+    def save(self, game):
+        record = json.dumps(game.to_record(), separators=(",", ":"))
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO games (code, record, updated) VALUES (?, ?, ?)",
+                (game.code, record, time.time()),
+            )
+
+    def delete(self, code):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM games WHERE code = ?", (code,))
+
+    def exists(self, code):
+        return self._conn().execute("SELECT 1 FROM games WHERE code = ?", (code,)).fetchone() is not None
+
+    def codes(self):
+        return [row[0] for row in self._conn().execute("SELECT code FROM games")]
+
+
+def store_from_url(url):
+    # "memory" or "sqlite:///path/to/games.db"
+    if not url or url == "memory":
+        return MemoryGameStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteGameStore(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported game store {url!r}")
+
+
+def shard_for_code(code, shards):
+    # Stable across processes and restarts (unlike hash()), so a proxy and the workers agree
+    return zlib.crc32(code.encode()) % shards
@@ -0,0 +1,88 @@
+from actionlog import ActionLog, read_log, restore
+from game import Game
+from policies import make_policy
+from simulate import step
+
+
+def play(game, actions):
+    seats = {}
+    for p in game.players:
+        seats[p.sid] = seats[p.player_id] = (p, make_policy("threshold:22"))
+    for _ in range(actions):
+        if game.match_winner:
+            break
+        step(game, seats)
+
+
+def logged_game(path=None, snapshot_every=20):
+    game = Game(owner_player_id="a", seed=11)
+    log = ActionLog(game, path=path, snapshot_every=snapshot_every)
+    for pid in ("a", "b", "c"):
+        game.add_player(pid.upper(), "conn-" + pid, pid)
+    game.start("conn-a")
+    return game, log
+
+
+def offline(game):
+    # The replayed game addresses players by player_id
+    record = game.to_record()
+    for p in record["players"]:
+        p["sid"] = p["player_id"]
+    return record
+
+
+def test_restore_from_memory_matches_live_game():
+    game, log = logged_game()
+    play(game, 75)
+    assert log.seq - log.snapshot_seq <= log.snapshot_every
+    assert offline(log.restore()) == offline(game)
+
+
+def test_restore_from_file_uses_latest_snapshot(tmp_path):
+    path = str(tmp_path / "game.jsonl")
+    game, log = logged_game(path)
+    play(game, 1000)
+    log.close()
+
+    record, snap_seq, tail = read_log(path)
+    assert snap_seq > 0 and len(tail) <= 20
+    restored, seq = restore(path)
+    assert seq == log.seq
+    assert offline(restored) == offline(game)
+
+
+def test_rejected_actions_are_not_logged():
+    game, log = logged_game()
+    before = log.seq
+    game.hit("conn-b")          # not b's turn
+    game.stay("nobody")
+    assert log.seq == before
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    path = str(tmp_path / "game.jsonl")
+    game, log = logged_game(path)
+    play(game, 30)
+    log.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('["act", 999, "hi')   # crash mid-write
+
+    restored, seq = restore(path)
+    assert seq == log.seq and offline(restored) == offline(game)
+
+    # Recovery keeps appending to the same file; the partial line must not swallow the next one
+    reopened = ActionLog(restored, path=path, seq=seq)
+    play(restored, 5)
+    reopened.close()
+    again, seq = restore(path)
+    assert seq == reopened.seq and offline(again) == offline(restored)
+
+
+def test_snapshot_taken_by_add_player_predates_it():
+    game = Game(owner_player_id="a", seed=11)
+    log = ActionLog(game, snapshot_every=1)
+    game.add_player("A", "conn-a", "a")
+    game.add_player("B", "conn-b", "b")
+    # The snapshot was cut at the start of the second action, before B sat down
+    assert [p["player_id"] for p in log.snapshot_record["players"]] == ["a"]
+    assert log.tail == [["add_player", "B", "b", None]]
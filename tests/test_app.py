@@ -0,0 +1,343 @@
+import time
+
+import pytest
+
+import app as server
+from game import Card, CardType, Deck
+from loadtest import apply_patch
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    monkeypatch.setattr(server, "REPLAY_FRAME_DELAY", 0.01)
+    c1 = server.socketio.test_client(server.app)
+    c2 = server.socketio.test_client(server.app)
+    c1.emit("create_game", {"name": "A", "player_id": "pidA"})
+    code = c1.get_received()[-1]["args"][0]["code"]
+    c2.emit("join_game", {"name": "B", "code": code, "player_id": "pidB"})
+    yield server.registry.get(code), c1, c2
+    c1.disconnect()
+    c2.disconnect()
+
+
+def patches(client):
+    return [msg["args"][0] for msg in client.get_received() if msg["name"] == "state_patch"]
+
+
+def rig_deck(game, specs):
+    game.deck = Deck([Card(*spec) for spec in reversed(specs)])
+
+
+def test_flip3_replay_runs_in_background(clients):
+    game, c1, c2 = clients
+    rig_deck(game, [(CardType.FLIP_3,), (CardType.NUMBER, 1), (CardType.NUMBER, 2), (CardType.NUMBER, 3)])
+    c1.emit("start_game")
+    c1.emit("hit")
+    c1.get_received()
+
+    c1.emit("flip3_target", {"target": 1})
+    first = patches(c1)
+    assert len(first) == 1 and "extra" not in first[0]
+
+    time.sleep(0.2)
+    rest = patches(c1)
+    assert len(rest) == 3
+    assert rest[-1]["extra"] == {"end_pending": True}
+    assert [p["version"] for p in first + rest] == list(range(first[0]["version"], first[0]["version"] + 4))
+
+
+def test_newer_state_cancels_replay(clients, monkeypatch):
+    game, c1, c2 = clients
+    monkeypatch.setattr(server, "REPLAY_FRAME_DELAY", 0.2)
+    rig_deck(game, [(CardType.FLIP_3,), (CardType.NUMBER, 1), (CardType.NUMBER, 2), (CardType.NUMBER, 3), (CardType.NUMBER, 4)])
+    c1.emit("start_game")
+    c1.emit("hit")
+    c1.emit("flip3_target", {"target": 1})
+    c1.get_received()
+
+    c2.emit("hit")
+    superseding = patches(c1)
+    assert superseding[-1]["extra"] == {"end_pending": True}
+
+    time.sleep(0.6)
+    assert patches(c1) == []
+
+
+def test_compact_clients_get_codec_and_encoded_states(clients):
+    game, c1, c2 = clients
+    c3 = server.socketio.test_client(server.app, auth={"encoding": "compact"})
+    received = c3.get_received()
+    assert received[0]["name"] == "codec"
+    keys = received[0]["args"][0]["keys"]
+
+    c3.emit("join_game", {"name": "C", "code": game.code, "player_id": "pidC"})
+    snapshot = c3.get_received()[-1]["args"][0]
+    assert snapshot[str(keys.index("code"))] == game.code
+
+    c1.emit("start_game")
+    compact_patch = c3.get_received()[-1]["args"][0]
+    json_patch = patches(c1)[-1]
+    assert compact_patch[str(keys.index("version"))] == json_patch["version"]
+    c3.disconnect()
+
+
+def test_room_gets_public_state_and_each_client_its_overlay(clients):
+    game, c1, c2 = clients
+    rig_deck(game, [(CardType.FREEZE,)])
+    c1.get_received()
+    c1.emit("request_state")
+    received = c1.get_received()
+    assert received[0]["name"] == "you"
+    assert received[0]["args"][0] == {"seat": 0, "player_id": "pidA", "owner": True, "prompts": []}
+    state = received[-1]["args"][0]
+    assert state["owner"] == 0
+    assert all("sid" not in p and "player_id" not in p for p in state["players"])
+    c2.get_received()
+
+    c1.emit("start_game")
+    c1.emit("hit")
+    you = [msg["args"][0] for msg in c1.get_received() if msg["name"] == "you"]
+    assert you[-1]["prompts"] == ["freeze"]
+    received = c2.get_received()
+    assert [msg for msg in received if msg["name"] == "you"] == []
+    assert received[-1]["args"][0]["set"]["pending_freeze"] == 0
+
+    c1.emit("freeze_target", {"target": 1})
+    assert game.players[1].finished
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_owner_adds_bot_that_plays_its_turns(clients, monkeypatch):
+    game, c1, c2 = clients
+    monkeypatch.setattr(server, "BOT_THINK_DELAY", 0.01)
+    c2.emit("add_bot", {"strategy": "threshold:20"})
+    assert len(game.players) == 2   # only the owner may add bots
+    for spec in ("nope", "solved:/etc/hostname", "mc:100000000", "solved"):
+        c1.emit("add_bot", {"strategy": spec})
+        assert c1.get_received()[-1]["name"] == "error"
+    assert len(game.players) == 2
+
+    c1.emit("add_bot", {"strategy": "threshold:20"})
+    bot = game.players[2]
+    assert bot.bot == "threshold:20" and bot.name == "Bot 1"
+    rig_deck(game, [(CardType.NUMBER, n) for n in (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12)])
+    c1.emit("start_game")
+    c1.emit("stay")
+    c2.emit("stay")
+    assert wait_for(lambda: bot.finished)
+    assert game.pending_round_reset
+    assert wait_for(lambda: game.code not in server.bot_tasks)
+
+
+def test_waking_bots_does_not_run_their_policy(monkeypatch):
+    import bots
+    from game import Game
+
+    asked = []
+    monkeypatch.setattr(bots, "policy_for", lambda spec: asked.append(spec))
+    game = Game(owner_player_id="pidA")
+    game.add_player("A", "sidA", "pidA")
+    game.add_player("Bot 1", None, "pidBot", bot="threshold:20")
+    game.start("sidA")
+    assert not server.bots_waited_on(game)
+    game.stay("sidA")
+    assert server.bots_waited_on(game) and asked == []
+
+
+def test_bot_only_game_plays_to_the_end(monkeypatch):
+    monkeypatch.setattr(server, "BOT_THINK_DELAY", 0)
+    monkeypatch.setattr(server, "REPLAY_FRAME_DELAY", 0)
+    game = server.create_bot_game(["threshold:25", "random"])
+    assert game.started and all(p.bot for p in game.players)
+    assert wait_for(lambda: game.match_winner is not None, timeout=20)
+    server.registry.remove(game.code)
+
+
+def test_bot_only_game_recovers_from_its_log(monkeypatch, tmp_path):
+    from actionlog import restore
+
+    monkeypatch.setattr(server, "BOT_THINK_DELAY", 10)
+    monkeypatch.setattr(server, "LOG_DIR", str(tmp_path))
+    game = server.create_bot_game(["threshold:25", "random"])
+    recovered, _ = restore(server.log_path(game.code))
+    assert recovered.started and recovered.owner_player_id == game.players[0].player_id
+    assert [p.cards for p in recovered.players] == [p.cards for p in game.players]
+    server.registry.remove(game.code)
+
+
+def scrape():
+    body = server.app.test_client().get("/metrics").get_data(as_text=True)
+    return dict(line.rsplit(" ", 1) for line in body.splitlines() if not line.startswith("#"))
+
+
+def test_metrics_route_reports_handlers_payloads_and_registry(clients):
+    game, c1, c2 = clients
+    c1.emit("start_game")
+    before = scrape()
+    c1.emit("hit")
+    after = scrape()
+
+    hits = 'flip7_event_seconds_count{event="hit"}'
+    assert int(after[hits]) == int(before.get(hits, 0)) + 1
+    assert 'flip7_event_seconds_count{event="join_game"}' in after
+    assert 'flip7_payload_bytes_count{kind="state_patch",encoding="json"}' in after
+    assert 'flip7_broadcast_recipients_count{channel="players"}' in after
+    assert int(after["flip7_games"]) >= 1
+
+
+def test_codes_never_name_files_outside_the_log_dir(monkeypatch, tmp_path):
+    logs, elsewhere = tmp_path / "logs", tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    victim = elsewhere / "victim.jsonl"
+    victim.write_text("")
+    monkeypatch.setattr(server, "LOG_DIR", str(logs))
+    client = server.socketio.test_client(server.app)
+    for event in ("watch_game", "join_game", "rejoin_game"):
+        client.emit(event, {"code": "../elsewhere/victim", "name": "X", "player_id": "x"})
+    assert victim.read_text() == ""
+    assert [msg["args"][0] for msg in client.get_received()] == ["Game not found"] * 2
+    client.disconnect()
+
+    # The log directory is created on first use
+    game = server.new_game(None)
+    assert (logs / f"{game.code}.jsonl").exists()
+    game.action_log.close()
+
+
+def test_payload_sizes_are_sampled(monkeypatch):
+    monkeypatch.setattr(server, "PAYLOAD_SAMPLE", 3)
+    key = 'flip7_payload_bytes_count{kind="sampled",encoding="json"}'
+    for _ in range(6):
+        server.measured({"version": 1}, "sampled", "json")
+    assert scrape()[key] == "2"
+    monkeypatch.setattr(server, "PAYLOAD_SAMPLE", 0)
+    server.measured({"version": 1}, "sampled", "json")
+    assert scrape()[key] == "2"
+
+
+def test_evicted_codes_go_back_to_the_allocator(clients):
+    game, c1, c2 = clients
+    server.registry.remove(game.code)
+    server.forget_game(game.code, None, "test")
+    assert game.code in server.codes._free
+    assert not server.code_in_use(game.code)
+
+
+def test_spectators_are_read_only_and_skip_replay_frames(clients, monkeypatch):
+    game, c1, c2 = clients
+    monkeypatch.setattr(server, "SPECTATOR_RATE", 1000)
+    rig_deck(game, [(CardType.FLIP_3,), (CardType.NUMBER, 1), (CardType.NUMBER, 2), (CardType.NUMBER, 3)])
+    watcher = server.socketio.test_client(server.app)
+    watcher.emit("watch_game", {"code": game.code})
+    received = watcher.get_received()
+    assert [msg["name"] for msg in received] == ["state"]
+    state = received[0]["args"][0]
+    assert state["code"] == game.code and state["started"] is False
+
+    watcher.emit("start_game")
+    assert game.started is False
+    c1.emit("start_game")
+    c1.emit("hit")
+    c1.emit("flip3_target", {"target": 1})
+    time.sleep(0.2)
+    assert len(patches(c1)) > 3
+
+    seen = []
+    for patch in patches(watcher):
+        state = apply_patch(state, patch)
+        seen.append(len(state["players"][1]["cards"]))
+    assert seen[-1] == 3
+    assert 1 not in seen and 2 not in seen   # never a mid-Flip Three frame
+    watcher.disconnect()
+    assert game.code not in server.feeds
+
+
+def test_live_tournament_runs_bot_tables_to_a_champion(monkeypatch):
+    monkeypatch.setattr(server, "BOT_THINK_DELAY", 0)
+    monkeypatch.setattr(server, "REPLAY_FRAME_DELAY", 0)
+    organiser = server.socketio.test_client(server.app)
+    organiser.emit("create_tournament", {"player_id": "org", "table_size": 2, "bots": ["threshold:25"] * 3 + ["random"]})
+    code = organiser.get_received()[-1]["args"][0]["code"]
+    organiser.emit("start_tournament", {"code": code, "player_id": "org"})
+
+    t = server.tournaments[code]
+    assert wait_for(lambda: t.champion is not None, timeout=30)
+    live = server.app.test_client().get(f"/tournaments/{code}").get_json()
+    assert live["round"] == 2 and live["champion"] == t.entrants[t.champion].name
+    assert [row["wins"] for row in live["standings"]][:2] == [2, 1]
+    updates = [msg["args"][0] for msg in organiser.get_received() if msg["name"] == "tournament"]
+    assert updates[-1]["champion"] == live["champion"]
+    assert server.app.test_client().get("/tournaments/nope").status_code == 404
+    organiser.disconnect()
+
+
+def test_tournament_tables_recover_from_their_logs(monkeypatch, tmp_path):
+    from actionlog import restore
+
+    monkeypatch.setattr(server, "BOT_THINK_DELAY", 10)
+    monkeypatch.setattr(server, "LOG_DIR", str(tmp_path))
+    organiser = server.socketio.test_client(server.app)
+    organiser.emit("create_tournament", {"player_id": "org", "table_size": 2, "bots": ["odds", "random"]})
+    code = organiser.get_received()[-1]["args"][0]["code"]
+    organiser.emit("start_tournament", {"code": code, "player_id": "org"})
+    table = server.tournaments[code].tables[0]
+    recovered, _ = restore(server.log_path(table.code))
+    assert recovered.started
+    organiser.disconnect()
+    server.registry.remove(table.code)
+
+
+def test_human_entrant_is_seated_at_their_table(monkeypatch):
+    monkeypatch.setattr(server, "BOT_THINK_DELAY", 10)
+    human = server.socketio.test_client(server.app)
+    human.emit("create_tournament", {"name": "Ann", "player_id": "ann", "bots": ["solved:/etc/hostname"]})
+    assert human.get_received()[-1]["name"] == "error"
+    human.emit("create_tournament", {"name": "Ann", "player_id": "ann", "table_size": 4, "bots": ["odds"]})
+    code = human.get_received()[-1]["args"][0]["code"]
+    human.emit("start_tournament", {"code": code, "player_id": "ann"})
+
+    seated = [msg["args"][0] for msg in human.get_received() if msg["name"] == "tournament_table"]
+    assert len(seated) == 1
+    game = server.registry.get(seated[0]["code"])
+    assert game.started and sorted(p.name for p in game.players) == ["Ann", "Bot 1"]
+    human.emit("request_state")
+    assert any(msg["name"] == "state" for msg in human.get_received())
+    human.disconnect()
+    ann = game.get_player_by_player_id("ann")
+    assert ann.sid is None
+
+    # Coming back on a new connection seats it at the same table
+    back = server.socketio.test_client(server.app)
+    back.emit("watch_tournament", {"code": code, "player_id": "ann"})
+    assert [msg["args"][0]["code"] for msg in back.get_received() if msg["name"] == "tournament_table"] == [game.code]
+    assert ann.sid is not None and server.registry.for_sid(ann.sid) is game
+    back.emit("request_state")
+    assert any(msg["name"] == "state" for msg in back.get_received())
+    back.disconnect()
+    server.registry.remove(game.code)
+
+
+def test_finished_matches_reach_the_history_routes(monkeypatch, tmp_path):
+    from history import HistoryStore, HistoryWriter
+
+    monkeypatch.setattr(server, "BOT_THINK_DELAY", 0)
+    monkeypatch.setattr(server, "REPLAY_FRAME_DELAY", 0)
+    writer = HistoryWriter(HistoryStore(str(tmp_path / "history.db")), flush_interval=0.01)
+    monkeypatch.setattr(server, "history", writer)
+    game = server.create_bot_game(["threshold:25", "random"])
+    assert wait_for(lambda: game.match_winner is not None, timeout=20)
+    writer.close()
+
+    http = server.app.test_client()
+    page = http.get(f"/players/{game.players[0].player_id}/history").get_json()
+    assert len(page["rows"]) == 1 and page["before"] is None
+    assert page["rows"][0]["round_scores"] == [scores[0] for scores in game.round_scores]
+    assert http.get("/leaderboard").get_json() == {"rows": [], "after": None}   # bots only
+    assert http.get("/players/nobody/stats").status_code == 404
+    server.registry.remove(game.code)
@@ -0,0 +1,28 @@
+import pytest
+
+import bench
+
+
+@pytest.mark.parametrize("name", [name for name in bench.BENCHMARKS if name.startswith("cascade")])
+def test_cascades_are_accepted(name, monkeypatch):
+    # Every step of a cascade benchmark must be a legal move, or it would time a rejection
+    games = []
+    monkeypatch.setattr(bench, "_prepared", lambda *args, _real=bench._prepared: games.extend(_real(*args)) or games)
+    run = bench.BENCHMARKS[name](1)
+    before = games[0].actions
+    run()
+    g = games[0]
+    assert g.actions > before
+    assert not g.pending_actions
+
+
+def test_every_benchmark_runs():
+    results = bench.run_all(min_time=0.001, repeats=1)
+    assert set(results) == set(bench.BENCHMARKS)
+    assert all(seconds > 0 for seconds in results.values())
+
+
+def test_compare_flags_regressions():
+    lines, regressions = bench.compare({"a": 1.3, "b": 1.0, "c": 2.0}, {"a": 1.0, "b": 1.0}, 0.25)
+    assert regressions == ["a"]
+    assert "(new)" in lines[2]
@@ -0,0 +1,65 @@
+import json
+
+from codec import KEYS, encode, table
+from delta import StateStream
+from game import Game, Card, CardType, Deck
+
+
+def decode(obj, tab):
+    # Mirror of decodeWire in static/game.js
+    def card(c):
+        if isinstance(c, int):
+            return dict(tab["cards"][c])
+        if isinstance(c, list):
+            return dict(tab["cards"][c[0]], target=c[1])
+        return c
+
+    if isinstance(obj, list):
+        return [decode(x, tab) for x in obj]
+    if not isinstance(obj, dict):
+        return obj
+    res = {}
+    for key, value in obj.items():
+        name = tab["keys"][int(key)] if key.isdigit() else key
+        res[name] = [card(c) for c in value] if name in ("cards", "cards+") else decode(value, tab)
+    return res
+
+
+def busy_game():
+    g = Game(owner_player_id="pid1", cards=[Card(*spec) for spec in reversed([
+        (CardType.NUMBER, 5), (CardType.FREEZE,), (CardType.BONUS, "+3"), (CardType.BONUS, "x2"),
+    ])])
+    g.add_player("P1", "s1", "pid1")
+    g.add_player("P2", "s2", "pid2")
+    g.start("s1")
+    g.hit("s1")
+    g.hit("s2")
+    g.apply_freeze("s2", "s1")
+    g.hit("s2")
+    g.hit("s2")
+    return g
+
+
+def test_round_trip_state_and_patch():
+    tab = json.loads(json.dumps(table()))
+    g = busy_game()
+    state = g.to_dict()
+    encoded = json.loads(json.dumps(encode(state)))
+    assert decode(encoded, tab) == state
+    assert len(json.dumps(encoded)) < len(json.dumps(state)) * 0.7
+
+    stream = StateStream()
+    stream.push(state)
+    g.deck = Deck([Card(CardType.NUMBER, 7)])
+    g.hit("s2")
+    patch = stream.push(g.to_dict())
+    assert decode(json.loads(json.dumps(encode(patch))), tab) == patch
+
+
+def test_annotated_and_adhoc_cards():
+    g = busy_game()
+    cards = g.players[1].to_dict()["cards"]
+    encoded = encode({"cards": cards})[str(KEYS.index("cards"))]
+    assert encoded[0] == [Card(CardType.FREEZE).code, "P1"]
+    assert encoded[1] == {"type": "bonus", "value": "+3"}   # not a catalogue card
+    assert encoded[2] == Card(CardType.BONUS, "x2").code
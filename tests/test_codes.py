@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from codes import CodeAllocator, CodesExhausted
+
+
+def test_every_code_once_before_exhaustion():
+    codes = CodeAllocator(3, "ABC", rng=random.Random(1))
+    seen = [codes.allocate() for _ in range(27)]
+    assert len(set(seen)) == 27
+    assert all(codes.valid(c) for c in seen)
+    with pytest.raises(CodesExhausted):
+        codes.allocate()
+
+
+def test_position_inverts_code_at():
+    codes = CodeAllocator(4, "XYZ123", rng=random.Random(2))
+    assert all(codes.position(codes.code_at(n)) == n for n in range(codes.size))
+
+
+def test_skips_codes_in_use_and_rejected():
+    taken = {"AA", "AB"}
+    codes = CodeAllocator(2, "AB", in_use=taken.__contains__, accept=lambda c: c != "BB", rng=random.Random(3))
+    assert codes.allocate() == "BA"
+    with pytest.raises(CodesExhausted):
+        codes.allocate()
+
+
+def test_released_codes_are_reused_after_fresh_ones():
+    codes = CodeAllocator(2, "AB", rng=random.Random(4))
+    first = codes.allocate()
+    codes.release(first)
+    rest = [codes.allocate() for _ in range(3)]
+    assert first not in rest
+    assert codes.allocate() == first
+
+
+def test_releasing_an_unissued_code_does_not_duplicate_it():
+    codes = CodeAllocator(2, "AB", rng=random.Random(5))
+    codes.release(codes.code_at(3))
+    codes.release("nonsense")
+    assert sorted(codes.allocate() for _ in range(4)) == ["AA", "AB", "BA", "BB"]
+    with pytest.raises(CodesExhausted):
+        codes.allocate()
+
+
+def test_order_depends_on_the_key_and_is_not_affine():
+    a, b = CodeAllocator(rng=random.Random(6)), CodeAllocator(rng=random.Random(6))
+    assert [a.allocate() for _ in range(5)] == [b.allocate() for _ in range(5)]
+    other = CodeAllocator(rng=random.Random(7))
+    assert [other.code_at(n) for n in range(5)] != [a.code_at(n) for n in range(5)]
+    # An affine counter would step by the same amount every time
+    idx = [sum(a.alphabet.index(c) * len(a.alphabet) ** i for i, c in enumerate(a.code_at(n))) for n in range(10)]
+    steps = {(y - x) % a.size for x, y in zip(idx, idx[1:])}
+    assert len(steps) > 1
@@ -0,0 +1,70 @@
+from delta import StateStream, diff_state
+from game import Game
+
+
+def two_player_game():
+    g = Game(owner_player_id="pidA")
+    g.add_player("A", "sidA", "pidA")
+    g.add_player("B", "sidB", "pidB")
+    g.start("sidA")
+    return g
+
+
+def apply_patch(state, patch):
+    # Mirror of applyPatch in static/game.js
+    nxt = dict(state)
+    nxt.update(patch.get("set", {}))
+    nxt["version"] = patch["version"]
+    if "players" in patch:
+        nxt["players"] = list(nxt["players"])
+        for idx, changes in patch["players"]:
+            p = dict(nxt["players"][idx])
+            p.update(changes)
+            if "cards+" in changes:
+                p["cards"] = nxt["players"][idx]["cards"] + changes["cards+"]
+                del p["cards+"]
+            nxt["players"][idx] = p
+    return nxt
+
+
+def test_first_push_carries_everything():
+    g = two_player_game()
+    stream = StateStream()
+    patch = stream.push(g.to_dict())
+    assert patch["version"] == 1 and patch["base"] == 0
+    assert patch["set"]["code"] == g.code
+    assert stream.snapshot()["version"] == 1
+
+
+def test_hit_only_ships_appended_card():
+    g = two_player_game()
+    stream = StateStream()
+    stream.push(g.to_dict())
+    g.hit("sidA")
+    patch = stream.push(g.to_dict())
+    assert "code" not in patch.get("set", {})
+    (idx, changes), = [p for p in patch["players"] if p[0] == 0]
+    assert len(changes["cards+"]) == 1
+    assert "name" not in changes
+
+
+def test_patches_rebuild_full_state():
+    g = two_player_game()
+    stream = StateStream()
+    client = dict(stream.push(g.to_dict())["set"], version=1)
+    for _ in range(6):
+        if g.pending_actions or g.match_winner:
+            break
+        g.hit(g.current_player().sid)
+        client = apply_patch(client, stream.push(g.to_dict()))
+    assert client == stream.snapshot()
+
+
+def test_new_player_resends_player_list():
+    g = Game(owner_player_id="pidA")
+    g.add_player("A", "sidA", "pidA")
+    old = g.to_dict()
+    g.add_player("B", "sidB", "pidB")
+    changes, players = diff_state(old, g.to_dict())
+    assert len(changes["players"]) == 2
+    assert players == []
@@ -1,5 +1,5 @@
 import pytest
-from game import Game, Deck, Player, Card, CardType
+from game import Game, Deck, Player, Card, CardType, CARD_CATALOGUE, STATES_FULL, STATES_EVENTS, STATES_NONE, bot_sid
 
 def test_deck_initialization():
     deck = Deck()
@@ -44,6 +44,37 @@ def test_deck_draw_all_and_cycle_same():
     assert stats == second_stats
 
 
+def test_cards_are_interned_and_immutable():
+    a = Card(CardType.BONUS, "+4")
+    assert a is Card(CardType.BONUS, "+4")
+    assert a.add == 4 and a.mult == 1
+    assert Card(CardType.BONUS, "x2").mult == 2
+    assert Card.from_code(Card(CardType.NUMBER, 7).code) is Card(CardType.NUMBER, 7)
+    with pytest.raises(AttributeError):
+        a.value = "+6"
+
+def test_deck_reuses_catalogue_cards():
+    deck = Deck()
+    assert {c.code for c in deck.cards} <= {c.code for c in CARD_CATALOGUE}
+    assert sorted(c.code for c in deck.cards) == sorted(c.code for c in CARD_CATALOGUE)
+
+def test_seeded_decks_are_reproducible():
+    a, b = Deck(seed=42), Deck(seed=42)
+    assert a.cards == b.cards
+    assert a.cards != Deck(seed=43).cards
+
+    for _ in range(len(CARD_CATALOGUE)):
+        a.draw()
+    assert a.refills == 1
+    assert a.cards == Deck.order(42, 1)
+    assert Game(owner_player_id="p", seed=7).seed == 7
+
+def test_refills_differ_for_any_seed():
+    for seed in (-1, -5, 0, 2**64, 2**70):
+        assert Deck.order(seed, 0) != Deck.order(seed, 1)
+    # Seeds past 64 bits no longer land on another seed's refill
+    assert Deck.order(2**64, 0) != Deck.order(0, 1)
+
 def test_player_init_and_reset_round():
     p = Player(name="Alice", sid="s1")
     assert p.name == "Alice"
@@ -124,6 +155,102 @@ def test_player_to_dict_format():
     assert {"type": "bonus", "value": "+4"} in d["cards"]
     assert {"type": "number", "value": 2} in d["cards"]
 
+def test_player_round_score_tracks_hand_mutations():
+    p = Player(name="Kim", sid="s8")
+    p.cards.append(Card(CardType.NUMBER, 5))
+    p.numbers.add(5)
+    p.cards.append(Card(CardType.BONUS, "x2"))
+    p.cards.append(Card(CardType.BONUS, "+4"))
+    assert p.round_score() == (5+4)*2
+    p.cards.pop(0)
+    p.numbers.remove(5)
+    assert p.round_score() == 4*2
+    p.cards.pop()
+    assert p.round_score() == 0
+
+def test_player_to_dict_cached_until_mutation():
+    p = Player(name="Lou", sid="s9", player_id="pid1")
+    d = p.to_dict()
+    assert p.to_dict() is d
+    p.cards.append(Card(CardType.NUMBER, 3))
+    p.numbers.add(3)
+    d2 = p.to_dict()
+    assert d2 is not d
+    assert d2["round_score"] == 3
+    p.finished = True
+    assert p.to_dict()["finished"] is True
+
+def test_card_target_recorded_on_hand():
+    g = Game(owner_player_id="pid1", cards=make_deck([(CardType.FREEZE,), (CardType.NUMBER, 1)]))
+    g.add_player("P1", "p1", "pid1")
+    g.add_player("P2", "p2")
+    g.start("p1")
+    g.hit("p1")
+    g.apply_freeze("p1", "p2")
+    assert g.players[0].cards.targets == ["P2"]
+    assert g.players[0].to_dict()["cards"] == [{"type": "freeze", "value": None, "target": "P2"}]
+
+def test_start_for_owner_without_a_connection():
+    g = Game(owner_player_id="pid1")
+    assert not g.start_for_owner()   # the owner has no seat yet
+    g.add_player("P1", None, "pid1")
+    g.add_player("P2", "p2")
+    assert not g.start("p2")
+    assert g.start_for_owner() and g.started
+
+def test_discard_of_saved_duplicate_keeps_number():
+    g = Game(owner_player_id="pid1", cards=make_deck([
+        (CardType.SECOND_CHANCE,), (CardType.NUMBER, 4), (CardType.NUMBER, 4), (CardType.DISCARD,),
+    ]))
+    g.add_player("P1", "p1", "pid1")
+    g.start("p1")
+    for _ in range(4):
+        g.hit("p1")
+    g.apply_discard_choose_target("p1", "p1", 3)
+    g.apply_discard_choose_card("p1", 1)
+    assert g.players[0].numbers == {4}
+    assert g.players[0].round_score() == 4
+
+def flip3_game(state_mode):
+    g = Game(owner_player_id="pid1", state_mode=state_mode,
+             cards=make_deck([(CardType.FLIP_3,), (CardType.NUMBER, 1), (CardType.NUMBER, 2), (CardType.NUMBER, 3)]))
+    g.add_player("P1", "p1", "pid1")
+    g.add_player("P2", "p2")
+    g.start("p1")
+    g.hit("p1")
+    return g
+
+def test_flip3_state_modes():
+    full = flip3_game(STATES_FULL).apply_flip3("p1", "p2")
+    assert len(full) == 3 and full[-1]["players"][1]["round_score"] == 6
+
+    events = flip3_game(STATES_EVENTS).apply_flip3("p1", "p2")
+    assert [e["card"]["value"] for e in events] == [1, 2, 3]
+    assert {e["sid"] for e in events} == {"p2"}
+
+    g = flip3_game(STATES_NONE)
+    assert g.apply_flip3("p1", "p2") == []
+    assert g.players[1].round_score() == 6
+
+def test_player_indexes_follow_sid_changes():
+    g = Game(owner_player_id="pid1")
+    p1 = g.add_player("Alice", "s1", "pid1")
+    assert g.get_player_by_sid("s1") is p1
+    assert g.get_player_by_player_id("pid1") is p1
+    assert g.get_player_by_sid("unknown") is None
+    assert g.add_player(" alice ", "s2") is None
+
+    assert g.disconnect("s1") is p1
+    assert p1.sid is None and g.get_player_by_sid("s1") is None
+
+    assert g.add_player("Alicia", "s3", "pid1") is p1
+    assert g.get_player_by_sid("s3") is p1
+    assert g.has_name("alicia") and not g.has_name("alice")
+
+    g.set_sid(p1, "s4")
+    assert g.get_player_by_sid("s3") is None
+    assert g.start("s4")
+
 def make_card(card_type, value=None):  # helper for clarity
 
     return Card(card_type, value)
@@ -235,3 +362,25 @@ def extract_stats(draws):
     x = [(t.value, card_types.count(t)) for t in set(card_types)]
     x.sort(key=lambda x: (x[1], x[0]))
     return x
+
+
+def test_public_dict_uses_seats_and_hides_connections():
+    g = Game(owner_player_id="pidB")
+    g.add_player("A", "sidA", "pidA")
+    g.add_player("B", "sidB", "pidB")
+    g.disconnect("sidA")
+    state = g.public_dict()
+    assert state["owner"] == 1
+    assert [(p["seat"], p["connected"]) for p in state["players"]] == [(0, False), (1, True)]
+    assert "sid" not in str(state) and "pidA" not in str(state)
+    assert g.players[1].public_dict(1) is g.players[1].public_dict(1)
+
+
+def test_bots_get_a_stand_in_sid_and_survive_records():
+    g = Game(owner_player_id="pid1")
+    g.add_player("P1", "s1", "pid1")
+    bot = g.add_player("Bot", None, "botpid", bot="threshold:20")
+    assert bot.sid == bot_sid("botpid") and g.get_player_by_sid(bot.sid) is bot
+    assert g.public_dict()["players"][1]["bot"] is True
+    restored = Game.from_record(g.to_record())
+    assert restored.players[1].bot == "threshold:20"
@@ -0,0 +1,79 @@
+from game import Game, STATES_NONE
+from history import HistoryStore, HistoryWriter, match_record
+from policies import ThresholdPolicy
+from simulate import step
+
+
+def finished_game(seed, names=("Ann", "Bob"), bot=None):
+    g = Game(owner_player_id="Ann", state_mode=STATES_NONE, seed=seed)
+    for name in names:
+        g.add_player(name, name, name, bot=bot if name != "Ann" else None)
+    g.start("Ann")
+    seats = {p.player_id: (p, ThresholdPolicy(20)) for p in g.players}
+    while g.match_winner is None:
+        step(g, seats)
+    return g
+
+
+def test_round_scores_add_up_to_totals():
+    g = finished_game(1)
+    assert len(g.round_scores) == g.round
+    for seat, p in enumerate(g.players):
+        assert sum(scores[seat] for scores in g.round_scores) == p.total_score
+    assert Game.from_record(g.to_record()).round_scores == g.round_scores
+
+
+def test_history_pages_newest_first(tmp_path):
+    store = HistoryStore(str(tmp_path / "h.db"))
+    games = [finished_game(seed) for seed in range(5)]
+    store.write([match_record(g, finished=1000 + i) for i, g in enumerate(games)])
+
+    first, cursor = store.history("Ann", limit=2)
+    assert [row["finished"] for row in first] == [1004, 1003]
+    second, cursor = store.history("Ann", limit=2, before=cursor)
+    third, cursor = store.history("Ann", limit=2, before=cursor)
+    assert [row["finished"] for row in second + third] == [1002, 1001, 1000]
+    assert cursor is None
+    row = first[0]
+    assert [p["name"] for p in row["players"]] == ["Ann", "Bob"]
+    assert sum(row["round_scores"]) == row["score"]
+
+
+def test_leaderboard_and_stats_skip_bots(tmp_path):
+    store = HistoryStore(str(tmp_path / "h.db"))
+    games = [finished_game(seed, bot="threshold:20") for seed in range(4)]
+    store.write([match_record(g) for g in games])
+    wins = sum(g.match_winner.name == "Ann" for g in games)
+
+    rows, cursor = store.leaderboard()
+    assert [r["name"] for r in rows] == ["Ann"] and cursor is None
+    stats = store.stats("Ann")
+    assert stats["matches"] == 4 and stats["wins"] == wins and stats["win_rate"] == wins / 4
+    assert store.stats("Bob") is None
+
+
+def test_leaderboard_keyset_pages(tmp_path):
+    store = HistoryStore(str(tmp_path / "h.db"))
+    names = [f"P{i}" for i in range(5)]
+    store.write([match_record(finished_game(seed, names=("Ann",) + tuple(names[:seed + 1]))) for seed in range(4)])
+    rows, seen, cursor = [], [], None
+    while True:
+        rows, cursor = store.leaderboard(limit=2, after=cursor)
+        seen += rows
+        if cursor is None:
+            break
+    assert len(seen) == 5
+    assert [r["wins"] for r in seen] == sorted((r["wins"] for r in seen), reverse=True)
+
+
+def test_writer_batches_and_flushes_on_close(tmp_path):
+    store = HistoryStore(str(tmp_path / "h.db"))
+    log = tmp_path / "game.jsonl"
+    log.write_text('["act",1,"start","Ann"]\n')
+    writer = HistoryWriter(store, batch_size=3, flush_interval=5)
+    for seed in range(4):
+        writer.record(match_record(finished_game(seed), log_path=str(log)))
+    writer.close()
+    rows, _ = store.history("Ann", limit=10)
+    assert len(rows) == 4
+    assert store.action_log(rows[0]["match"]) == '["act",1,"start","Ann"]\n'
@@ -0,0 +1,38 @@
+import asyncio
+import random
+
+from delta import StateStream
+from game import Game
+from loadtest import LoadClient, LoadStats, percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([3], 99) == 3
+
+
+def test_client_follows_patches_and_acts_on_its_turn():
+    g = Game(owner_player_id="a")
+    g.add_player("A", "a", "a")
+    g.add_player("B", "b", "b")
+    stream = StateStream()
+    stats = LoadStats()
+    client = LoadClient("http://unused", "A", stats, threshold=20, rng=random.Random(1))
+    sent = []
+
+    async def fake_emit(event, data=None):
+        sent.append(event)
+    client.sio.emit = fake_emit
+
+    async def play():
+        client.me = {"seat": 0, "player_id": "a", "owner": True, "prompts": []}
+        stream.push(g.public_dict())
+        await client.on_state(stream.snapshot())
+        g.start("a")
+        await client.on_patch(stream.push(g.public_dict()))
+
+    asyncio.run(play())
+    assert client.state == stream.snapshot()
+    assert sent == ["hit"] and stats.sent == 1
@@ -0,0 +1,33 @@
+import metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    h = metrics.Histogram("t_hist_seconds", "test", ["event"], buckets=(0.1, 1))
+    h.observe(0.05, event="hit")
+    h.observe(0.5, event="hit")
+    h.observe(5, event="hit")
+    text = h.render()
+    assert 't_hist_seconds_bucket{event="hit",le="0.1"} 1' in text
+    assert 't_hist_seconds_bucket{event="hit",le="1"} 2' in text
+    assert 't_hist_seconds_bucket{event="hit",le="+Inf"} 3' in text
+    assert 't_hist_seconds_count{event="hit"} 3' in text
+    assert 't_hist_seconds_sum{event="hit"} 5.55' in text
+
+
+def test_counters_and_gauges_render_with_type_lines():
+    c = metrics.Counter("t_total", "things", ["kind"])
+    c.inc(kind="a")
+    c.inc(2, kind="a")
+    metrics.Gauge("t_live", "live things", fn=lambda: 7)
+    text = metrics.render()
+    assert "# TYPE t_total counter" in text
+    assert 't_total{kind="a"} 3' in text
+    assert "# TYPE t_live gauge\nt_live 7" in text
+
+
+def test_timed_handler_observes_each_call():
+    h = metrics.Histogram("t_handler_seconds", "test", ["event"])
+    handler = metrics.timed_handler(h, "ping")(lambda x=None: x)
+    assert handler(1) == 1
+    handler()
+    assert 't_handler_seconds_count{event="ping"} 2' in h.render()
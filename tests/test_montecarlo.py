@@ -0,0 +1,85 @@
+import pytest
+
+from game import Card, CardType, Game
+from odds import odds
+from policies import MonteCarloPolicy, make_policy
+
+pytest.importorskip("numpy")
+
+from montecarlo import estimate  # noqa: E402
+
+
+def started_game(n=3, seed=3):
+    g = Game(owner_player_id="p0", seed=seed)
+    for i in range(n):
+        g.add_player(f"P{i}", f"p{i}", f"p{i}")
+    g.start("p0")
+    return g
+
+
+def test_single_hit_matches_exact_odds():
+    g = started_game()
+    for _ in range(4):
+        g.hit(g.current_player().player_id)
+    player = g.current_player()
+    exact = odds(player, g.deck.cards)
+    # Everyone stays after the forced hit, so only one card is drawn
+    est = estimate(g, 20000, thresholds=0, hit_first=True, rng=1)
+    seat = g.turn
+    assert est.bust[seat] == pytest.approx(exact.bust, abs=0.02)
+    assert est.mean[seat] == pytest.approx(exact.hit, rel=0.05)
+
+
+def test_duplicate_busts_unless_second_chance():
+    g = started_game(2)
+    player = g.current_player()
+    player.numbers = {5}
+    player.cards = [Card(CardType.NUMBER, 5)]
+    player.second_chance = 0
+    g.deck.cards = [Card(CardType.NUMBER, 5)]
+    est = estimate(g, 100, thresholds=0, hit_first=True, rng=1)
+    assert est.bust[g.turn] == 1 and est.mean[g.turn] == 0
+    player.second_chance = 1
+    est = estimate(g, 100, thresholds=0, hit_first=True, rng=1)
+    assert est.bust[g.turn] == 0 and est.mean[g.turn] == 5
+
+
+def test_distributions_and_finished_players():
+    g = started_game()
+    g.stay(g.current_player().player_id)
+    stayed = g.players[0]
+    est = estimate(g, 2000, rng=7)
+    assert est.scores.shape == (2000, 3)
+    # A finished player's round is already decided
+    assert (est.scores[:, 0] == stayed.round_score()).all() and est.bust[0] == 0
+    for seat in (1, 2):
+        assert 0 < est.bust[seat] < 0.5
+        assert est.distribution(seat).sum() == pytest.approx(1)
+        assert est.distribution(seat)[0] >= est.bust[seat]
+    assert est.lead.sum() >= 1
+
+
+def test_empty_pile_refills_from_full_deck():
+    g = started_game()
+    g.deck.cards = []
+    est = estimate(g, 500, rng=2)
+    assert (est.mean > 10).all()
+
+
+def test_seeded_estimates_repeat():
+    g = started_game()
+    a, b = estimate(g, 500, rng=5), estimate(g, 500, rng=5)
+    assert (a.scores == b.scores).all()
+
+
+def test_monte_carlo_policy():
+    policy = make_policy("mc:200")
+    assert isinstance(policy, MonteCarloPolicy) and policy.rollouts == 200
+    g = started_game(2)
+    player = g.current_player()
+    assert policy.hit_or_stay(g, player)
+    player.numbers = set(range(1, 7))
+    player.cards = [Card(CardType.NUMBER, v) for v in range(1, 7)]
+    # 21 points banked and most of the deck busts
+    g.deck.cards = [Card(CardType.NUMBER, v) for v in range(1, 7)] * 5 + [Card(CardType.NUMBER, 12)]
+    assert not policy.hit_or_stay(g, player)
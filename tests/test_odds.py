@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from game import BONUS_FLIP7, CARD_CATALOGUE, Card, CardType, Game
+from odds import deck_counts, odds, odds_batch, odds_for
+
+
+def counts_of(*specs):
+    return deck_counts([Card(*spec) for spec in specs])
+
+
+def test_fresh_hand_cannot_bust():
+    o = odds_for(((), 0, 1, 0), deck_counts(CARD_CATALOGUE))
+    assert o.bust == 0 and o.flip7 == 0 and o.stay == 0
+    assert o.should_hit
+
+
+def test_duplicates_bust_unless_second_chance():
+    deck = counts_of((CardType.NUMBER, 5), (CardType.NUMBER, 7), (CardType.BONUS, "x2"), (CardType.FREEZE,))
+    o = odds_for(((5,), 0, 1, 0), deck)
+    assert o.bust == pytest.approx(0.25)
+    assert o.stay == 5
+    # 5 busts, 7 -> 12, x2 -> 10, freeze goes to an opponent -> 5
+    assert o.hit == pytest.approx((0 + 12 + 10 + 5) / 4)
+    assert odds_for(((5,), 0, 1, 1), deck).bust == 0
+
+
+def test_flip7_chance_and_bonus():
+    deck = counts_of((CardType.NUMBER, 7), (CardType.NUMBER, 1))
+    o = odds_for(((0, 1, 2, 3, 4, 5), 0, 1, 0), deck)
+    assert o.flip7 == pytest.approx(0.5)
+    assert o.hit == pytest.approx((15 + 7 + BONUS_FLIP7) / 2)
+
+
+def test_flip_three_on_self_when_alone():
+    deck = counts_of((CardType.FLIP_3,), (CardType.NUMBER, 5), (CardType.NUMBER, 5), (CardType.NUMBER, 5))
+    hand = ((), 0, 1, 0)
+    assert odds_for(hand, deck).bust == 0
+    assert odds_for(hand, deck, alone=True).bust == pytest.approx(0.25)
+
+
+def test_odds_from_live_game():
+    g = Game(owner_player_id="a", seed=3)
+    g.add_player("A", "a", "a")
+    g.start("a")
+    g.hit("a")
+    p = g.players[0]
+    assert odds(p, g.deck.cards).stay == p.round_score()
+
+
+def test_batch_matches_exact_engine():
+    pytest.importorskip("numpy")
+    rng = random.Random(1)
+    states = []
+    for _ in range(50):
+        deck = list(CARD_CATALOGUE)
+        rng.shuffle(deck)
+        numbers = tuple(sorted({c.value for c in deck[:rng.randrange(7)] if c.type == CardType.NUMBER}))
+        states.append(((numbers, rng.choice([0, 4]), rng.choice([1, 2]), rng.randrange(2)), deck_counts(deck[10:])))
+    batch = odds_batch(states)
+    for i, (hand, counts) in enumerate(states):
+        exact = odds_for(hand, counts)
+        assert batch.bust[i] == pytest.approx(exact.bust)
+        assert batch.flip7[i] == pytest.approx(exact.flip7)
+        assert batch.stay[i] == pytest.approx(exact.stay)
+        assert batch.hit[i] == pytest.approx(exact.hit)
+
+
+def test_odds_policy_plays_matches():
+    from simulate import play_match
+
+    stats = play_match(["odds", "threshold:20"], seed=4)
+    assert stats.matches == 1
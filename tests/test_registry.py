@@ -0,0 +1,142 @@
+import threading
+import time
+
+from game import Game
+from store import SQLiteGameStore
+from registry import GameRegistry, EVICT_ABANDONED, EVICT_CAPACITY, EVICT_FINISHED, EVICT_IDLE
+
+
+def test_attach_detach_and_remove():
+    registry = GameRegistry()
+    game = Game(owner_player_id="pid1")
+    registry.add(game)
+    registry.attach("s1", game.code)
+    registry.attach("s2", game.code)
+    assert registry.for_sid("s1") is game
+    assert registry.detach("s1") == game.code
+    assert registry.for_sid("s1") is None
+
+    assert registry.remove(game.code) is game
+    assert game.code not in registry
+    assert registry.for_sid("s2") is None
+
+
+def test_game_lock_serializes_concurrent_actions():
+    registry = GameRegistry()
+    game = Game(owner_player_id="pid1")
+    registry.add(game)
+    counter = {"n": 0}
+
+    def bump():
+        for _ in range(1000):
+            with registry.lock(game.code):
+                n = counter["n"]
+                counter["n"] = n + 1
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter["n"] == 4000
+    assert registry.lock(game.code) is registry.lock(game.code)
+
+
+def lobby(registry, owner_sid="s1"):
+    game = Game(owner_player_id="pid1")
+    game.add_player("P1", owner_sid, "pid1")
+    registry.add(game)
+    registry.attach(owner_sid, game.code)
+    return game
+
+
+def test_sweep_evicts_by_ttl():
+    evicted = []
+    registry = GameRegistry(finished_ttl=10, abandoned_ttl=20, idle_ttl=100,
+                            on_evict=lambda code, game, reason: evicted.append((code, reason)))
+    finished, abandoned, idle, active = (lobby(registry, f"s{i}") for i in range(4))
+    finished.match_winner = finished.players[0]
+    abandoned.players[0].sid = None
+    now = time.monotonic()
+
+    assert registry.sweep(now) == []
+    assert registry.sweep(now + 15) == [(finished.code, EVICT_FINISHED)]
+    assert registry.sweep(now + 25) == [(abandoned.code, EVICT_ABANDONED)]
+    registry.save(active)
+    swept = registry.sweep(now + 101)
+    assert (idle.code, EVICT_IDLE) in swept
+    assert evicted[:2] == [(finished.code, EVICT_FINISHED), (abandoned.code, EVICT_ABANDONED)]
+    assert registry.for_sid("s0") is None
+    assert registry.stats()["evictions"][EVICT_FINISHED] == 1
+
+
+def test_failing_evict_hook_does_not_stop_the_sweep():
+    seen = []
+
+    def on_evict(code, game, reason):
+        seen.append(code)
+        if len(seen) == 1:
+            raise OSError("log already moved")
+
+    registry = GameRegistry(idle_ttl=0, on_evict=on_evict)
+    games = [lobby(registry, f"s{i}") for i in range(3)]
+    assert len(registry.sweep()) == 3
+    assert seen == [g.code for g in games] and len(registry) == 0
+
+
+def test_sweep_skips_games_in_use():
+    registry = GameRegistry(idle_ttl=0)
+    game = lobby(registry)
+    with registry.lock(game.code):
+        done = []
+        t = threading.Thread(target=lambda: done.append(registry.sweep()))
+        t.start()
+        t.join()
+    assert done == [[]]
+    assert registry.sweep() == [(game.code, EVICT_IDLE)]
+
+
+def test_capacity_evicts_least_recently_active():
+    registry = GameRegistry(max_games=2)
+    first, second = lobby(registry, "s1"), lobby(registry, "s2")
+    registry.save(first)
+    third = lobby(registry, "s3")
+    assert second.code not in registry
+    assert first.code in registry and third.code in registry
+    assert registry.evictions[EVICT_CAPACITY] == 1
+
+
+def test_capacity_skips_games_in_use():
+    registry = GameRegistry(max_games=1)
+    first = lobby(registry, "s1")
+    with registry.lock(first.code):
+        t = threading.Thread(target=lambda: lobby(registry, "s2"))
+        t.start()
+        t.join()
+        assert first.code in registry and len(registry) == 2
+    third = lobby(registry, "s3")
+    assert len(registry) == 1 and third.code in registry
+    assert registry.evictions[EVICT_CAPACITY] == 2
+
+
+def test_capacity_only_pages_out_of_a_persistent_store(tmp_path):
+    loaded = []
+    registry = GameRegistry(SQLiteGameStore(str(tmp_path / "games.db")), max_games=1, on_load=loaded.append)
+    first = lobby(registry, "s1")
+    second = lobby(registry, "s2")
+    assert first.code not in registry and registry.store.exists(first.code)
+    assert registry.evictions[EVICT_CAPACITY] == 1
+
+    # The connection is still attached; its next action loads the game back
+    back = registry.for_sid("s1")
+    assert back.code == first.code and back.players[0].player_id == "pid1"
+    assert loaded == [back] and first.code in registry
+    assert second.code not in registry and registry.store.exists(second.code)
+
+
+def test_bot_only_games_are_not_abandoned():
+    registry = GameRegistry(abandoned_ttl=1, idle_ttl=100)
+    game = Game(owner_player_id="b1")
+    game.add_player("Bot", None, "b1", bot="random")
+    registry.add(game)
+    assert registry.sweep(time.monotonic() + 10) == []
@@ -0,0 +1,34 @@
+import pytest
+
+from policies import ThresholdPolicy, make_policy
+from simulate import SimStats, play_match, simulate
+
+
+def test_play_match_reaches_win_score():
+    stats = play_match(["threshold:20", "random"], seed=3)
+    assert stats.matches == 1
+    assert sum(stats.wins) == 1
+    assert stats.rounds >= 1
+    assert stats.player_rounds == [stats.rounds, stats.rounds]
+
+
+def test_simulation_is_reproducible_and_shardable():
+    a = simulate(["threshold:20", "threshold:30"], matches=12, seed=5, chunk_size=5)
+    b = simulate(["threshold:20", "threshold:30"], matches=12, seed=5, chunk_size=12)
+    assert a.matches == b.matches == 12
+    assert a.wins == b.wins and a.busts == b.busts and a.rounds == b.rounds
+
+
+def test_stats_merge_adds_up():
+    a = play_match(["threshold:20", "random"], seed=1)
+    b = play_match(["threshold:20", "random"], seed=2)
+    merged = SimStats(a.specs).merge(a).merge(b)
+    assert merged.matches == 2
+    assert merged.rounds == a.rounds + b.rounds
+
+
+def test_make_policy_rejects_unknown_spec():
+    assert isinstance(make_policy("threshold:25"), ThresholdPolicy)
+    with pytest.raises(ValueError):
+        make_policy("greedy")
+
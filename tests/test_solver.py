@@ -0,0 +1,64 @@
+import pytest
+
+from game import Card, CardType, Game
+from odds import deck_counts, odds_for
+from policies import SolvedPolicy
+from solver import PolicyTable, solve
+
+
+def small_deck(*extra):
+    return [Card(CardType.NUMBER, 1), Card(CardType.NUMBER, 2), Card(CardType.NUMBER, 2)] + list(extra)
+
+
+def test_expected_score_policy_on_tiny_deck():
+    # {1}: hit for {1,2} = 3.  {2}: hitting risks the other 2, 1.5 < 2, so stay.
+    table = solve(small_deck(Card(CardType.FREEZE)), keep_values=True)
+    assert table.start_value == pytest.approx(7 / 3)
+    assert table.hit(0, (), 0)
+    assert table.hit(0b10, (), 0)
+    assert not table.hit(0b100, (), 0)
+
+
+def test_second_chance_and_bonus_change_decisions():
+    table = solve(small_deck(Card(CardType.SECOND_CHANCE), Card(CardType.BONUS, "x2")))
+    # Holding a Second Chance makes the risky {2} hand worth hitting
+    assert table.hit(0b100, (0,), 1)
+
+
+def test_reach_objective_stops_once_there():
+    table = solve(small_deck(), target=2)
+    assert not table.hit(0b100, (), 0)
+    assert table.hit(0b10, (), 0)
+    assert table.start_value == pytest.approx(1.0)
+
+
+def test_table_round_trip(tmp_path):
+    table = solve(small_deck(Card(CardType.BONUS, "+4")), target=5)
+    path = tmp_path / "table.bin"
+    table.save(path)
+    loaded = PolicyTable.load(path)
+    assert loaded.target == 5 and loaded.counts == table.counts
+    assert loaded.bits == table.bits
+
+
+def test_solved_policy_reads_live_hands():
+    g = Game(owner_player_id="a", cards=small_deck())
+    g.add_player("A", "a", "a")
+    g.start("a")
+    g.hit("a")   # draws the last card of the list: a 2
+    policy = SolvedPolicy([solve(small_deck())])
+    assert not policy.hit_or_stay(g, g.players[0])
+
+
+def test_second_chances_stack():
+    sc = Card(CardType.SECOND_CHANCE)
+    table = solve([Card(CardType.NUMBER, 3)] * 2 + [Card(CardType.NUMBER, 12), sc, sc], keep_values=True)
+    assert table.second_chances == 2
+    two, one = (table.values[table.index(0b1000, (), k)] for k in (2, 1))
+    # {3}: a 12 ends at 15; the other 3 spends one, and drawing a Second Chance back adds one
+    assert two == pytest.approx(14.0625) and one == pytest.approx(13.125)
+    # One more hit from {3} with both Second Chances held, drawing from what is left
+    once = odds_for(((3,), 0, 1, 2), deck_counts([Card(CardType.NUMBER, 3), Card(CardType.NUMBER, 12)]))
+    assert once.bust == 0 and once.hit == pytest.approx(9.0)
+    assert two >= once.hit and two > one
+    assert table.hit(0b1000, (), 2)
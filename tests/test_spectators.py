@@ -0,0 +1,26 @@
+import pytest
+
+from spectators import SpectatorFeed
+
+
+def test_first_state_goes_out_at_once():
+    feed = SpectatorFeed(rate=2)
+    assert feed.offer({"round": 1}, now=10.0) == 0
+    assert feed.flush(now=10.0) == {"version": 1, "base": 0, "set": {"round": 1}}
+
+
+def test_states_within_the_interval_coalesce_to_the_newest():
+    feed = SpectatorFeed(rate=2)
+    feed.offer({"round": 1, "turn": 0}, now=10.0)
+    feed.flush(now=10.0)
+    assert feed.offer({"round": 1, "turn": 1}, now=10.1) == pytest.approx(0.4)
+    assert feed.offer({"round": 1, "turn": 2}, now=10.2) is None
+    assert feed.flush(now=10.5) == {"version": 2, "base": 1, "set": {"turn": 2}}
+    assert feed.flush(now=10.6) is None
+
+
+def test_quiet_feed_sends_immediately_again():
+    feed = SpectatorFeed(rate=2)
+    feed.offer({"turn": 0}, now=10.0)
+    feed.flush(now=10.0)
+    assert feed.offer({"turn": 1}, now=11.0) == 0
@@ -0,0 +1,74 @@
+import json
+
+from game import Game, Card, CardType, Deck
+from registry import GameRegistry
+from store import MemoryGameStore, SQLiteGameStore, shard_for_code, store_from_url
+
+
+def game_mid_flip3():
+    cards = [Card(*spec) for spec in reversed([
+        (CardType.NUMBER, 4), (CardType.BONUS, "+3"), (CardType.FLIP_3,), (CardType.NUMBER, 1),
+    ])]
+    g = Game(owner_player_id="pid1", cards=cards)
+    g.add_player("P1", "s1", "pid1")
+    g.add_player("P2", "s2", "pid2")
+    g.start("s1")
+    g.hit("s1")
+    g.hit("s2")
+    g.hit("s1")
+    return g
+
+
+def test_game_record_round_trip():
+    g = game_mid_flip3()
+    record = json.loads(json.dumps(g.to_record()))
+    restored = Game.from_record(record)
+    assert restored.to_dict() == g.to_dict()
+    assert restored.pending_actions == [{"action": "flip3", "player_id": "pid1"}]
+    assert [c.to_record() for c in restored.deck.cards] == [c.to_record() for c in g.deck.cards]
+
+    restored.apply_flip3("s1", "s2")
+    g.apply_flip3("s1", "s2")
+    assert restored.to_dict() == g.to_dict()
+
+
+def test_random_deck_round_trip_uses_codes():
+    deck = Deck()
+    record = deck.to_record()
+    assert all(isinstance(c, int) for c in record["cards"])
+    assert record["backup"] is None
+    assert Deck.from_record(record).cards == deck.cards
+
+
+def test_sqlite_store(tmp_path):
+    store = SQLiteGameStore(str(tmp_path / "games.db"))
+    g = game_mid_flip3()
+    store.save(g)
+    assert store.codes() == [g.code]
+    assert store.exists(g.code)
+    assert store.load(g.code).to_dict() == g.to_dict()
+    store.delete(g.code)
+    assert store.load(g.code) is None
+    assert not store.exists(g.code)
+
+
+def test_registry_reloads_from_store(tmp_path):
+    url = "sqlite:///" + str(tmp_path / "games.db")
+    g = game_mid_flip3()
+    GameRegistry(store_from_url(url)).add(g)
+
+    restarted = GameRegistry(store_from_url(url))
+    assert restarted.get(g.code).to_dict() == g.to_dict()
+    assert restarted.get("NOPE1") is None
+
+
+def test_memory_store_keeps_live_objects():
+    store = MemoryGameStore()
+    g = game_mid_flip3()
+    store.save(g)
+    assert store.load(g.code) is g
+
+
+def test_shard_for_code_is_stable():
+    assert shard_for_code("ABCDE", 4) == shard_for_code("ABCDE", 4)
+    assert {shard_for_code(code, 3) for code in ("AAAAA", "BBBBB", "CCCCC", "DDDDD", "EEEEE")} <= {0, 1, 2}
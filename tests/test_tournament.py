@@ -0,0 +1,71 @@
+import pytest
+
+from tournament import Tournament, run_headless
+
+
+def bracket(n, table_size=4, seed=1):
+    t = Tournament(table_size=table_size, seed=seed)
+    for i in range(n):
+        t.add(f"E{i}", bot="threshold:20")
+    return t
+
+
+def test_tables_are_balanced_and_seat_everyone_once():
+    t = bracket(10)
+    tables = t.advance()
+    assert sorted(len(table.seats) for table in tables) == [3, 3, 4]
+    assert sorted(i for table in tables for i in table.seats) == list(range(10))
+
+
+def test_names_are_unique_and_entries_close_at_the_start():
+    t = bracket(2)
+    assert t.add("e0") is None
+    t.advance()
+    assert t.add("Late") is None
+    with pytest.raises(ValueError):
+        Tournament(table_size=1)
+
+
+def test_winners_advance_until_a_champion():
+    t = bracket(5)
+    t.advance()
+    first, second = t.tables
+    assert not t.record(0, first.seats[0], {i: 100 for i in first.seats})
+    assert t.record(1, second.seats[-1], {i: 50 for i in second.seats})
+    assert sorted(t.alive) == sorted([first.seats[0], second.seats[-1]])
+    (final,) = t.advance()
+    assert t.record(0, final.seats[1], {final.seats[1]: 200})
+    assert t.champion == final.seats[1]
+    assert t.advance() == []
+    standings = t.standings()
+    assert standings[0]["name"] == t.entrants[t.champion].name
+    assert standings[0]["wins"] == 2 and standings[0]["reached"] == 2
+    assert [row["alive"] for row in standings].count(True) == 1
+
+
+def test_odd_field_on_two_seat_tables_gets_a_bye():
+    t = bracket(5, table_size=2)
+    tables = t.advance()
+    assert sorted(len(table.seats) for table in tables) == [1, 2, 2]
+    (bye,) = [table for table in tables if len(table.seats) == 1]
+    assert bye.winner == bye.seats[0] and t.wins[bye.winner] == 0
+    played = [idx for idx, table in enumerate(tables) if table is not bye]
+    assert not t.record(played[0], tables[played[0]].seats[0], {})
+    assert t.record(played[1], tables[played[1]].seats[0], {})
+    assert bye.seats[0] in t.alive and len(t.alive) == 3
+
+    t = bracket(5, table_size=2)
+    list(run_headless(t))
+    assert t.champion is not None and t.round == 3
+
+
+def test_headless_bracket_is_reproducible():
+    def play(seed):
+        t = bracket(9, seed=seed)
+        rounds = [t.round for t in run_headless(t)]
+        return rounds, t.champion, t.points
+
+    rounds, champion, points = play(3)
+    assert rounds == [1, 2]
+    assert champion is not None
+    assert play(3) == (rounds, champion, points)
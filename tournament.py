@@ -0,0 +1,190 @@
+"""Knockout tournaments: entrants are seated at tables, each table plays a match, its winner advances.
+
+    python tournament.py odds threshold:20 threshold:25 random solved odds threshold:15 --table-size 4
+    python tournament.py odds threshold:20 --copies 16 --workers 0 --seed 7
+
+Tournament is only the bracket (seating, results, standings); it never touches a Game. The
+headless runner below plays every table of a bracket round across a process pool with
+simulate.play_match; app.py runs live tournaments on real server games, with humans and bots.
+"""
+import argparse
+import multiprocessing
+import random
+import uuid
+from collections import namedtuple
+
+from policies import make_policy
+from simulate import play_match
+
+# bot: a policies.make_policy spec, or None for a human
+Entrant = namedtuple("Entrant", "name bot player_id")
+
+
+class Table:
+    def __init__(self, seats, seed):
+        self.seats = seats      # entrant indices, in seating order
+        self.seed = seed        # deck seed for the headless runner
+        self.code = None        # the live game playing it (server only)
+        self.winner = None      # entrant index
+
+
+class Tournament:
+    def __init__(self, code=None, table_size=4, seed=None, owner_player_id=None):
+        if table_size < 2:
+            raise ValueError("tables need at least two seats")
+        self.code = code
+        self.owner_player_id = owner_player_id
+        self.table_size = table_size
+        self.rng = random.Random(seed)
+        self.entrants = []
+        self.round = 0          # bracket round being played; 0 before the start
+        self.tables = []        # this round's tables
+        self.alive = []         # entrant indices still in
+        self.wins = []          # per entrant: tables won
+        self.points = []        # per entrant: final scores summed over its matches
+        self.reached = []       # per entrant: last bracket round played
+        self.champion = None    # entrant index
+
+    @property
+    def started(self):
+        return self.round > 0
+
+    def add(self, name, bot=None, player_id=None):
+        if self.started or any(e.name.lower() == name.lower() for e in self.entrants):
+            return None
+        entrant = Entrant(name, bot, player_id or str(uuid.uuid4()))
+        self.entrants.append(entrant)
+        self.alive.append(len(self.entrants) - 1)
+        self.wins.append(0)
+        self.points.append(0)
+        self.reached.append(0)
+        return entrant
+
+    def index_of(self, player_id):
+        return next((i for i, e in enumerate(self.entrants) if e.player_id == player_id), None)
+
+    def advance(self):
+        """Seat the next bracket round; returns its tables, or [] once there is a champion."""
+        if len(self.alive) < 2:
+            self.champion = self.alive[0] if self.alive else None
+            self.tables = []
+            return []
+        self.round += 1
+        order = list(self.alive)
+        self.rng.shuffle(order)
+        # As few tables as the seat limit allows, sizes differing by one at most
+        n_tables = -(-len(order) // self.table_size)
+        self.tables = [Table(order[i::n_tables], self.rng.getrandbits(31)) for i in range(n_tables)]
+        for table in self.tables:
+            # Only an odd field on two-seat tables leaves someone alone: a bye, not a table won
+            if len(table.seats) == 1:
+                table.winner = table.seats[0]
+        for idx in order:
+            self.reached[idx] = self.round
+        return self.tables
+
+    def record(self, table_idx, winner, points):
+        """A table's result (entrant indices; points: {entrant: final score}). True when the round is complete."""
+        table = self.tables[table_idx]
+        if table.winner is not None:
+            return False
+        table.winner = winner
+        self.wins[winner] += 1
+        for idx, score in points.items():
+            self.points[idx] += score
+        if any(t.winner is None for t in self.tables):
+            return False
+        self.alive = [t.winner for t in self.tables]
+        if len(self.alive) == 1:
+            self.champion = self.alive[0]
+        return True
+
+    def standings(self):
+        ranked = sorted(
+            range(len(self.entrants)),
+            key=lambda i: (i != self.champion, -self.reached[i], i not in self.alive, -self.wins[i], -self.points[i]),
+        )
+        return [
+            {
+                "name": self.entrants[i].name,
+                "bot": self.entrants[i].bot is not None,
+                "alive": i in self.alive,
+                "reached": self.reached[i],
+                "wins": self.wins[i],
+                "points": self.points[i],
+            }
+            for i in ranked
+        ]
+
+    def to_dict(self):
+        name = lambda idx: None if idx is None else self.entrants[idx].name
+        return {
+            "code": self.code,
+            "round": self.round,
+            "table_size": self.table_size,
+            "champion": name(self.champion),
+            "tables": [
+                {"code": t.code, "players": [name(i) for i in t.seats], "winner": name(t.winner), "bye": len(t.seats) == 1}
+                for t in self.tables
+            ],
+            "standings": self.standings(),
+        }
+
+
+# ---------- Headless runner ----------
+
+def _play_table(args):
+    # Worker: one table's match; returns (winning seat, final score per seat)
+    specs, seed = args
+    stats = play_match(specs, seed)
+    return stats.wins.index(1), stats.points
+
+
+def run_headless(tournament, workers=1):
+    """Play a bracket of bots, yielding the tournament after every round (for streaming standings)."""
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        while tournament.advance():
+            playing = [idx for idx, t in enumerate(tournament.tables) if t.winner is None]
+            jobs = [([tournament.entrants[i].bot for i in tournament.tables[idx].seats], tournament.tables[idx].seed)
+                    for idx in playing]
+            results = pool.map(_play_table, jobs) if pool is not None else [_play_table(job) for job in jobs]
+            for table_idx, (winner, points) in zip(playing, results):
+                seats = tournament.tables[table_idx].seats
+                tournament.record(table_idx, seats[winner], dict(zip(seats, points)))
+            yield tournament
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("policies", nargs="+", help="one entrant per spec, e.g. odds threshold:20")
+    parser.add_argument("--copies", type=int, default=1, help="entrants per spec")
+    parser.add_argument("--table-size", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=1, help="0 uses every core")
+    parser.add_argument("--top", type=int, default=10, help="standings rows printed per round")
+    args = parser.parse_args(argv)
+
+    for spec in args.policies:
+        make_policy(spec)  # fail fast on typos before spawning workers
+    tournament = Tournament(table_size=args.table_size, seed=args.seed)
+    for _ in range(args.copies):
+        for spec in args.policies:
+            tournament.add(f"{spec}#{len(tournament.entrants) + 1}", bot=spec)
+    if len(tournament.entrants) < 2:
+        parser.error("a tournament needs at least two entrants")
+
+    workers = args.workers or multiprocessing.cpu_count()
+    for t in run_headless(tournament, workers):
+        print(f"round {t.round}: {len(t.tables)} table(s), {len(t.alive)} advance")
+        for row in t.standings()[:args.top]:
+            print(f"  {row['name']:<20} {'in' if row['alive'] else 'out':<4} wins {row['wins']:<3} pts {row['points']}")
+    print(f"champion: {tournament.entrants[tournament.champion].name}")
+
+
+if __name__ == "__main__":
+    main()